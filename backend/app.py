@@ -1,9 +1,14 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
 from route_optimizer import RouteOptimizer
 from last_mile_service import LastMileService
 from user_profiles import UserProfileManager
+from deadline import Deadline
+from station_payload import STATION_LAYOUTS
+from station_autocomplete import DEFAULT_LIMIT, MAX_LIMIT
+from plan_response import PlanShape
 import json
+import math
 import time
 
 app = Flask(__name__)
@@ -57,30 +62,211 @@ def sort_routes_by_preference(routes, route_preference):
     else:  # eco-friendly (default)
         return sorted(routes, key=lambda r: -r.get('eco_score', 0))  # Descending eco score
 
+def finalize_routes(routes, origin, destination, vehicle_types, route_preference):
+    """Apply request filters and preference ordering, then attach last-mile options.
+    
+    Returns (routes, last_mile): the options depend only on origin and
+    destination, so they are looked up once and the same list is shared by
+    every route.
+    """
+    # Filter routes based on vehicle type preferences
+    if 'all' not in vehicle_types:
+        routes = filter_routes_by_vehicle_types(routes, vehicle_types)
+    
+    # Sort routes based on route preference
+    routes = sort_routes_by_preference(routes, route_preference)
+    if not routes:
+        return routes, None
+    
+    # Get coordinates for last-mile calculations
+    origin_coords = route_optimizer.get_station_coordinates(origin)
+    destination_coords = route_optimizer.get_station_coordinates(destination)
+    
+    last_mile = last_mile_service.get_options(
+        origin, destination, origin_coords, destination_coords
+    )
+    for route in routes:
+        route['last_mile'] = last_mile
+    return routes, last_mile
+
+def stream_format(data):
+    """'ndjson' or 'sse' when the client asked for a streamed plan, else None"""
+    requested = str(data.get('stream') or '').lower()
+    if requested in ('ndjson', 'sse'):
+        return requested
+    accepted = request.accept_mimetypes
+    if accepted.best == 'application/x-ndjson':
+        return 'ndjson'
+    if accepted.best == 'text/event-stream':
+        return 'sse'
+    return None
+
+def stream_plan(stream, origin, destination, user_profile, deadline, filters, profile_type, shape):
+    """Streamed /api/plan body: early route events, then the full final response"""
+    vehicle_types = filters.get('vehicleTypes', ['all'])
+    route_preference = filters.get('routePreference', 'eco')
+    
+    def encode(event, payload):
+        payload = {'event': event, **payload}
+        if stream == 'sse':
+            return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+        return json.dumps(payload) + "\n"
+    
+    def generate():
+        try:
+            for event, routes in route_optimizer.stream_routes(origin, destination, user_profile, deadline):
+                if event != 'final':
+                    # Early events carry routes as ranked so far, before the
+                    # last-mile lookups that only the final set gets
+                    if 'all' not in vehicle_types:
+                        routes = filter_routes_by_vehicle_types(routes, vehicle_types)
+                    if routes:
+                        yield encode(event, shape.shape({'final': False}, routes))
+                    continue
+                
+                routes, last_mile = finalize_routes(routes, origin, destination, vehicle_types, route_preference)
+                final = shape.shape({
+                    'success': True,
+                    'partial': deadline.partial,
+                    'profile': profile_type,
+                    'filters': filters,
+                    'origin': origin,
+                    'destination': destination
+                }, routes, last_mile)
+                if not routes:
+                    final['message'] = 'No suitable routes found with the selected filters. Try adjusting your preferences.'
+                yield encode('final', final)
+        except Exception as e:
+            print(f"Error in stream_plan: {str(e)}")
+            yield encode('error', {
+                'success': False,
+                'error': f'Route planning failed: {str(e)}'
+            })
+    
+    mimetype = 'text/event-stream' if stream == 'sse' else 'application/x-ndjson'
+    response = Response(stream_with_context(generate()), mimetype=mimetype)
+    # Keep proxies from buffering the early events
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
+    # Routes are still served from fallbacks while OTP is unavailable, so an
+    # open OTP circuit degrades the service rather than failing the check
+    otp_circuit_open = route_optimizer.otp_breaker.is_open()
     return jsonify({
-        'status': 'healthy',
+        'status': 'degraded' if otp_circuit_open else 'healthy',
+        'otp_available': not otp_circuit_open,
         'service': 'Yatri API',
-        'version': '1.0.0'
+        'version': '1.0.0',
+        'otp': route_optimizer.otp_client.get_stats(),
+        'stations': route_optimizer.catalog.get_stats(),
+        'route_cache': route_optimizer.route_cache.get_stats(),
+        'otp_store': route_optimizer.otp_store.get_stats(),
+        'otp_variant_cache': route_optimizer.variant_cache.get_stats(),
+        'plan_coalescing': route_optimizer.plan_flights.get_stats(),
+        'mode_planner': route_optimizer.mode_planner.get_stats(),
+        'rail_network': route_optimizer.rail_network.graph.get_stats(),
+        'rail_fares': route_optimizer.rail_fares.get_stats(),
+        'station_names': route_optimizer.rail_network.graph.canonical.get_stats()
     })
 
+def send_prepared(payload):
+    """Serve a PreparedPayload: 304 on a matching ETag, else the best accepted encoding"""
+    encoding = payload.choose_encoding(request.accept_encodings)
+    etag = payload.etag_for(encoding)
+    
+    if any(request.if_none_match.contains(tag) for tag in payload.all_etags()):
+        response = Response(status=304)
+    else:
+        response = Response(payload.encoded[encoding], mimetype='application/json')
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+    
+    response.set_etag(etag)
+    response.headers['Vary'] = 'Accept-Encoding'
+    # Clients may keep the body but must revalidate; the station set can be swapped
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
 @app.route('/api/stations', methods=['GET'])
 def get_stations():
-    """Get all stations for dropdown"""
-    try:
-        stations = route_optimizer.get_all_stations()
+    """Get all stations for dropdown (format=columnar for parallel arrays)"""
+    layout = request.args.get('format', 'full')
+    if layout not in STATION_LAYOUTS:
         return jsonify({
-            'success': True,
-            'stations': stations
-        })
+            'success': False,
+            'error': f"format must be one of: {', '.join(STATION_LAYOUTS)}"
+        }), 400
+    
+    try:
+        return send_prepared(route_optimizer.catalog.payload(layout))
     except Exception as e:
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
 
+@app.route('/api/stations/autocomplete', methods=['GET'])
+def autocomplete_stations():
+    """Ranked station suggestions for a typed prefix (names, name words and aliases)"""
+    query = request.args.get('q', '')
+    try:
+        k = min(int(request.args.get('k', DEFAULT_LIMIT)), MAX_LIMIT)
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'error': 'k must be a number'
+        }), 400
+    
+    results = []
+    for station, match_type in route_optimizer.catalog.autocomplete.search(query, k):
+        station['match'] = match_type
+        results.append(station)
+    return jsonify({
+        'success': True,
+        'query': query,
+        'stations': results
+    })
+
+@app.route('/api/stations/nearby', methods=['GET'])
+def get_nearby_stations():
+    """Get stations nearest to a coordinate (k-nearest or within a radius)"""
+    try:
+        lat = float(request.args['lat'])
+        lng = float(request.args['lng'])
+        radius = request.args.get('radius')
+        radius_km = float(radius) if radius else None
+        # With only a radius given, return everything inside it
+        k = request.args.get('k')
+        k = int(k) if k else (None if radius_km is not None else 5)
+    except (KeyError, ValueError):
+        return jsonify({
+            'success': False,
+            'error': 'lat and lng are required numbers; k and radius must be numeric'
+        }), 400
+    
+    # nan/inf would poison the grid cell lookup
+    if not all(math.isfinite(value) for value in (lat, lng, radius_km if radius_km is not None else 0)):
+        return jsonify({
+            'success': False,
+            'error': 'lat, lng and radius must be finite numbers'
+        }), 400
+    if k is not None and k < 1:
+        return jsonify({
+            'success': False,
+            'error': 'k must be at least 1'
+        }), 400
+    
+    stations = route_optimizer.find_nearby_stations(lat, lng, k=k, radius_km=radius_km)
+    return jsonify({
+        'success': True,
+        'stations': stations,
+        'count': len(stations)
+    })
+
 @app.route('/api/plan', methods=['POST'])
 def plan_journey():
     """Main route planning endpoint with vehicle type and route preference filtering"""
@@ -98,6 +284,25 @@ def plan_journey():
         destination = data['destination']
         profile_type = data.get('profile', 'comfort')
         
+        # End-to-end latency budget; OTP work still outstanding when it runs
+        # out is dropped and the best routes so far are returned as partial
+        try:
+            deadline = Deadline.from_milliseconds(data.get('deadline_ms'))
+        except (TypeError, ValueError):
+            return jsonify({
+                'success': False,
+                'error': 'deadline_ms must be a number of milliseconds'
+            }), 400
+        
+        # Response layout: schema 2 is compact, with optional field projection
+        try:
+            shape = PlanShape.from_request(data)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        
         # Extract new filter parameters
         filters = data.get('filters', {})
         vehicle_types = filters.get('vehicleTypes', ['all'])
@@ -133,41 +338,30 @@ def plan_journey():
             user_profile['transfer_preference'] = 0.3
             user_profile['time_preference'] = 0.2
         
-        # Get optimized routes with filters
-        routes = route_optimizer.get_routes(origin, destination, user_profile)
-        
-        # Filter routes based on vehicle type preferences
-        if 'all' not in vehicle_types:
-            routes = filter_routes_by_vehicle_types(routes, vehicle_types)
-        
-        # Sort routes based on route preference
-        routes = sort_routes_by_preference(routes, route_preference)
+        # Clients that asked for a stream get the first route as soon as it is scored
+        stream = stream_format(data)
+        if stream:
+            return stream_plan(stream, origin, destination, user_profile, deadline, filters, profile_type, shape)
         
-        # Get coordinates for last-mile calculations
-        origin_coords = route_optimizer.get_station_coordinates(origin)
-        destination_coords = route_optimizer.get_station_coordinates(destination)
+        # Get optimized routes with filters
+        routes = route_optimizer.get_routes(origin, destination, user_profile, deadline)
+        routes, last_mile = finalize_routes(routes, origin, destination, vehicle_types, route_preference)
         
         if not routes:
-            return jsonify({
+            return jsonify(shape.shape({
                 'success': True,
-                'routes': [],
+                'partial': deadline.partial,
                 'message': 'No suitable routes found with the selected filters. Try adjusting your preferences.'
-            })
-        
-        # Add last-mile options to each route with real coordinates
-        for route in routes:
-            route['last_mile'] = last_mile_service.get_options(
-                origin, destination, origin_coords, destination_coords
-            )
+            }, []))
         
-        return jsonify({
+        return jsonify(shape.shape({
             'success': True,
-            'routes': routes,
+            'partial': deadline.partial,
             'profile': profile_type,
             'filters': filters,
             'origin': origin,
             'destination': destination
-        })
+        }, routes, last_mile))
         
     except Exception as e:
         print(f"Error in plan_journey: {str(e)}")
@@ -191,18 +385,16 @@ def debug_stations():
     limit = int(request.args.get('limit', 20))
     
     if search:
-        # Filter stations by search term
+        # Filter stations by search term over the whole set via the name index
+        catalog = route_optimizer.catalog
         filtered = []
-        search_lower = search.lower()
-        for station in route_optimizer.stations[:200]:  # Limit to first 200 for performance
-            if isinstance(station, dict):
-                name = station.get('name', '').lower()
-                if search_lower in name or name in search_lower:
-                    filtered.append({
-                        'name': station.get('name'),
-                        'lat': station.get('lat'),
-                        'lng': station.get('lng') or station.get('lon')
-                    })
+        for position in catalog.station_index.search(search):
+            station = catalog.stations[position]
+            filtered.append({
+                'name': station.get('name'),
+                'lat': station.get('lat'),
+                'lng': station.get('lng')
+            })
         return jsonify({
             'success': True,
             'stations': filtered[:limit],
@@ -213,12 +405,11 @@ def debug_stations():
         # Return first few stations
         sample = []
         for station in route_optimizer.stations[:limit]:
-            if isinstance(station, dict):
-                sample.append({
-                    'name': station.get('name'),
-                    'lat': station.get('lat'),
-                    'lng': station.get('lng') or station.get('lon')
-                })
+            sample.append({
+                'name': station.get('name'),
+                'lat': station.get('lat'),
+                'lng': station.get('lng')
+            })
         return jsonify({
             'success': True,
             'stations': sample,
@@ -285,6 +476,8 @@ if __name__ == '__main__':
     print("📋 Endpoints:")
     print("   GET  /api/health - Health check")
     print("   GET  /api/stations - Get all stations")
+    print("   GET  /api/stations/nearby - Nearest stations to lat/lng")
+    print("   GET  /api/stations/autocomplete - Station suggestions for a typed prefix")
     print("   POST /api/plan - Plan journey")
     print("   GET  /api/profiles - Get user profiles")
     print("   POST /api/feedback - Submit route feedback")
@@ -0,0 +1,144 @@
+import os
+import threading
+import time
+from collections import deque
+import requests
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised instead of calling a backend whose circuit is open"""
+
+
+def _setting(value, env_name, default):
+    """Explicit argument, else environment variable, else default; 0 is a valid setting"""
+    if value is not None:
+        return value
+    return float(os.environ.get(env_name, default))
+
+
+class CircuitBreaker:
+    """Error-rate and latency circuit breaker with a single half-open probe"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, window_seconds=None, min_calls=None, error_rate=None,
+                 slow_call_seconds=None, slow_call_rate=None, open_seconds=None):
+        self.name = name
+        # Outcomes inside the rolling window decide whether the circuit trips
+        self.window_seconds = _setting(window_seconds, 'OTP_BREAKER_WINDOW', 30)
+        self.min_calls = int(_setting(min_calls, 'OTP_BREAKER_MIN_CALLS', 6))
+        self.error_rate = _setting(error_rate, 'OTP_BREAKER_ERROR_RATE', 0.5)
+        self.slow_call_seconds = _setting(slow_call_seconds, 'OTP_BREAKER_SLOW_SECONDS', 10)
+        self.slow_call_rate = _setting(slow_call_rate, 'OTP_BREAKER_SLOW_RATE', 0.8)
+        # How long to fail fast before letting a probe through
+        self.open_seconds = _setting(open_seconds, 'OTP_BREAKER_OPEN_SECONDS', 30)
+
+        self.state = self.CLOSED
+        self.opened_at = None
+        self.last_trip_reason = None
+        self._probe_in_flight = False
+        # Bumped on every state change; a call's permit records the epoch it
+        # was let through in, so completions from before a trip or a probe
+        # cannot decide the new state
+        self._epoch = 0
+        self._outcomes = deque()  # (timestamp, failed, slow)
+        self._lock = threading.Lock()
+        self._stats = {
+            'calls': 0,
+            'failures': 0,
+            'slow_calls': 0,
+            'rejected': 0,
+            'trips': 0
+        }
+
+    def is_open(self):
+        """True while calls are being rejected without trying the backend"""
+        with self._lock:
+            if self.state == self.OPEN:
+                return time.time() - self.opened_at < self.open_seconds
+            return self.state == self.HALF_OPEN and self._probe_in_flight
+
+    def allow_request(self):
+        """Reserve permission for one call: a permit to hand back to record(),
+        or None when the call is rejected (rejections are counted)"""
+        with self._lock:
+            if self.state == self.OPEN and time.time() - self.opened_at >= self.open_seconds:
+                self._set_state(self.HALF_OPEN)
+                self._probe_in_flight = False
+                print(f"🟡 {self.name} circuit half-open, probing")
+
+            if self.state == self.CLOSED:
+                return (self._epoch, False)
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return (self._epoch, True)
+
+            self._stats['rejected'] += 1
+            return None
+
+    def record(self, permit, latency_seconds, failed):
+        """Record the outcome of a call allow_request() let through with this permit"""
+        now = time.time()
+        slow = latency_seconds >= self.slow_call_seconds
+        epoch, is_probe = permit
+        with self._lock:
+            self._stats['calls'] += 1
+            self._stats['failures'] += int(failed)
+            self._stats['slow_calls'] += int(slow)
+
+            # Let through under an earlier state: counted, but not evidence
+            # about the backend as it is now
+            if epoch != self._epoch:
+                return
+
+            if self.state == self.HALF_OPEN:
+                if not is_probe:
+                    return
+                self._probe_in_flight = False
+                if failed or slow:
+                    self._trip(now, 'probe failed' if failed else 'probe slow')
+                else:
+                    self._set_state(self.CLOSED)
+                    self._outcomes.clear()
+                    print(f"🟢 {self.name} circuit closed")
+                return
+
+            if self.state != self.CLOSED:
+                return
+
+            self._outcomes.append((now, failed, slow))
+            while self._outcomes and now - self._outcomes[0][0] > self.window_seconds:
+                self._outcomes.popleft()
+
+            total = len(self._outcomes)
+            if total < self.min_calls:
+                return
+            failures = sum(1 for _, f, _ in self._outcomes if f)
+            slow_calls = sum(1 for _, _, s in self._outcomes if s)
+            if failures / total >= self.error_rate:
+                self._trip(now, f"error rate {failures}/{total}")
+            elif slow_calls / total >= self.slow_call_rate:
+                self._trip(now, f"slow calls {slow_calls}/{total}")
+
+    def _set_state(self, state):
+        self.state = state
+        self._epoch += 1
+
+    def _trip(self, now, reason):
+        self._set_state(self.OPEN)
+        self.opened_at = now
+        self.last_trip_reason = reason
+        self._outcomes.clear()
+        self._stats['trips'] += 1
+        print(f"🔴 {self.name} circuit open ({reason}), failing fast for {self.open_seconds:.0f}s")
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['state'] = self.state
+            stats['last_trip_reason'] = self.last_trip_reason
+            if self.state == self.OPEN:
+                stats['retry_in_seconds'] = round(max(0, self.opened_at + self.open_seconds - time.time()), 1)
+        return stats
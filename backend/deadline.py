@@ -0,0 +1,34 @@
+import os
+import time
+
+DEFAULT_PLAN_DEADLINE_SECONDS = float(os.environ.get('PLAN_DEADLINE_SECONDS', 20))
+MAX_PLAN_DEADLINE_SECONDS = float(os.environ.get('PLAN_MAX_DEADLINE_SECONDS', 60))
+# Budget for background cache refreshes, which outlive the request that triggered them
+REFRESH_DEADLINE_SECONDS = float(os.environ.get('PLAN_REFRESH_DEADLINE_SECONDS', DEFAULT_PLAN_DEADLINE_SECONDS))
+
+
+class Deadline:
+    """End-to-end time budget for one request, passed down through planning"""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+        # Set by any stage that gave up on work because the budget ran out
+        self.partial = False
+
+    @classmethod
+    def from_milliseconds(cls, milliseconds=None):
+        """Deadline from a client-supplied budget, defaulted and capped by the server"""
+        seconds = DEFAULT_PLAN_DEADLINE_SECONDS
+        if milliseconds is not None:
+            seconds = float(milliseconds) / 1000
+        return cls(min(max(seconds, 0), MAX_PLAN_DEADLINE_SECONDS))
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def mark_partial(self):
+        self.partial = True
@@ -0,0 +1,240 @@
+import math
+import os
+import random
+import threading
+from collections import OrderedDict
+
+# OTP mode combinations queried for a plan, with the category they are tagged as
+MODE_COMBINATIONS = [
+    # Public transit combinations
+    ('WALK,TRANSIT', 'all_transit'),
+    ('WALK,BUS', 'bus_only'),
+    ('WALK,RAIL', 'rail_only'),
+    ('WALK,SUBWAY', 'metro_only'),
+    ('WALK,BUS,RAIL', 'bus_rail_mix'),
+    ('WALK,BUS,SUBWAY', 'bus_metro_mix'),
+    ('WALK,RAIL,SUBWAY', 'rail_metro_mix'),
+
+    # Auto-rickshaw options
+    ('CAR', 'auto_direct'),
+    ('WALK,CAR', 'walk_auto_mix'),
+
+    # Mixed multimodal (auto + transit)
+    ('WALK,BUS,CAR', 'auto_bus_mix'),
+    ('WALK,RAIL,CAR', 'auto_rail_mix'),
+
+    # Walking options
+    ('WALK', 'walk_only'),
+]
+
+# Different optimization targets
+OPTIMIZATION_VARIANTS = [
+    {'optimize': 'QUICK', 'transferPenalty': 300},      # Fastest
+    {'optimize': 'TRANSFERS', 'transferPenalty': 1800}, # Fewest transfers
+    {'optimize': 'WALKING', 'transferPenalty': 600},    # Balanced
+]
+
+# Profile vehicle types to the OTP modes they allow
+ALLOWED_MODE_MAPPING = {
+    'walk': 'WALK',
+    'bus': 'BUS',
+    'train': 'RAIL',
+    'metro': 'SUBWAY',
+    'auto': 'CAR'
+}
+
+# Straight-line limits beyond which categorize_and_deduplicate_routes would
+# drop the result anyway (walks over 60 min, car-dominant trips over 20 min)
+MAX_WALK_ONLY_KM = 4
+MAX_AUTO_ONLY_KM = 8
+# Combos that only make sense if a suburban train ride helps the trip
+RAIL_CATEGORIES = ('rail_only', 'bus_rail_mix', 'rail_metro_mix', 'auto_rail_mix')
+# How far from each end we look for a rail or metro stop
+STOP_ACCESS_KM = 2
+
+RAIL_TYPES = ('WR', 'CR', 'HR', 'RAIL')
+
+# Per-variant corridor history: (attempts, survivals, awaiting an outcome)
+NO_HISTORY = (0, 0, False)
+
+
+def stop_kind(station):
+    """Coarse stop kind ('rail', 'metro' or None) from a station's type and name"""
+    station_type = (station.get('type') or '').upper()
+    name = (station.get('name') or '').lower()
+    if station_type in RAIL_TYPES or 'railway' in name or ' rly' in name:
+        return 'rail'
+    if station_type in ('METRO', 'SUBWAY') or 'metro' in name:
+        return 'metro'
+    return None
+
+
+def straight_line_km(origin, destination):
+    lat1, lng1, lat2, lng2 = map(math.radians, [origin['lat'], origin['lng'], destination['lat'], destination['lng']])
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * 6371 * math.asin(math.sqrt(a))
+
+
+class ModePlanner:
+    """Chooses which OTP mode combinations and optimize variants a plan is worth querying"""
+
+    def __init__(self, min_observations=None, exploration_rate=None, max_corridors=2048):
+        # A variant that never survived optimize_routes in this many attempts on
+        # a corridor is skipped there, except for occasional exploration calls
+        self.min_observations = min_observations or int(os.environ.get('PLANNER_MIN_OBSERVATIONS', 5))
+        self.exploration_rate = exploration_rate if exploration_rate is not None else float(os.environ.get('PLANNER_EXPLORATION_RATE', 0.1))
+        self.max_corridors = max_corridors
+
+        self._corridors = OrderedDict()
+        self._kinds_for = (None, set())
+        self._lock = threading.Lock()
+        self._stats = {
+            'plans': 0,
+            'variants_considered': 0,
+            'variants_planned': 0,
+            'calls_saved': 0,
+            'pruned_allowed_modes': 0,
+            'pruned_distance': 0,
+            'pruned_stop_types': 0,
+            'pruned_rail_network': 0,
+            'pruned_learned': 0
+        }
+
+    def corridor_key(self, origin, destination):
+        # ~1 km cells at both ends
+        return (
+            round(float(origin['lat']), 2), round(float(origin['lng']), 2),
+            round(float(destination['lat']), 2), round(float(destination['lng']), 2)
+        )
+
+    def _nearby_kinds(self, spatial_index, point):
+        return {
+            stop_kind(station)
+            for station, _ in spatial_index.within(point['lat'], point['lng'], STOP_ACCESS_KM)
+        }
+
+    def _skip_reason(self, modes, route_category, distance_km, allowed, kinds_known, kinds_both, rail_useful=True):
+        mode_set = set(modes.split(','))
+        if allowed is not None:
+            required = mode_set - {'WALK', 'TRANSIT'}
+            if not required.issubset(allowed):
+                return 'allowed_modes'
+            if 'TRANSIT' in mode_set and not allowed & {'BUS', 'RAIL', 'SUBWAY'}:
+                return 'allowed_modes'
+
+        if route_category == 'walk_only' and distance_km > MAX_WALK_ONLY_KM:
+            return 'distance'
+        if route_category in ('auto_direct', 'walk_auto_mix') and distance_km > MAX_AUTO_ONLY_KM:
+            return 'distance'
+
+        # Single-network combos need that network at both ends; only judged
+        # when the station set actually tells us where such stops are
+        if route_category == 'metro_only' and 'metro' in kinds_known and 'metro' not in kinds_both:
+            return 'stop_types'
+        if route_category == 'rail_only' and 'rail' in kinds_known and 'rail' not in kinds_both:
+            return 'stop_types'
+        # Both ends are best served by the same station: no train ride to take
+        if route_category in RAIL_CATEGORIES and not rail_useful:
+            return 'rail_network'
+        return None
+
+    def plan(self, origin, destination, spatial_index=None, allowed_modes=None, rail_network=None):
+        """List of (modes, route_category, variant) to send to OTP for this trip"""
+        distance_km = straight_line_km(origin, destination)
+
+        rail_useful = True
+        if rail_network is not None:
+            access, egress = rail_network.access_legs(origin, destination)
+            # Only judged where the local network covers both ends
+            if access and egress:
+                rail_useful = rail_network.corridor(access, egress) is not None
+
+        allowed = None
+        if allowed_modes:
+            allowed = {ALLOWED_MODE_MAPPING[m] for m in allowed_modes if m in ALLOWED_MODE_MAPPING}
+
+        kinds_known = set()
+        kinds_both = set()
+        if spatial_index is not None:
+            # Stop kinds present in the whole station set, worked out once per index
+            indexed, kinds_known = self._kinds_for
+            if indexed is not spatial_index:
+                kinds_known = {stop_kind(s) for s in spatial_index.stations if isinstance(s, dict)} - {None}
+                self._kinds_for = (spatial_index, kinds_known)
+            if kinds_known:
+                kinds_both = self._nearby_kinds(spatial_index, origin) & self._nearby_kinds(spatial_index, destination)
+
+        corridor = self.corridor_key(origin, destination)
+        with self._lock:
+            history = self._corridors.get(corridor, {})
+
+        planned = []
+        pruned = {}
+        for modes, route_category in MODE_COMBINATIONS:
+            reason = None
+            # The all-transit query is the quality baseline and always runs
+            if route_category != 'all_transit':
+                reason = self._skip_reason(modes, route_category, distance_km, allowed, kinds_known, kinds_both, rail_useful)
+
+            for variant in OPTIMIZATION_VARIANTS:
+                variant_reason = reason
+                if variant_reason is None and route_category != 'all_transit':
+                    attempts, survivals, _ = history.get((route_category, variant['optimize']), NO_HISTORY)
+                    if attempts >= self.min_observations and survivals == 0 and random.random() >= self.exploration_rate:
+                        variant_reason = 'learned'
+
+                if variant_reason:
+                    pruned[variant_reason] = pruned.get(variant_reason, 0) + 1
+                else:
+                    planned.append((modes, route_category, variant))
+
+        with self._lock:
+            total = len(MODE_COMBINATIONS) * len(OPTIMIZATION_VARIANTS)
+            self._stats['plans'] += 1
+            self._stats['variants_considered'] += total
+            self._stats['variants_planned'] += len(planned)
+            self._stats['calls_saved'] += total - len(planned)
+            for reason, count in pruned.items():
+                self._stats[f'pruned_{reason}'] += count
+
+        if pruned:
+            print(f"🧭 Planned {len(planned)}/{len(MODE_COMBINATIONS) * len(OPTIMIZATION_VARIANTS)} OTP variants (skipped: {pruned})")
+        return planned
+
+    def record_fetch(self, origin, destination, route_category, optimize):
+        """Count an attempt for a variant OTP just answered, with or without
+        itineraries; the next record_outcome on the corridor decides whether
+        it survived. Errors and timeouts are not attempts."""
+        corridor = self.corridor_key(origin, destination)
+        key = (route_category, optimize)
+        with self._lock:
+            history = self._corridors.setdefault(corridor, {})
+            self._corridors.move_to_end(corridor)
+            attempts, survivals, _ = history.get(key, NO_HISTORY)
+            history[key] = (attempts + 1, survivals, True)
+            while len(self._corridors) > self.max_corridors:
+                self._corridors.popitem(last=False)
+
+    def record_outcome(self, origin, destination, final_routes):
+        """Credit the freshly fetched variants whose itineraries made it into the
+        final route list; cached itineraries ranked again credit nothing"""
+        survived = set()
+        for route in final_routes:
+            raw_route = route.get('raw_route') if isinstance(route, dict) else None
+            if raw_route and '_category' in raw_route:
+                survived.add((raw_route['_category'], raw_route.get('_optimization')))
+
+        corridor = self.corridor_key(origin, destination)
+        with self._lock:
+            history = self._corridors.get(corridor)
+            if not history:
+                return
+            for key, (attempts, survivals, awaiting) in list(history.items()):
+                if awaiting:
+                    history[key] = (attempts, survivals + (key in survived), False)
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['corridors_tracked'] = len(self._corridors)
+        return stats
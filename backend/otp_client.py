@@ -0,0 +1,126 @@
+import os
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from circuit_breaker import CircuitOpenError
+
+
+class OTPClient:
+    """Shared, pooled HTTP client for all traffic to the OTP server"""
+
+    def __init__(self, base_url, pool_size=None, max_hosts=None, connect_timeout=None, read_timeout=None, breaker=None):
+        self.base_url = base_url.rstrip('/')
+        self.breaker = breaker
+        # Connections kept per OTP host; with pool_block the pool size is also
+        # the hard per-host limit on simultaneous requests
+        self.pool_size = pool_size or int(os.environ.get('OTP_POOL_SIZE', 16))
+        self.max_hosts = max_hosts or int(os.environ.get('OTP_POOL_HOSTS', 2))
+        self.connect_timeout = connect_timeout or float(os.environ.get('OTP_CONNECT_TIMEOUT', 3.05))
+        self.read_timeout = read_timeout or float(os.environ.get('OTP_READ_TIMEOUT', 30))
+
+        self.adapter = HTTPAdapter(
+            pool_connections=self.max_hosts,
+            pool_maxsize=self.pool_size,
+            pool_block=True,
+            max_retries=0
+        )
+        self.session = requests.Session()
+        self.session.headers.update({'Connection': 'keep-alive', 'Accept': 'application/json'})
+        self.session.mount('http://', self.adapter)
+        self.session.mount('https://', self.adapter)
+
+        self._lock = threading.Lock()
+        self._stats = {
+            'requests': 0,
+            'errors': 0,
+            'timeouts': 0,
+            'in_flight': 0,
+            'peak_in_flight': 0
+        }
+
+    def url(self, path):
+        """Resolve a router-relative path like '/plan' to a full OTP URL"""
+        if path.startswith('http://') or path.startswith('https://'):
+            return path
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def get(self, path, params=None, read_timeout=None):
+        """GET an OTP resource through the shared connection pool"""
+        return self.request('GET', path, params=params, read_timeout=read_timeout)
+
+    def post(self, path, json=None, read_timeout=None):
+        """POST to an OTP resource through the shared connection pool"""
+        return self.request('POST', path, json=json, read_timeout=read_timeout)
+
+    def request(self, method, path, read_timeout=None, **kwargs):
+        """Issue a request with separate connect and read timeouts"""
+        timeout = (self.connect_timeout, read_timeout or self.read_timeout)
+
+        permit = None
+        if self.breaker is not None:
+            permit = self.breaker.allow_request()
+            if permit is None:
+                raise CircuitOpenError(f"{self.breaker.name} circuit is open")
+
+        with self._lock:
+            self._stats['requests'] += 1
+            self._stats['in_flight'] += 1
+            self._stats['peak_in_flight'] = max(self._stats['peak_in_flight'], self._stats['in_flight'])
+
+        started = time.time()
+        failed = True
+        try:
+            response = self.session.request(method, self.url(path), timeout=timeout, **kwargs)
+            failed = response.status_code >= 500
+            return response
+        except requests.exceptions.Timeout:
+            # A read timeout shortened by the caller's own deadline says little
+            # about OTP health, only count it against the circuit if it was long
+            if self.breaker is not None:
+                failed = timeout[1] >= self.breaker.slow_call_seconds
+            with self._lock:
+                self._stats['timeouts'] += 1
+            raise
+        except requests.exceptions.RequestException:
+            with self._lock:
+                self._stats['errors'] += 1
+            raise
+        finally:
+            with self._lock:
+                self._stats['in_flight'] -= 1
+            if self.breaker is not None:
+                self.breaker.record(permit, time.time() - started, failed)
+
+    def get_stats(self):
+        """Report request counters plus per-host pool usage and connection reuse"""
+        with self._lock:
+            stats = dict(self._stats)
+
+        hosts = []
+        pools = self.adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            # urllib3 pre-fills the queue with placeholders, so anything not in
+            # the queue is currently checked out by a request
+            idle = pool.pool.qsize() if pool.pool is not None else 0
+            hosts.append({
+                'host': f"{pool.host}:{pool.port}",
+                'pool_size': self.pool_size,
+                'in_use': max(0, self.pool_size - idle),
+                'connections_opened': pool.num_connections,
+                'requests': pool.num_requests,
+                'connections_reused': max(0, pool.num_requests - pool.num_connections)
+            })
+
+        stats['pool_size'] = self.pool_size
+        stats['connect_timeout'] = self.connect_timeout
+        stats['read_timeout'] = self.read_timeout
+        stats['connections_opened'] = sum(h['connections_opened'] for h in hosts)
+        stats['connections_reused'] = sum(h['connections_reused'] for h in hosts)
+        stats['hosts'] = hosts
+        if self.breaker is not None:
+            stats['circuit'] = self.breaker.get_stats()
+        return stats
@@ -0,0 +1,129 @@
+import json
+
+# Fields requested per itinerary; mirrors what the REST plan response gives us
+ITINERARY_FIELDS = """
+    itineraries {
+      duration startTime endTime walkTime waitingTime walkDistance
+      legs {
+        mode startTime endTime duration distance headsign
+        from { name lat lon stop { gtfsId } }
+        to { name lat lon stop { gtfsId } }
+        route { gtfsId shortName longName }
+        trip { gtfsId tripShortName tripHeadsign }
+        agency { name }
+      }
+    }
+"""
+
+# OTP 2's plan query ignores `optimize`, so the REST variants are expressed
+# through the reluctance/penalty parameters that it does honour
+VARIANT_WALK_RELUCTANCE = {
+    'QUICK': 2,
+    'TRANSFERS': 2,
+    'WALKING': 4
+}
+
+
+def build_plan_document(origin, destination, now, variant_requests):
+    """One GraphQL document with an aliased `plan` query per variant.
+
+    Returns (query, aliases) where aliases maps each alias back to its
+    (modes, route_category, variant) request.
+    """
+    queries = []
+    aliases = {}
+    for number, (modes, route_category, variant) in enumerate(variant_requests):
+        alias = f"p{number}"
+        aliases[alias] = (modes, route_category, variant)
+        transport_modes = ', '.join(f"{{mode: {mode}}}" for mode in modes.split(','))
+        queries.append(
+            f"""  {alias}: plan(
+    from: {{lat: {origin['lat']}, lon: {origin['lng']}}}
+    to: {{lat: {destination['lat']}, lon: {destination['lng']}}}
+    date: {json.dumps(now.strftime('%Y-%m-%d'))}
+    time: {json.dumps(now.strftime('%H:%M'))}
+    transportModes: [{transport_modes}]
+    numItineraries: 2
+    arriveBy: false
+    walkReluctance: {VARIANT_WALK_RELUCTANCE.get(variant['optimize'], 2)}
+    waitReluctance: 1.5
+    walkSpeed: 1.3
+    transferPenalty: {variant['transferPenalty']}
+  ) {{{ITINERARY_FIELDS}  }}"""
+        )
+    return "{\n" + "\n".join(queries) + "\n}", aliases
+
+
+def convert_place(place):
+    place = place or {}
+    stop = place.get('stop') or {}
+    return {
+        'name': place.get('name'),
+        'lat': place.get('lat'),
+        'lon': place.get('lon'),
+        'stopId': stop.get('gtfsId')
+    }
+
+
+def convert_leg(leg):
+    """GraphQL leg to the REST leg shape used by the rest of the optimizer"""
+    route = leg.get('route') or {}
+    trip = leg.get('trip') or {}
+    agency = leg.get('agency') or {}
+    converted = {
+        'mode': leg.get('mode'),
+        'startTime': leg.get('startTime'),
+        'endTime': leg.get('endTime'),
+        'duration': leg.get('duration') or 0,
+        'distance': leg.get('distance') or 0,
+        'from': convert_place(leg.get('from')),
+        'to': convert_place(leg.get('to')),
+        'headsign': leg.get('headsign') or trip.get('tripHeadsign') or '',
+        'routeShortName': route.get('shortName') or '',
+        'routeLongName': route.get('longName') or '',
+        'routeId': route.get('gtfsId') or '',
+        'tripShortName': trip.get('tripShortName') or '',
+        'tripId': trip.get('gtfsId') or ''
+    }
+    if agency.get('name'):
+        converted['agencyName'] = agency['name']
+    return converted
+
+
+def convert_itinerary(itinerary):
+    """GraphQL itinerary to the REST itinerary shape"""
+    duration = itinerary.get('duration') or 0
+    walk_time = itinerary.get('walkTime') or 0
+    waiting_time = itinerary.get('waitingTime') or 0
+    return {
+        'duration': duration,
+        'startTime': itinerary.get('startTime'),
+        'endTime': itinerary.get('endTime'),
+        'walkTime': walk_time,
+        'waitingTime': waiting_time,
+        'transitTime': max(0, duration - walk_time - waiting_time),
+        'walkDistance': itinerary.get('walkDistance') or 0,
+        'legs': [convert_leg(leg) for leg in itinerary.get('legs') or []]
+    }
+
+
+def split_plan_response(payload, aliases):
+    """Tagged REST-shaped itineraries from a batched response, plus any GraphQL errors"""
+    data = payload.get('data') or {}
+    routes = []
+    for alias, (modes, route_category, variant) in aliases.items():
+        plan = data.get(alias) or {}
+        for itinerary in plan.get('itineraries') or []:
+            route = convert_itinerary(itinerary)
+            route['_category'] = route_category
+            route['_optimization'] = variant['optimize']
+            route['_mode_combo'] = modes
+            routes.append(route)
+    return routes, payload.get('errors') or []
+
+
+def answered_variants(payload, aliases):
+    """(modes, route_category, variant) of every alias OTP planned, with or without
+    itineraries; aliases that failed come back null"""
+    data = payload.get('data') or {}
+    return [request for alias, request in aliases.items() if data.get(alias) is not None]
@@ -0,0 +1,157 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_STORE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'otp_plans.sqlite3')
+
+
+class OTPResponseStore:
+    """SQLite store of raw OTP itineraries per plan variant, kept across restarts"""
+
+    def __init__(self, path=None, ttl_seconds=None, max_entries=None, bucket_minutes=None):
+        self.path = path if path is not None else os.environ.get('OTP_STORE_PATH', DEFAULT_STORE_PATH)
+        # Keys carry the service date, so an entry is only ever reused on the
+        # day its itineraries' absolute times belong to
+        self.ttl = ttl_seconds or float(os.environ.get('OTP_STORE_TTL', 24 * 3600))
+        self.max_entries = max_entries or int(os.environ.get('OTP_STORE_MAX_ENTRIES', 20000))
+        self.bucket_minutes = bucket_minutes or int(os.environ.get('OTP_STORE_BUCKET_MINUTES', 15))
+        # Expired and overflow rows are swept every this many writes
+        self.evict_every = 100
+
+        self._db = None
+        self._lock = threading.Lock()
+        self._writes_since_evict = 0
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'writes': 0,
+            'evictions': 0,
+            'errors': 0
+        }
+
+        if self.path:
+            try:
+                self._open()
+            except Exception as e:
+                print(f"⚠️  OTP response store disabled ({self.path}): {e}")
+                self._db = None
+
+    @property
+    def enabled(self):
+        return self._db is not None
+
+    def _open(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS plans ('
+            ' key TEXT PRIMARY KEY,'
+            ' itineraries TEXT NOT NULL,'
+            ' stored_at REAL NOT NULL)'
+        )
+        self._db.execute('CREATE INDEX IF NOT EXISTS plans_stored_at ON plans (stored_at)')
+
+    def make_key(self, origin, destination, modes, optimize, departure=None, precision=4):
+        """Key from rounded coordinates, mode combination, optimize variant,
+        service date and time-of-day bucket of a time.struct_time departure"""
+        departure = departure or time.localtime()
+        bucket = (departure.tm_hour * 60 + departure.tm_min) // self.bucket_minutes
+        return '|'.join([
+            f"{float(origin['lat']):.{precision}f},{float(origin['lng']):.{precision}f}",
+            f"{float(destination['lat']):.{precision}f},{float(destination['lng']):.{precision}f}",
+            modes,
+            optimize,
+            time.strftime('%Y-%m-%d', departure),
+            str(bucket)
+        ])
+
+    def get(self, key):
+        """Stored itineraries for key if younger than the TTL, else None"""
+        if not self.enabled:
+            return None
+        try:
+            with self._lock:
+                row = self._db.execute(
+                    'SELECT itineraries, stored_at FROM plans WHERE key = ?', (key,)
+                ).fetchone()
+                if row is None or time.time() - row[1] >= self.ttl:
+                    self._stats['misses'] += 1
+                    return None
+                self._stats['hits'] += 1
+            return json.loads(row[0])
+        except Exception as e:
+            self._record_error('read', e)
+            return None
+
+    def put(self, key, itineraries):
+        """Persist a variant's itineraries; empty results are not stored"""
+        if not self.enabled or not itineraries:
+            return
+        try:
+            payload = json.dumps(itineraries, separators=(',', ':'), default=str)
+            with self._lock:
+                self._db.execute(
+                    'INSERT OR REPLACE INTO plans (key, itineraries, stored_at) VALUES (?, ?, ?)',
+                    (key, payload, time.time())
+                )
+                self._stats['writes'] += 1
+                self._writes_since_evict += 1
+                if self._writes_since_evict >= self.evict_every:
+                    self._evict()
+        except Exception as e:
+            self._record_error('write', e)
+
+    def recent(self, limit):
+        """Up to limit unexpired (key, itineraries, stored_at), newest first, for warming memory caches"""
+        if not self.enabled or limit <= 0:
+            return []
+        try:
+            with self._lock:
+                rows = self._db.execute(
+                    'SELECT key, itineraries, stored_at FROM plans WHERE stored_at > ? '
+                    'ORDER BY stored_at DESC LIMIT ?',
+                    (time.time() - self.ttl, limit)
+                ).fetchall()
+            return [(key, json.loads(payload), stored_at) for key, payload, stored_at in rows]
+        except Exception as e:
+            self._record_error('read', e)
+            return []
+
+    def _evict(self):
+        # Caller holds the lock
+        self._writes_since_evict = 0
+        removed = self._db.execute(
+            'DELETE FROM plans WHERE stored_at <= ?', (time.time() - self.ttl,)
+        ).rowcount
+        count = self._db.execute('SELECT COUNT(*) FROM plans').fetchone()[0]
+        if count > self.max_entries:
+            removed += self._db.execute(
+                'DELETE FROM plans WHERE key IN '
+                '(SELECT key FROM plans ORDER BY stored_at ASC LIMIT ?)',
+                (count - self.max_entries,)
+            ).rowcount
+        self._stats['evictions'] += max(removed, 0)
+
+    def _record_error(self, operation, error):
+        print(f"❌ OTP response store {operation} failed: {error}")
+        with self._lock:
+            self._stats['errors'] += 1
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['enabled'] = self.enabled
+            if self.enabled:
+                try:
+                    stats['size'] = self._db.execute('SELECT COUNT(*) FROM plans').fetchone()[0]
+                except Exception:
+                    pass
+        stats['max_entries'] = self.max_entries
+        stats['ttl_seconds'] = self.ttl
+        return stats
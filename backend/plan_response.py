@@ -0,0 +1,93 @@
+# /api/plan response schemas: 1 is the original shape, where every route
+# carries its full OTP itinerary (raw_route) and its own copy of the
+# last-mile options; 2 is the compact shape, with last-mile options sent once
+# per response, raw itineraries only on request and optional field projection
+RESPONSE_SCHEMAS = (1, 2)
+DEFAULT_SCHEMA = 1
+
+# Route fields a schema 2 client can project with `fields`
+ROUTE_FIELDS = (
+    'route_id', 'route_type', 'duration', 'transfers', 'score', 'cost',
+    'fare_breakdown', 'eco_score', 'legs', 'start_time', 'end_time',
+    'walkTime', 'transitTime', 'waitingTime', 'waypoints', 'raw_route'
+)
+
+
+class PlanShape:
+    """How a plan request wants its routes serialized"""
+
+    def __init__(self, schema=DEFAULT_SCHEMA, fields=None, include_raw=False):
+        self.schema = schema
+        self.fields = fields
+        self.include_raw = include_raw
+
+    @classmethod
+    def from_request(cls, data):
+        """Parse schema, fields and include_raw from a plan request body; ValueError on bad input"""
+        try:
+            schema = int(data.get('schema', DEFAULT_SCHEMA))
+        except (TypeError, ValueError):
+            raise ValueError(f"schema must be one of {list(RESPONSE_SCHEMAS)}")
+        if schema not in RESPONSE_SCHEMAS:
+            raise ValueError(f"schema must be one of {list(RESPONSE_SCHEMAS)}")
+
+        fields = data.get('fields')
+        if fields is not None:
+            if isinstance(fields, str):
+                fields = [field.strip() for field in fields.split(',') if field.strip()]
+            if not isinstance(fields, list) or not all(isinstance(field, str) for field in fields):
+                raise ValueError("fields must be a list or comma-separated string of route fields")
+            unknown = [field for field in fields if field not in ROUTE_FIELDS]
+            if unknown:
+                raise ValueError(f"Unknown route fields {unknown}; choose from {list(ROUTE_FIELDS)}")
+            if schema == 1:
+                raise ValueError("fields requires schema 2")
+            # The id is what clients key routes by, so it is always sent
+            fields = ['route_id'] + [field for field in fields if field != 'route_id']
+
+        include_raw = bool(data.get('include_raw', False)) or bool(fields and 'raw_route' in fields)
+        return cls(schema, fields, include_raw)
+
+    def shape_route(self, route):
+        """A route as this shape sends it"""
+        if self.schema == 1:
+            return route
+
+        shaped = {key: value for key, value in route.items() if key not in ('raw_route', 'last_mile')}
+        raw_route = route.get('raw_route')
+        if raw_route is not None:
+            if self.include_raw:
+                shaped['raw_route'] = raw_route
+            if not self.include_raw or 'waypoints' in (self.fields or ()):
+                # Leg end points are all the map needs from the itinerary
+                shaped['waypoints'] = waypoints(raw_route)
+
+        if self.fields:
+            shaped = {field: shaped[field] for field in self.fields if field in shaped}
+        return shaped
+
+    def shape(self, payload, routes, last_mile=None):
+        """Response payload with routes (and last-mile options) laid out for this schema"""
+        if self.schema == 1:
+            payload['routes'] = routes
+            return payload
+
+        payload['schema'] = self.schema
+        payload['routes'] = [self.shape_route(route) for route in routes]
+        if last_mile is not None:
+            payload['last_mile'] = last_mile
+        return payload
+
+
+def waypoints(raw_route):
+    """[[lat, lon], ...] of every leg's end points in travel order, rounded to ~1 m,
+    with the shared point between consecutive legs sent once"""
+    points = []
+    for leg in raw_route.get('legs', []):
+        for place in (leg.get('from'), leg.get('to')):
+            if not place or place.get('lat') is None or place.get('lon') is None:
+                continue
+            point = [round(place['lat'], 5), round(place['lon'], 5)]
+            if not points or points[-1] != point:
+                points.append(point)
+    return points
@@ -0,0 +1,86 @@
+import numpy as np
+
+FARE_CLASSES = ('2nd', '1st', 'AC')
+
+# Single-journey suburban fare slabs by track distance:
+# (up to km, 2nd class, 1st class, AC local) in INR
+FARE_SLABS = [
+    (5, 5, 20, 35),
+    (10, 5, 35, 50),
+    (15, 10, 50, 65),
+    (20, 10, 60, 75),
+    (30, 15, 75, 85),
+    (35, 15, 85, 95),
+    (50, 20, 95, 105),
+    (70, 25, 105, 115),
+    (float('inf'), 30, 120, 130)
+]
+
+
+class RailFares:
+    """Station x station fare matrix for every class, from shortest track distance
+    over the rail graph with the hand-checked fare_zones laid on top"""
+
+    def __init__(self, graph, train_fares):
+        self.graph = graph
+
+        # Each distinct fare is one shared dict; the matrix holds its index,
+        # so a lookup is a couple of list reads and allocates nothing
+        self.table = []
+        table_ids = {}
+
+        def fare_id(fares):
+            key = tuple(fares[fare_class] for fare_class in FARE_CLASSES)
+            if key not in table_ids:
+                table_ids[key] = len(self.table)
+                self.table.append(dict(zip(FARE_CLASSES, key)))
+            return table_ids[key]
+
+        limits = np.array([slab[0] for slab in FARE_SLABS])
+        slab_ids = np.array([fare_id(dict(zip(FARE_CLASSES, slab[1:]))) for slab in FARE_SLABS], dtype=np.int16)
+        self.index = slab_ids[np.searchsorted(limits, graph.shortest_km, side='left')]
+
+        # Known station-pair fares win over the slab estimate, both directions
+        self.overrides = 0
+        for line, line_data in train_fares.items():
+            for (from_name, to_name), fares in line_data.get('fare_zones', {}).items():
+                a = graph.station_id(from_name)
+                b = graph.station_id(to_name)
+                if a is None or b is None:
+                    continue
+                self.index[a, b] = self.index[b, a] = fare_id(fares)
+                self.overrides += 1
+
+        # Nested lists of small ints index faster than numpy scalars and
+        # hand back cached int objects
+        self.rows = self.index.tolist()
+
+        # Stations in the line lists that the rail graph does not know
+        self.unmatched = sorted({
+            name
+            for line, line_data in train_fares.items()
+            for name in line_data.get('stations', [])
+            if graph.station_id(name) is None
+        })
+        if self.unmatched:
+            print(f"⚠️  No fare distances for stations: {self.unmatched}")
+
+    def station_id(self, name):
+        return self.graph.station_id(name)
+
+    def lookup(self, from_name, to_name):
+        """Fares by class between two named stations, or None if either is off the network;
+        the dict is shared, do not modify it"""
+        from_id = self.graph.station_id(from_name)
+        to_id = self.graph.station_id(to_name)
+        if from_id is None or to_id is None:
+            return None
+        return self.table[self.rows[from_id][to_id]]
+
+    def get_stats(self):
+        return {
+            'stations': len(self.graph),
+            'distinct_fares': len(self.table),
+            'overrides': self.overrides,
+            'matrix_bytes': int(self.index.nbytes)
+        }
@@ -0,0 +1,175 @@
+import heapq
+import numpy as np
+from station_names import StationNames
+
+
+class RailGraph:
+    """Station/line graph of the suburban network with all-pairs journey
+    time, transfer count and track distance precomputed into dense matrices.
+
+    km is the distance ridden on the quickest journey; shortest_km is the
+    shortest track distance, which is what suburban fares are charged on.
+    """
+
+    def __init__(self, network):
+        self.network = network
+        self.names = network.names
+        n = len(self.names)
+
+        # One node per (station, line); the reverse-direction patterns share
+        # their line's track, so only the first pattern per line is used
+        self.lines = []
+        self.headways = []
+        node_ids = {}
+        station_nodes = [[] for _ in range(n)]
+        edges = []
+        for pattern in network.patterns:
+            if pattern.line in self.lines:
+                continue
+            line = len(self.lines)
+            self.lines.append(pattern.line)
+            self.headways.append(pattern.headway)
+            previous = None
+            for index, station in enumerate(pattern.stops):
+                node = node_ids[(station, line)] = len(node_ids)
+                station_nodes[station].append(node)
+                edges.append([])
+                if previous is not None:
+                    minutes = pattern.offsets[index] - pattern.offsets[index - 1]
+                    km = abs(pattern.km[index] - pattern.km[index - 1])
+                    edges[previous].append((node, minutes, 0, km))
+                    edges[node].append((previous, minutes, 0, km))
+                previous = node
+
+        self.node_station = [0] * len(node_ids)
+        self.node_line = [0] * len(node_ids)
+        self.station_lines = [[] for _ in range(n)]
+        for (station, line), node in node_ids.items():
+            self.node_station[node] = station
+            self.node_line[node] = line
+            self.station_lines[station].append(self.lines[line])
+
+        # Changing line at a station costs the walk between platforms plus
+        # the expected wait (half a headway) for the next train
+        for station, nodes in enumerate(station_nodes):
+            change = network.transfer_minutes(station)
+            for a in nodes:
+                for b in nodes:
+                    if a != b:
+                        edges[a].append((b, change + self.headways[self.node_line[b]] / 2, 1, 0.0))
+
+        self.minutes = np.full((n, n), np.inf, dtype=np.float32)
+        self.transfers = np.full((n, n), -1, dtype=np.int8)
+        self.km = np.full((n, n), np.inf, dtype=np.float32)
+        for origin in range(n):
+            self._shortest_paths(origin, station_nodes[origin], edges)
+
+        # Track between neighbouring stations, whichever line lays it
+        tracks = [{} for _ in range(n)]
+        for node, node_edges in enumerate(edges):
+            a = self.node_station[node]
+            for target, _, changes, distance in node_edges:
+                b = self.node_station[target]
+                if not changes and distance < tracks[a].get(b, float('inf')):
+                    tracks[a][b] = distance
+        self.shortest_km = np.array([self._shortest_km(origin, tracks) for origin in range(n)], dtype=np.float32)
+
+        # Station ids for any spelling, memoized per raw name
+        self.canonical = StationNames(self.names)
+
+    def _shortest_paths(self, origin, sources, edges):
+        """Dijkstra from every line at origin, ordered by (minutes, transfers)"""
+        n = len(self.names)
+        minutes_row = [float('inf')] * n
+        transfers_row = [-1] * n
+        km_row = [float('inf')] * n
+        settled = [False] * len(self.node_station)
+        queue = [(self.headways[self.node_line[node]] / 2, 0, 0.0, node) for node in sources]
+        heapq.heapify(queue)
+        while queue:
+            minutes, transfers, km, node = heapq.heappop(queue)
+            if settled[node]:
+                continue
+            settled[node] = True
+
+            # The first line settled at a station is its best arrival
+            station = self.node_station[node]
+            if transfers_row[station] < 0:
+                minutes_row[station] = minutes
+                transfers_row[station] = transfers
+                km_row[station] = km
+
+            for target, cost, changes, distance in edges[node]:
+                if not settled[target]:
+                    heapq.heappush(queue, (minutes + cost, transfers + changes, km + distance, target))
+
+        minutes_row[origin] = transfers_row[origin] = km_row[origin] = 0
+        self.minutes[origin] = minutes_row
+        self.transfers[origin] = transfers_row
+        self.km[origin] = km_row
+
+    def _shortest_km(self, origin, tracks):
+        """Dijkstra over station-to-station track distance, ignoring lines"""
+        km_row = [float('inf')] * len(self.names)
+        queue = [(0.0, origin)]
+        while queue:
+            km, station = heapq.heappop(queue)
+            if km >= km_row[station]:
+                continue
+            km_row[station] = km
+            for target, distance in tracks[station].items():
+                if km + distance < km_row[target]:
+                    heapq.heappush(queue, (km + distance, target))
+        return km_row
+
+    def __len__(self):
+        return len(self.names)
+
+    def station_id(self, name):
+        """Graph id for a station name in any known spelling; None if not on the network"""
+        return self.canonical.resolve(name)
+
+    def lookup(self, from_name, to_name):
+        """{'minutes', 'transfers', 'km'} between two named stations, or None"""
+        origin = self.station_id(from_name)
+        destination = self.station_id(to_name)
+        if origin is None or destination is None:
+            return None
+        return {
+            'minutes': float(self.minutes[origin, destination]),
+            'transfers': int(self.transfers[origin, destination]),
+            'km': float(self.km[origin, destination])
+        }
+
+    def line_between(self, from_name, to_name):
+        """Line ('WR', 'CR' or 'HR') serving both stations without a change, or None"""
+        origin = self.station_id(from_name)
+        destination = self.station_id(to_name)
+        if origin is None or destination is None:
+            return None
+        for line in self.station_lines[origin]:
+            if line in self.station_lines[destination]:
+                return line.split('-')[0]
+        return None
+
+    def best_pair(self, access, egress):
+        """Best (minutes, from_station, to_station) given {station: minutes} to reach
+        stations near the origin and from stations near the destination, or None"""
+        if not access or not egress:
+            return None
+        origins = np.fromiter(access, dtype=np.intp)
+        destinations = np.fromiter(egress, dtype=np.intp)
+        total = (
+            self.minutes[np.ix_(origins, destinations)]
+            + np.fromiter(access.values(), dtype=np.float32)[:, None]
+            + np.fromiter(egress.values(), dtype=np.float32)[None, :]
+        )
+        row, column = np.unravel_index(np.argmin(total), total.shape)
+        return float(total[row, column]), int(origins[row]), int(destinations[column])
+
+    def get_stats(self):
+        return {
+            'stations': len(self.names),
+            'lines': list(self.lines),
+            'matrix_bytes': int(self.minutes.nbytes + self.transfers.nbytes + self.km.nbytes + self.shortest_km.nbytes)
+        }
@@ -0,0 +1,486 @@
+import math
+from datetime import datetime, timedelta
+from rail_graph import RailGraph
+
+# Suburban lines as (station, chainage km from the first station, lat, lng).
+# A station appearing on several lines is one node; that is where lines meet.
+RAIL_LINES = {
+    'WR': {
+        'long_name': 'Western Railway Local',
+        'headway': 4,            # minutes between trains, each direction
+        'minutes_per_km': 1.65,  # slow local including dwell time
+        'stations': [
+            ('Churchgate', 0.0, 18.9322, 72.8264),
+            ('Marine Lines', 1.3, 18.9456, 72.8239),
+            ('Charni Road', 2.2, 18.9539, 72.8200),
+            ('Grant Road', 3.2, 18.9633, 72.8152),
+            ('Mumbai Central', 4.2, 18.9686, 72.8181),
+            ('Mahalaxmi', 5.9, 18.9827, 72.8186),
+            ('Lower Parel', 7.3, 18.9969, 72.8331),
+            ('Prabhadevi', 8.4, 19.0041, 72.8339),
+            ('Dadar', 10.2, 19.0178, 72.8478),
+            ('Matunga Road', 11.0, 19.0270, 72.8460),
+            ('Mahim', 12.1, 19.0411, 72.8411),
+            ('Bandra', 15.0, 19.0544, 72.8406),
+            ('Khar Road', 16.2, 19.0689, 72.8372),
+            ('Santacruz', 17.8, 19.0822, 72.8386),
+            ('Vile Parle', 19.6, 19.0989, 72.8469),
+            ('Andheri', 21.9, 19.1197, 72.8469),
+            ('Jogeshwari', 24.0, 19.1365, 72.8489),
+            ('Ram Mandir', 25.4, 19.1510, 72.8500),
+            ('Goregaon', 26.6, 19.1646, 72.8493),
+            ('Malad', 29.5, 19.1870, 72.8486),
+            ('Kandivali', 31.5, 19.2046, 72.8516),
+            ('Borivali', 34.0, 19.2290, 72.8570),
+            ('Dahisar', 36.3, 19.2500, 72.8596),
+            ('Mira Road', 40.2, 19.2812, 72.8557),
+            ('Bhayandar', 43.4, 19.3108, 72.8519),
+            ('Naigaon', 48.2, 19.3513, 72.8464),
+            ('Vasai Road', 51.8, 19.3830, 72.8320),
+            ('Nallasopara', 55.6, 19.4190, 72.8190),
+            ('Virar', 59.9, 19.4559, 72.8114)
+        ]
+    },
+    'CR': {
+        'long_name': 'Central Railway Main Line Local',
+        'headway': 4,
+        'minutes_per_km': 1.6,
+        'stations': [
+            ('CSMT', 0.0, 18.9398, 72.8355),
+            ('Masjid', 1.1, 18.9517, 72.8382),
+            ('Sandhurst Road', 2.0, 18.9614, 72.8393),
+            ('Byculla', 3.6, 18.9795, 72.8335),
+            ('Chinchpokli', 4.5, 18.9866, 72.8329),
+            ('Currey Road', 5.4, 18.9941, 72.8331),
+            ('Parel', 6.6, 19.0086, 72.8376),
+            ('Dadar', 9.0, 19.0178, 72.8478),
+            ('Matunga', 10.2, 19.0274, 72.8553),
+            ('Sion', 11.5, 19.0470, 72.8630),
+            ('Kurla', 15.2, 19.0653, 72.8793),
+            ('Vidyavihar', 17.1, 19.0792, 72.8970),
+            ('Ghatkopar', 19.4, 19.0864, 72.9081),
+            ('Vikhroli', 23.0, 19.1117, 72.9282),
+            ('Kanjurmarg', 25.2, 19.1294, 72.9282),
+            ('Bhandup', 26.6, 19.1440, 72.9376),
+            ('Nahur', 28.3, 19.1544, 72.9466),
+            ('Mulund', 30.9, 19.1717, 72.9560),
+            ('Thane', 34.0, 19.1863, 72.9758),
+            ('Kalwa', 36.3, 19.1955, 72.9962),
+            ('Mumbra', 40.0, 19.1904, 73.0230),
+            ('Diva', 42.4, 19.1870, 73.0437),
+            ('Kopar', 46.0, 19.2110, 73.0804),
+            ('Dombivli', 47.9, 19.2183, 73.0866),
+            ('Thakurli', 49.4, 19.2251, 73.0980),
+            ('Kalyan', 53.2, 19.2354, 73.1300),
+            ('Vithalwadi', 55.3, 19.2325, 73.1490),
+            ('Ulhasnagar', 57.3, 19.2186, 73.1630),
+            ('Ambernath', 60.7, 19.2094, 73.1855)
+        ]
+    },
+    'HR': {
+        'long_name': 'Harbour Line Local (CSMT - Panvel)',
+        'headway': 6,
+        'minutes_per_km': 1.65,
+        'stations': [
+            ('CSMT', 0.0, 18.9398, 72.8355),
+            ('Masjid', 1.1, 18.9517, 72.8382),
+            ('Sandhurst Road', 2.0, 18.9614, 72.8393),
+            ('Dockyard Road', 3.5, 18.9659, 72.8445),
+            ('Reay Road', 4.3, 18.9770, 72.8446),
+            ('Cotton Green', 5.2, 18.9862, 72.8437),
+            ('Sewri', 6.6, 18.9985, 72.8546),
+            ('Wadala', 8.2, 19.0166, 72.8590),
+            ('GTB Nagar', 9.9, 19.0378, 72.8640),
+            ('Chunabhatti', 11.2, 19.0517, 72.8694),
+            ('Kurla', 13.2, 19.0653, 72.8793),
+            ('Tilak Nagar', 14.6, 19.0670, 72.8907),
+            ('Chembur', 15.8, 19.0622, 72.9008),
+            ('Govandi', 17.5, 19.0553, 72.9152),
+            ('Mankhurd', 19.5, 19.0481, 72.9320),
+            ('Vashi', 24.9, 19.0633, 72.9986),
+            ('Sanpada', 26.3, 19.0620, 73.0116),
+            ('Juinagar', 27.8, 19.0524, 73.0184),
+            ('Nerul', 30.5, 19.0330, 73.0180),
+            ('Seawoods', 32.3, 19.0218, 73.0190),
+            ('Belapur', 35.1, 19.0189, 73.0386),
+            ('Kharghar', 38.3, 19.0265, 73.0595),
+            ('Mansarovar', 41.0, 19.0166, 73.0805),
+            ('Khandeshwar', 42.4, 19.0079, 73.0943),
+            ('Panvel', 48.9, 18.9910, 73.1210)
+        ]
+    },
+    'HR-W': {
+        'long_name': 'Harbour Line Local (CSMT - Goregaon)',
+        'headway': 12,
+        'minutes_per_km': 1.7,
+        'stations': [
+            ('CSMT', 0.0, 18.9398, 72.8355),
+            ('Masjid', 1.1, 18.9517, 72.8382),
+            ('Sandhurst Road', 2.0, 18.9614, 72.8393),
+            ('Dockyard Road', 3.5, 18.9659, 72.8445),
+            ('Reay Road', 4.3, 18.9770, 72.8446),
+            ('Cotton Green', 5.2, 18.9862, 72.8437),
+            ('Sewri', 6.6, 18.9985, 72.8546),
+            ('Wadala', 8.2, 19.0166, 72.8590),
+            ('King Circle', 9.8, 19.0289, 72.8572),
+            ('Mahim', 11.7, 19.0411, 72.8411),
+            ('Bandra', 13.6, 19.0544, 72.8406),
+            ('Khar Road', 14.8, 19.0689, 72.8372),
+            ('Santacruz', 16.4, 19.0822, 72.8386),
+            ('Vile Parle', 18.2, 19.0989, 72.8469),
+            ('Andheri', 20.5, 19.1197, 72.8469),
+            ('Jogeshwari', 22.6, 19.1365, 72.8489),
+            ('Ram Mandir', 24.0, 19.1510, 72.8500),
+            ('Goregaon', 25.2, 19.1646, 72.8493)
+        ]
+    }
+}
+
+# Minutes to change trains at a station; junctions between lines on
+# different platforms or sides of the station take longer
+TRANSFER_MINUTES = {
+    'Dadar': 6,
+    'Kurla': 5,
+    'Andheri': 4,
+    'Bandra': 4,
+    'Mahim': 3,
+    'Wadala': 2,
+    'CSMT': 3
+}
+DEFAULT_TRANSFER_MINUTES = 3
+
+# Trains run from 04:00 to 01:00 the next morning
+FIRST_DEPARTURE = 4 * 60
+LAST_DEPARTURE = 25 * 60
+MINUTES_PER_DAY = 24 * 60
+
+# Getting to and from the nearest stations
+ACCESS_RADIUS_KM = 4
+ACCESS_STATIONS = 4
+MAX_WALK_KM = 1.2
+WALK_KM_PER_MIN = 0.078    # 1.3 m/s
+AUTO_KM_PER_MIN = 0.3      # 18 km/h in traffic
+AUTO_PICKUP_MINUTES = 5
+DETOUR_FACTOR = 1.3
+
+MAX_ROUNDS = 4
+
+
+def line_stations(*lines):
+    """Station names along the given lines, in line order without repeats"""
+    return list(dict.fromkeys(name for line in lines for name, _, _, _ in RAIL_LINES[line]['stations']))
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(math.radians, [lat1, lng1, lat2, lng2])
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * 6371 * math.asin(math.sqrt(a))
+
+
+class RailPattern:
+    """One line in one direction: its stops, minutes from the first stop and headway"""
+
+    __slots__ = ('line', 'long_name', 'stops', 'offsets', 'km', 'headway', 'terminal')
+
+    def __init__(self, line, long_name, stops, offsets, km, headway):
+        self.line = line
+        self.long_name = long_name
+        self.stops = stops
+        self.offsets = offsets
+        self.km = km
+        self.headway = headway
+        self.terminal = stops[-1]
+
+    def next_trip(self, stop_index, ready):
+        """Departure time from the pattern's first stop of the earliest train leaving
+        stop_index at or after `ready` (minutes after midnight), or None.
+
+        Before the first train of the day the previous service day's late
+        trains may still be running; those come back as negative minutes.
+        """
+        start = ready - self.offsets[stop_index]
+        if start < FIRST_DEPARTURE:
+            trip = self._first_trip_from(start + MINUTES_PER_DAY)
+            return FIRST_DEPARTURE if trip is None else trip - MINUTES_PER_DAY
+        return self._first_trip_from(start)
+
+    def _first_trip_from(self, start):
+        """First departure at or after start on one service day, or None after the last train"""
+        trip = FIRST_DEPARTURE + max(0, math.ceil((start - FIRST_DEPARTURE) / self.headway)) * self.headway
+        return trip if trip <= LAST_DEPARTURE else None
+
+
+class RailNetwork:
+    """Headway-based model of the suburban lines, routed in-process with RAPTOR"""
+
+    def __init__(self, lines=None):
+        lines = lines or RAIL_LINES
+        self.names = []
+        self.coordinates = []
+        self.station_ids = {}
+        self.patterns = []
+
+        for line, data in lines.items():
+            stops = []
+            for name, _, lat, lng in data['stations']:
+                if name not in self.station_ids:
+                    self.station_ids[name] = len(self.names)
+                    self.names.append(name)
+                    self.coordinates.append((lat, lng))
+                stops.append(self.station_ids[name])
+            km = [chainage for _, chainage, _, _ in data['stations']]
+            rate = data['minutes_per_km']
+
+            forward = [(k - km[0]) * rate for k in km]
+            backward = [(km[-1] - k) * rate for k in reversed(km)]
+            self.patterns.append(RailPattern(line, data['long_name'], stops, forward, km, data['headway']))
+            self.patterns.append(RailPattern(line, data['long_name'], stops[::-1], backward, km[::-1], data['headway']))
+
+        # station -> [(pattern, index of the station in it)]
+        self.serving = [[] for _ in self.names]
+        for pattern in self.patterns:
+            for index, station in enumerate(pattern.stops):
+                self.serving[station].append((pattern, index))
+
+        # All-pairs time, transfers and distance for constant-time estimates
+        self.graph = RailGraph(self)
+
+    def __len__(self):
+        return len(self.names)
+
+    def transfer_minutes(self, station):
+        return TRANSFER_MINUTES.get(self.names[station], DEFAULT_TRANSFER_MINUTES)
+
+    def nearest_stations(self, lat, lng, limit=ACCESS_STATIONS, radius_km=ACCESS_RADIUS_KM):
+        """[(station, km)] closest first within radius_km"""
+        found = []
+        for station, (station_lat, station_lng) in enumerate(self.coordinates):
+            distance = haversine_km(lat, lng, station_lat, station_lng)
+            if distance <= radius_km:
+                found.append((distance, station))
+        return [(station, distance) for distance, station in sorted(found)[:limit]]
+
+    def access_leg(self, distance_km):
+        """(mode, minutes, metres) to cover a station access distance on foot or by auto"""
+        metres = distance_km * DETOUR_FACTOR * 1000
+        if distance_km <= MAX_WALK_KM:
+            return 'WALK', distance_km * DETOUR_FACTOR / WALK_KM_PER_MIN, metres
+        return 'CAR', AUTO_PICKUP_MINUTES + distance_km * DETOUR_FACTOR / AUTO_KM_PER_MIN, metres
+
+    def raptor(self, sources, max_rounds=MAX_ROUNDS, targets=None):
+        """Round-based earliest arrival from {station: ready minute}.
+
+        Returns (arrivals, parents): arrivals[k][station] is the earliest
+        arrival using at most k trains, parents[k][station] the
+        (pattern, board_index, alight_index, trip) of the train that got there
+        in round k. targets {station: egress minutes} prune labels that can no
+        longer beat the best arrival at the destination.
+        """
+        best = dict(sources)
+        arrivals = [dict(sources)]
+        parents = [{}]
+        marked = set(sources)
+        best_target = math.inf
+
+        for round_number in range(1, max_rounds + 1):
+            previous = arrivals[-1]
+            current = dict(previous)
+            parent = {}
+
+            # First marked stop of each pattern: the rest of it is scanned from there
+            queue = {}
+            for station in marked:
+                for pattern, index in self.serving[station]:
+                    if index < queue.get(pattern, math.inf):
+                        queue[pattern] = index
+
+            marked = set()
+            for pattern, start in queue.items():
+                trip = None
+                board = None
+                for index in range(start, len(pattern.stops)):
+                    station = pattern.stops[index]
+
+                    if trip is not None:
+                        arrival = trip + pattern.offsets[index]
+                        if arrival < min(best.get(station, math.inf), best_target):
+                            current[station] = arrival
+                            best[station] = arrival
+                            parent[station] = (pattern, board, index, trip)
+                            marked.add(station)
+
+                    if station in previous:
+                        ready = previous[station]
+                        if ready != sources.get(station):
+                            # Got here on another train: allow time to change
+                            ready += self.transfer_minutes(station)
+                        candidate = pattern.next_trip(index, ready)
+                        if candidate is not None and (trip is None or candidate < trip):
+                            trip = candidate
+                            board = index
+
+            arrivals.append(current)
+            parents.append(parent)
+            if targets:
+                for station, egress in targets.items():
+                    if station in current:
+                        best_target = min(best_target, current[station] + egress)
+            if not marked:
+                break
+
+        return arrivals, parents
+
+    def access_legs(self, origin, destination):
+        """{station: (km, mode, minutes, metres)} for stations near each end of a trip"""
+        access = {}
+        for station, distance in self.nearest_stations(origin['lat'], origin['lng']):
+            access[station] = (distance,) + self.access_leg(distance)
+        egress = {}
+        for station, distance in self.nearest_stations(destination['lat'], destination['lng']):
+            egress[station] = (distance,) + self.access_leg(distance)
+        return access, egress
+
+    def corridor(self, access, egress):
+        """Expected door-to-door (minutes, board station, alight station) by rail from
+        the precomputed matrix, or None when rail cannot help (no station in reach,
+        or the best plan is to get off where you got on)"""
+        best = self.graph.best_pair(
+            {station: leg[2] for station, leg in access.items()},
+            {station: leg[2] for station, leg in egress.items()}
+        )
+        if best is None or best[1] == best[2]:
+            return None
+        return best
+
+    def plan(self, origin, destination, departure=None, max_itineraries=3):
+        """OTP-shaped itineraries between two {'lat', 'lng'} points, fewest trains first"""
+        departure = departure or datetime.now()
+        midnight = departure.replace(hour=0, minute=0, second=0, microsecond=0)
+        depart_minute = (departure - midnight).total_seconds() / 60
+
+        access, egress = self.access_legs(origin, destination)
+        corridor = self.corridor(access, egress)
+        if corridor is None:
+            return []
+        _, first_station, last_station = corridor
+        # Journeys needing far more changes than the best one never win
+        max_rounds = min(MAX_ROUNDS, int(self.graph.transfers[first_station, last_station]) + 2)
+
+        sources = {station: depart_minute + leg[2] for station, leg in access.items()}
+        targets = {station: leg[2] for station, leg in egress.items()}
+        arrivals, parents = self.raptor(sources, max_rounds, targets)
+
+        # Keep a journey only if it arrives earlier than every one with fewer trains
+        journeys = []
+        best_arrival = math.inf
+        for round_number in range(1, len(arrivals)):
+            reached = [
+                (arrivals[round_number][station] + targets[station], station)
+                for station in targets
+                if arrivals[round_number].get(station, sources.get(station)) != sources.get(station)
+            ]
+            if not reached:
+                continue
+            arrival, station = min(reached)
+            if arrival < best_arrival - 0.5:
+                best_arrival = arrival
+                journeys.append((round_number, station))
+
+        itineraries = []
+        for round_number, station in journeys[:max_itineraries]:
+            rides = self._rides(parents, round_number, station)
+            if rides:
+                itineraries.append(self._itinerary(rides, origin, destination, access, egress, depart_minute, midnight))
+        return itineraries
+
+    def _rides(self, parents, round_number, station):
+        """Trains taken to reach station within round_number rounds, in travel order"""
+        rides = []
+        while round_number > 0:
+            if station not in parents[round_number]:
+                round_number -= 1
+                continue
+            pattern, board, alight, trip = parents[round_number][station]
+            rides.append((pattern, board, alight, trip))
+            station = pattern.stops[board]
+            round_number -= 1
+        rides.reverse()
+        return rides
+
+    def _place(self, station=None, point=None, name=None):
+        if station is not None:
+            lat, lng = self.coordinates[station]
+            return {'name': self.names[station], 'lat': lat, 'lon': lng, 'stopId': f"rail:{self.names[station]}"}
+        return {'name': name, 'lat': point['lat'], 'lon': point['lng']}
+
+    def _itinerary(self, rides, origin, destination, access, egress, depart_minute, midnight):
+        def epoch_ms(minute):
+            return int((midnight + timedelta(minutes=minute)).timestamp() * 1000)
+
+        legs = []
+        walk_seconds = 0
+        walk_metres = 0
+
+        def add_access_leg(mode, start, minutes, metres, from_place, to_place):
+            nonlocal walk_seconds, walk_metres
+            if metres < 50:
+                return
+            if mode == 'WALK':
+                walk_seconds += minutes * 60
+                walk_metres += metres
+            legs.append({
+                'mode': mode,
+                'startTime': epoch_ms(start),
+                'endTime': epoch_ms(start + minutes),
+                'duration': minutes * 60,
+                'distance': metres,
+                'from': from_place,
+                'to': to_place
+            })
+
+        first_station = rides[0][0].stops[rides[0][1]]
+        _, mode, minutes, metres = access[first_station]
+        add_access_leg(mode, depart_minute, minutes, metres, self._place(point=origin, name='Origin'), self._place(first_station))
+
+        transit_seconds = 0
+        for pattern, board, alight, trip in rides:
+            start = trip + pattern.offsets[board]
+            end = trip + pattern.offsets[alight]
+            transit_seconds += (end - start) * 60
+            legs.append({
+                'mode': 'RAIL',
+                'startTime': epoch_ms(start),
+                'endTime': epoch_ms(end),
+                'duration': (end - start) * 60,
+                'distance': abs(pattern.km[alight] - pattern.km[board]) * 1000,
+                'from': self._place(pattern.stops[board]),
+                'to': self._place(pattern.stops[alight]),
+                'routeShortName': pattern.line,
+                'routeLongName': pattern.long_name,
+                'routeId': f"rail:{pattern.line}",
+                'headsign': self.names[pattern.terminal],
+                'agencyName': 'Indian Railways'
+            })
+
+        last_station = rides[-1][0].stops[rides[-1][2]]
+        _, mode, minutes, metres = egress[last_station]
+        rail_end = rides[-1][3] + rides[-1][0].offsets[rides[-1][2]]
+        add_access_leg(mode, rail_end, minutes, metres, self._place(last_station), self._place(point=destination, name='Destination'))
+
+        start_ms = legs[0]['startTime']
+        end_ms = legs[-1]['endTime']
+        duration = (end_ms - start_ms) / 1000
+        moving = sum(leg['duration'] for leg in legs)
+        return {
+            'duration': duration,
+            'startTime': start_ms,
+            'endTime': end_ms,
+            'walkTime': walk_seconds,
+            'transitTime': transit_seconds,
+            'waitingTime': max(0, duration - moving),
+            'walkDistance': walk_metres,
+            'legs': legs,
+            '_category': 'rail_fallback',
+            '_optimization': 'RAPTOR',
+            '_mode_combo': 'WALK,RAIL'
+        }
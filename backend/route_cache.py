@@ -0,0 +1,158 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class RouteCache:
+    """Bounded LRU cache of OTP plan results with TTL and stale-while-revalidate"""
+
+    def __init__(self, max_entries=None, ttl_seconds=None, stale_seconds=None, bucket_minutes=None):
+        self.max_entries = max_entries or int(os.environ.get('ROUTE_CACHE_SIZE', 256))
+        # Entries are fresh for ttl_seconds, then served stale for up to
+        # stale_seconds more while a background refresh runs
+        self.ttl = ttl_seconds if ttl_seconds is not None else float(os.environ.get('ROUTE_CACHE_TTL', 300))
+        self.stale_ttl = stale_seconds if stale_seconds is not None else float(os.environ.get('ROUTE_CACHE_STALE', 600))
+        self.bucket_minutes = bucket_minutes or int(os.environ.get('ROUTE_CACHE_BUCKET_MINUTES', 15))
+
+        self._entries = OrderedDict()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'stale_hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'refreshes': 0,
+            'refresh_errors': 0
+        }
+
+    def make_key(self, origin, destination, departure=None, modes=None, precision=4):
+        """Cache key from resolved coordinates, departure-time bucket and mode set"""
+        departure = departure or time.time()
+        bucket = int(departure // (self.bucket_minutes * 60))
+        return (
+            bucket,
+            round(float(origin['lat']), precision),
+            round(float(origin['lng']), precision),
+            round(float(destination['lat']), precision),
+            round(float(destination['lng']), precision),
+            tuple(sorted(modes)) if modes else ()
+        )
+
+    def _lookup(self, key, refreshable):
+        """(value, start_refresh) for a fresh or stale entry, or None on a miss.
+
+        Keys starting with a time bucket (see make_key) fall back to the
+        previous bucket's entry as a stale hit.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            from_previous_bucket = False
+            if entry is None and isinstance(key[0], int):
+                # A new time bucket starts cold; serve the previous bucket's
+                # plan as stale instead of making the caller wait on OTP
+                entry = self._entries.get((key[0] - 1,) + key[1:])
+                from_previous_bucket = entry is not None
+
+            if entry is not None:
+                value, stored_at = entry
+                age = now - stored_at
+                if age < self.ttl and not from_previous_bucket:
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return value, False
+                if age < self.ttl + self.stale_ttl:
+                    self._stats['stale_hits'] += 1
+                    start_refresh = refreshable and key not in self._refreshing
+                    if start_refresh:
+                        self._refreshing.add(key)
+                    return value, start_refresh
+
+            self._stats['misses'] += 1
+            return None
+
+    def get_or_load(self, key, loader, should_store=None, refresher=None):
+        """Return the cached value for key, calling loader() on a miss.
+
+        should_store(value) can veto caching a loaded value. Stale entries
+        are reloaded in the background by refresher(), or by loader() and
+        should_store when not given; a falsy refresh result keeps the stale
+        entry.
+        """
+        found = self._lookup(key, refreshable=True)
+        if found is not None:
+            value, start_refresh = found
+            if start_refresh:
+                if refresher is None:
+                    def refresher():
+                        loaded = loader()
+                        return loaded if should_store is None or should_store(loaded) else None
+                self._start_refresh(key, refresher)
+            return value
+
+        value = loader()
+        if should_store is None or should_store(value):
+            self.put(key, value)
+        return value
+
+    def get(self, key, refresher=None):
+        """Fresh or stale cached value for key without loading, or None; stale
+        entries are reloaded in the background when a refresher is given"""
+        found = self._lookup(key, refreshable=refresher is not None)
+        if found is None:
+            return None
+        value, start_refresh = found
+        if start_refresh:
+            self._start_refresh(key, refresher)
+        return value
+
+    def _start_refresh(self, key, refresher):
+        threading.Thread(target=self._refresh, args=(key, refresher), daemon=True).start()
+
+    def _refresh(self, key, refresher):
+        try:
+            self.put(key, refresher())
+            with self._lock:
+                self._stats['refreshes'] += 1
+        except Exception as e:
+            print(f"❌ Route cache refresh failed: {e}")
+            with self._lock:
+                self._stats['refresh_errors'] += 1
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def put(self, key, value, stored_at=None):
+        """Store a value; empty results are not cached so OTP recovery is seen at once"""
+        if not value:
+            return
+        with self._lock:
+            self._entries[key] = (value, stored_at or time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def warm(self, entries):
+        """Preload (key, value, stored_at) entries, oldest first so the newest stay most recently used"""
+        loaded = 0
+        for key, value, stored_at in sorted(entries, key=lambda entry: entry[2])[-self.max_entries:]:
+            self.put(key, value, stored_at)
+            loaded += 1
+        return loaded
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self):
+        """Hit, miss and eviction counters plus current size"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._entries)
+        stats['max_entries'] = self.max_entries
+        stats['ttl_seconds'] = self.ttl
+        stats['stale_seconds'] = self.stale_ttl
+        return stats
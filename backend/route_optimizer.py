@@ -1,27 +1,122 @@
 import requests
 import json
+import numpy as np
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
 import os
+import threading
+import time
+from otp_client import OTPClient
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from station_catalog import StationCatalog, load_snapshot, save_snapshot, snapshot_path
+from route_cache import RouteCache
+from otp_store import OTPResponseStore
+from single_flight import SingleFlight
+from deadline import Deadline, REFRESH_DEADLINE_SECONDS
+from mode_planner import ModePlanner
+from rail_network import RailNetwork, line_stations
+from rail_fares import RailFares
+from station_names import MUMBAI_AREAS, clean_place_name
+from otp_graphql import answered_variants, build_plan_document, split_plan_response
+import route_scoring
 
 class RouteOptimizer:
     def __init__(self):
         self.otp_url = "http://localhost:8081/otp/routers/default/plan"
         self.otp_base_url = "http://localhost:8081/otp/routers/default"
-        self.stations = self.load_stations()
+        # Single pooled keep-alive client shared by every OTP call, failing
+        # fast while the OTP circuit is open
+        self.otp_breaker = CircuitBreaker('OTP')
+        self.otp_client = OTPClient(self.otp_base_url, breaker=self.otp_breaker)
+        # Recent OTP plan results per origin/destination/time bucket/mode set
+        self.route_cache = RouteCache()
+        # Raw itineraries per OTP variant: kept on disk across restarts, with
+        # the most recent ones warmed into memory at startup
+        self.otp_store = OTPResponseStore()
+        self.variant_cache = RouteCache(
+            max_entries=int(os.environ.get('OTP_VARIANT_CACHE_SIZE', 2048)),
+            ttl_seconds=self.route_cache.ttl,
+            stale_seconds=0
+        )
+        warmed = self.variant_cache.warm(self.otp_store.recent(self.variant_cache.max_entries))
+        if warmed:
+            print(f"💾 Warmed {warmed} OTP variant results from {self.otp_store.path}")
+        # Identical plans requested at the same time share one OTP fan-out
+        self.plan_flights = SingleFlight()
+        # Prunes OTP variants per trip and learns which ones pay off per corridor
+        self.mode_planner = ModePlanner()
+        # Suburban rail timetable model, routed locally when OTP has nothing;
+        # its all-pairs matrix also prices and pre-screens rail trips
+        self.rail_network = RailNetwork()
+        # 'rest' sends one plan GET per variant, 'graphql' batches them into one POST
+        self.otp_transport = os.environ.get('OTP_TRANSPORT', 'rest').lower()
+        # Upper bound on simultaneous OTP plan calls issued by a single request
+        self.max_concurrent_otp_calls = int(os.environ.get('OTP_MAX_CONCURRENCY', 8))
+        # Serve from local stations straight away; OTP's stop list is fetched
+        # in the background and swapped in when it arrives
+        self.station_snapshot_path = snapshot_path()
+        self.station_refresh_seconds = float(os.environ.get('STATION_REFRESH_SECONDS', 3600))
+        self.catalog = StationCatalog(*self.load_stations())
         self.train_fares = self.initialize_train_fares()
+        self.rail_fares = RailFares(self.rail_network.graph, self.train_fares)
+        self.start_station_refresh()
+    
+    @property
+    def stations(self):
+        return self.catalog.stations
+    
+    @property
+    def station_index(self):
+        return self.catalog.station_index
+    
+    @property
+    def spatial_index(self):
+        return self.catalog.spatial_index
+    
+    def start_station_refresh(self):
+        """Refresh stations from OTP on a daemon thread, then every STATION_REFRESH_SECONDS"""
+        def run():
+            retry_seconds = 30
+            while True:
+                if self.refresh_stations():
+                    retry_seconds = 30
+                    if self.station_refresh_seconds <= 0:
+                        return
+                    time.sleep(self.station_refresh_seconds)
+                else:
+                    # OTP may still be starting up; back off up to the refresh interval
+                    time.sleep(retry_seconds)
+                    retry_seconds = min(retry_seconds * 2, max(self.station_refresh_seconds, 30))
+        
+        threading.Thread(target=run, name='station-refresh', daemon=True).start()
+    
+    def refresh_stations(self):
+        """Load OTP's stops, swap in a new catalog and snapshot it to disk"""
+        print("🌐 Refreshing stations from OTP server...")
+        otp_stations = self.fetch_otp_stations()
+        if not otp_stations:
+            return False
+        
+        # Indexes and the stations payload are built before the swap, so
+        # requests never see a half-built catalog or pay for serialization
+        catalog = StationCatalog(otp_stations, 'otp')
+        catalog.payload('full')
+        self.catalog = catalog
+        print(f"✅ Loaded {len(otp_stations)} stations from OTP server")
+        save_snapshot(self.station_snapshot_path, otp_stations)
+        return True
         
     def load_stations(self):
-        """Load stations from OTP server or fallback to JSON file"""
+        """(stations, source) from the last OTP snapshot, stations.json or mock data"""
         try:
-            # First try to get stations from OTP server
-            print("🌐 Attempting to load stations from OTP server...")
-            otp_stations = self.fetch_otp_stations()
-            if otp_stations:
-                print(f"✅ Loaded {len(otp_stations)} stations from OTP server")
-                return otp_stations
+            # Last stop list fetched from OTP, kept on local disk
+            snapshot = load_snapshot(self.station_snapshot_path)
+            if snapshot:
+                print(f"✅ Loaded {len(snapshot)} stations from snapshot {self.station_snapshot_path}")
+                return snapshot, 'snapshot'
                 
-            # If OTP fails, try JSON file as fallback
-            print("⚠️  OTP server not available, trying stations.json...")
+            # No snapshot yet, try JSON file as fallback
+            print("⚠️  No station snapshot yet, trying stations.json...")
             # Try different possible paths for stations.json
             possible_paths = [
                 '../data/stations.json',
@@ -46,29 +141,22 @@ class RouteOptimizer:
                                         'lng': float(coords[1]),
                                         'type': 'STATION'
                                     })
-                        return converted_stations
+                        return converted_stations, 'stations.json'
             
             # If no file found, return mock data
             print("⚠️  stations.json not found, using mock data")
-            return self.get_mock_stations()
+            return self.get_mock_stations(), 'mock'
             
         except Exception as e:
             print(f"❌ Error loading stations: {e}")
-            return self.get_mock_stations()
+            return self.get_mock_stations(), 'mock'
     
     def initialize_train_fares(self):
         """Initialize Mumbai train fare data with station-to-station pricing"""
         return {
             # Western Railway (WR) - Key stations and their fare zones
             'WR': {
-                'stations': [
-                    'Churchgate', 'Marine Lines', 'Charni Road', 'Grant Road', 
-                    'Mumbai Central', 'Mahalaxmi', 'Lower Parel', 'Prabhadevi', 
-                    'Dadar', 'Matunga', 'Mahim', 'Bandra', 'Khar Road', 'Santacruz',
-                    'Vile Parle', 'Andheri', 'Jogeshwari', 'Ram Mandir', 'Goregaon',
-                    'Malad', 'Kandivali', 'Borivali', 'Dahisar', 'Mira Road', 'Bhayandar',
-                    'Naigaon', 'Vasai Road', 'Nallasopara', 'Virar'
-                ],
+                'stations': line_stations('WR'),
                 'fare_zones': {
                     # Distance-based fare zones for WR
                     ('Churchgate', 'Dadar'): {'2nd': 10, '1st': 40, 'AC': 50},
@@ -85,14 +173,7 @@ class RouteOptimizer:
             },
             # Central Railway (CR) - Main line stations
             'CR': {
-                'stations': [
-                    'CSMT', 'Masjid', 'Sandhurst Road', 'Dockyard Road', 'Reay Road',
-                    'Cotton Green', 'Sewri', 'Wadala', 'King Circle', 'Mahim',
-                    'Dadar', 'Matunga', 'Sion', 'Kurla', 'Vidyavihar', 'Ghatkopar',
-                    'Vikhroli', 'Kanjurmarg', 'Bhandup', 'Nahur', 'Mulund',
-                    'Thane', 'Kalwa', 'Mumbra', 'Diva', 'Kopar', 'Dombivli',
-                    'Thakurli', 'Kalyan', 'Vithalwadi', 'Ulhasnagar', 'Ambernath'
-                ],
+                'stations': line_stations('CR'),
                 'fare_zones': {
                     ('CSMT', 'Dadar'): {'2nd': 5, '1st': 25, 'AC': 35},
                     ('CSMT', 'Kurla'): {'2nd': 10, '1st': 50, 'AC': 70},
@@ -106,15 +187,9 @@ class RouteOptimizer:
                     ('Thane', 'Kalyan'): {'2nd': 10, '1st': 30, 'AC': 40}
                 }
             },
-            # Harbour Railway (HR) - CSMT to Panvel line
+            # Harbour Railway (HR) - CSMT to Panvel and the Goregaon branch
             'HR': {
-                'stations': [
-                    'CSMT', 'Dockyard Road', 'Reay Road', 'Cotton Green', 'Sewri',
-                    'Wadala', 'King Circle', 'Kurla', 'Chunabhatti', 'Tilak Nagar',
-                    'Chembur', 'Govandi', 'Mankhurd', 'Vashi', 'Sanpada',
-                    'Juinagar', 'Nerul', 'Seawoods', 'Belapur', 'Kharghar',
-                    'Mansarovar', 'Khandeshwar', 'Panvel'
-                ],
+                'stations': line_stations('HR', 'HR-W'),
                 'fare_zones': {
                     ('CSMT', 'Panvel'): {'2nd': 20, '1st': 100, 'AC': 110},
                     ('CSMT', 'Vashi'): {'2nd': 15, '1st': 70, 'AC': 80},
@@ -124,7 +199,7 @@ class RouteOptimizer:
                     ('Vashi', 'Panvel'): {'2nd': 10, '1st': 35, 'AC': 45}
                 }
             },
-            # Default fare calculation based on distance zones
+            # Fares for stations off the local rail network, by leg distance
             'default_fares': {
                 'short': {'2nd': 5, '1st': 25, 'AC': 35},    # 0-5 km
                 'medium': {'2nd': 10, '1st': 50, 'AC': 70},   # 5-15 km  
@@ -136,8 +211,7 @@ class RouteOptimizer:
     def fetch_otp_stations(self):
         """Fetch all transit stops from OTP server"""
         try:
-            url = f"{self.otp_base_url}/index/stops"
-            response = requests.get(url, timeout=10)
+            response = self.otp_client.get('/index/stops', read_timeout=10)
             
             if response.status_code == 200:
                 stops_data = response.json()
@@ -194,14 +268,29 @@ class RouteOptimizer:
     
     def get_all_stations(self):
         """Get all stations for frontend dropdown"""
-        if isinstance(self.stations, list):
-            return self.stations
+        return self.stations.to_dicts()
+    
+    def find_nearby_stations(self, lat, lng, k=5, radius_km=None):
+        """Stations nearest to a coordinate, optionally limited to a radius"""
+        if radius_km is not None and k is None:
+            matches = self.spatial_index.within(lat, lng, radius_km)
         else:
-            # If stations.json has different structure, adapt accordingly
-            return list(self.stations.values()) if isinstance(self.stations, dict) else []
+            matches = self.spatial_index.nearest(lat, lng, k=5 if k is None else k, max_distance_km=radius_km)
+        
+        return [
+            {
+                'name': station.get('name'),
+                'lat': station.get('lat'),
+                'lng': station.get('lng') or station.get('lon'),
+                'type': station.get('type'),
+                'id': station.get('id'),
+                'distance_km': round(distance, 3)
+            }
+            for station, distance in matches
+        ]
     
-    def get_routes(self, origin, destination, user_profile):
-        """Get and optimize routes based on user profile"""
+    def get_routes(self, origin, destination, user_profile, deadline=None):
+        """Get and optimize routes based on user profile, within an optional Deadline"""
         try:
             print(f"🔍 Getting routes from {origin} to {destination}")
             
@@ -213,44 +302,190 @@ class RouteOptimizer:
                 print("❌ Could not find coordinates for origin/destination")
                 return self.get_mock_routes(origin, destination, user_profile)
             
-            # Get multiple routes from OTP
-            raw_routes = self.fetch_otp_routes(origin_coords, destination_coords)
+            # Get multiple routes from OTP, reusing recent plans for the same trip
+            deadline = deadline or Deadline.from_milliseconds()
+            allowed_modes = user_profile.get('allowed_modes')
+            cache_key = self.route_cache.make_key(origin_coords, destination_coords, modes=allowed_modes)
+            raw_routes = self.load_routes(cache_key, origin_coords, destination_coords, allowed_modes, deadline)
             
-            if not raw_routes:
-                print("⚠️  No routes from OTP, using mock data")
-                return self.get_mock_routes(origin, destination, user_profile)
+            return self.rank_routes(raw_routes, origin, destination, origin_coords, destination_coords, user_profile, deadline)
             
-            # Apply optimization logic
-            optimized_routes = self.optimize_routes(raw_routes, user_profile)
+        except Exception as e:
+            print(f"❌ Error in get_routes: {e}")
+            return self.get_mock_routes(origin, destination, user_profile)
+    
+    def load_routes(self, cache_key, origin_coords, destination_coords, allowed_modes, deadline):
+        """Raw routes for a trip from the route cache (refreshed in the background
+        when stale), an identical plan already in flight, or a new OTP fetch"""
+        def load():
+            raw_routes, partial = self.plan_flight(cache_key, origin_coords, destination_coords, allowed_modes, deadline)
+            if partial:
+                # Also set for callers that joined a plan cut short by its leader's deadline
+                deadline.mark_partial()
+            return raw_routes
+        
+        try:
+            return self.route_cache.get_or_load(
+                cache_key,
+                load,
+                # A plan cut short by its deadline must not be served to later callers
+                should_store=lambda routes: not deadline.partial,
+                refresher=lambda: self.refresh_plan(cache_key, origin_coords, destination_coords, allowed_modes)
+            )
+        except TimeoutError:
+            # Waited on an identical in-flight plan until our own budget ran out
+            print("⏱️  Plan deadline reached while waiting on an identical request")
+            deadline.mark_partial()
+            return []
+    
+    def refresh_plan(self, cache_key, origin_coords, destination_coords, allowed_modes):
+        """Background reload of a stale cached plan; runs after the request that
+        found it stale has answered, so it gets a budget of its own"""
+        raw_routes, partial = self.plan_flight(
+            cache_key, origin_coords, destination_coords, allowed_modes, Deadline(REFRESH_DEADLINE_SECONDS)
+        )
+        return [] if partial else raw_routes
+    
+    def plan_flight(self, cache_key, origin_coords, destination_coords, allowed_modes, deadline):
+        """(raw_routes, partial) from OTP, sharing one fetch between identical
+        concurrent plans; partial is the fetching request's deadline flag"""
+        def fetch():
+            raw_routes = self.fetch_otp_routes(origin_coords, destination_coords, deadline, allowed_modes)
+            return raw_routes, deadline.partial
+        
+        return self.plan_flights.do(cache_key, fetch, timeout=deadline.remaining())
+    
+    def rank_routes(self, raw_routes, origin, destination, origin_coords, destination_coords, user_profile, deadline=None):
+        """Optimize fetched OTP itineraries into the frontend route list, falling
+        back to the local rail network and then to mock routes"""
+        from_otp = bool(raw_routes)
+        if not raw_routes:
+            # Whatever OTP answered for this trip came back empty: nothing survived
+            self.mode_planner.record_outcome(origin_coords, destination_coords, [])
+            raw_routes = self.plan_rail_fallback(origin_coords, destination_coords, user_profile)
+        if not raw_routes:
+            print("⚠️  No routes from OTP, using mock data")
+            return self.get_mock_routes(origin, destination, user_profile)
+        
+        # Apply optimization logic
+        optimized_routes = self.optimize_routes(raw_routes, user_profile, deadline)
+        if from_otp:
+            self.mode_planner.record_outcome(origin_coords, destination_coords, optimized_routes)
+        
+        # If we have no real routes, supplement with mock routes
+        if len(optimized_routes) < 1:
+            print(f"🎭 No real routes found, adding mock routes")
+            mock_routes = self.get_mock_routes(origin, destination, user_profile)
             
-            # If we have no real routes, supplement with mock routes
-            if len(optimized_routes) < 1:
-                print(f"🎭 No real routes found, adding mock routes")
-                mock_routes = self.get_mock_routes(origin, destination, user_profile)
+            # Add mock routes that are different from real ones
+            for mock_route in mock_routes:
+                if len(optimized_routes) >= 5:
+                    break
                 
-                # Add mock routes that are different from real ones
-                for mock_route in mock_routes:
-                    if len(optimized_routes) >= 5:
+                # Check if this mock route is significantly different
+                is_different = True
+                for real_route in optimized_routes:
+                    if abs(mock_route['duration'] - real_route['duration']) < 10:
+                        is_different = False
                         break
+                
+                if is_different:
+                    mock_route['route_id'] = len(optimized_routes) + 1
+                    optimized_routes.append(mock_route)
+                    print(f"✅ Added mock route: {mock_route['route_type']} - {mock_route['duration']}min")
+        
+        print(f"✅ Returning {len(optimized_routes)} total routes (real + mock)")
+        return optimized_routes
+    
+    def plan_rail_fallback(self, origin_coords, destination_coords, user_profile):
+        """Suburban rail itineraries from the in-process RAPTOR router, in OTP's shape"""
+        allowed_modes = user_profile.get('allowed_modes')
+        if allowed_modes and 'train' not in allowed_modes:
+            return []
+        try:
+            itineraries = self.rail_network.plan(origin_coords, destination_coords)
+        except Exception as e:
+            print(f"❌ Local rail routing failed: {e}")
+            return []
+        if itineraries:
+            print(f"🚆 No routes from OTP, planned {len(itineraries)} on the local rail network")
+        return itineraries
+    
+    def stream_routes(self, origin, destination, user_profile, deadline=None):
+        """Yield (event, routes) while planning: the first acceptable route as
+        soon as one can be scored, refined rankings as OTP variants arrive,
+        and the final ranked set last.
+        """
+        try:
+            origin_coords = self.get_station_coordinates(origin)
+            destination_coords = self.get_station_coordinates(destination)
+            
+            if not origin_coords or not destination_coords:
+                print("❌ Could not find coordinates for origin/destination")
+                yield 'final', self.get_mock_routes(origin, destination, user_profile)
+                return
+            
+            deadline = deadline or Deadline.from_milliseconds()
+            allowed_modes = user_profile.get('allowed_modes')
+            cache_key = self.route_cache.make_key(origin_coords, destination_coords, modes=allowed_modes)
+            cached = self.route_cache.get(
+                cache_key,
+                refresher=lambda: self.refresh_plan(cache_key, origin_coords, destination_coords, allowed_modes)
+            )
+            if cached:
+                yield 'final', self.rank_routes(cached, origin, destination, origin_coords, destination_coords, user_profile, deadline)
+                return
+            
+            flight = self.plan_flights.claim(cache_key)
+            if flight is None:
+                # An identical plan is already fetching: share its result
+                raw_routes = self.load_routes(cache_key, origin_coords, destination_coords, allowed_modes, deadline)
+                yield 'final', self.rank_routes(raw_routes, origin, destination, origin_coords, destination_coords, user_profile, deadline)
+                return
+            
+            collected = []
+            ranked = []
+            raw_routes = None
+            try:
+                for batch in self.iter_otp_batches(origin_coords, destination_coords, deadline, allowed_modes):
+                    collected.extend(batch)
+                    # Only the new itineraries are ranked, against the routes
+                    # already shown; the full set is ranked once at the end
+                    candidates = self.categorize_and_deduplicate_routes(batch)
+                    if not candidates:
+                        continue
+                    pool = [route['raw_route'] for route in ranked] + candidates
+                    refined = self.optimize_routes(pool, user_profile)
+                    if not refined:
+                        continue
                     
-                    # Check if this mock route is significantly different
-                    is_different = True
-                    for real_route in optimized_routes:
-                        if abs(mock_route['duration'] - real_route['duration']) < 10:
-                            is_different = False
-                            break
-                    
-                    if is_different:
-                        mock_route['route_id'] = len(optimized_routes) + 1
-                        optimized_routes.append(mock_route)
-                        print(f"✅ Added mock route: {mock_route['route_type']} - {mock_route['duration']}min")
+                    if not ranked:
+                        # Fastest comes first out of optimize_routes
+                        yield 'route', refined[:1]
+                    elif self.ranking(refined) != self.ranking(ranked):
+                        yield 'routes', refined
+                    ranked = refined
+                
+                raw_routes = self.categorize_and_deduplicate_routes(collected) if collected else []
+                if not deadline.partial:
+                    self.route_cache.put(cache_key, raw_routes)
+            finally:
+                # Hand the plan to requests that joined it; an abandoned
+                # stream leaves them nothing, flagged partial
+                if raw_routes is None:
+                    self.plan_flights.settle(cache_key, flight, ([], True))
+                else:
+                    self.plan_flights.settle(cache_key, flight, (raw_routes, deadline.partial))
             
-            print(f"✅ Returning {len(optimized_routes)} total routes (real + mock)")
-            return optimized_routes
+            yield 'final', self.rank_routes(raw_routes, origin, destination, origin_coords, destination_coords, user_profile, deadline)
             
         except Exception as e:
-            print(f"❌ Error in get_routes: {e}")
-            return self.get_mock_routes(origin, destination, user_profile)
+            print(f"❌ Error in stream_routes: {e}")
+            yield 'final', self.get_mock_routes(origin, destination, user_profile)
+    
+    def ranking(self, routes):
+        """What a client sees change between two route lists"""
+        return [(route['route_type'], route['duration'], route['cost'], route['transfers']) for route in routes]
     
     def get_station_coordinates(self, station_name):
         """Get coordinates for a station name with enhanced fuzzy matching"""
@@ -262,56 +497,21 @@ class RouteOptimizer:
         # Normalize the search term
         search_term = station_name.lower().strip()
         
-        # Search strategies
-        exact_match = None
-        best_partial_match = None
-        word_matches = []
+        # Exact > alias > partial > word-score lookup through the prebuilt index
+        found_station, match_type = self.station_index.find(search_term)
         
-        for station in self.stations:
-            if isinstance(station, dict):
-                name = station.get('name', '').lower().strip()
-                
-                # 1. Exact match
-                if name == search_term:
-                    exact_match = station
-                    break
-                
-                # 2. Partial matching (contains each other)
-                if search_term in name or name in search_term:
-                    if not best_partial_match or len(name) < len(best_partial_match.get('name', '')):
-                        best_partial_match = station
-                
-                # 3. Word-based matching for complex names like "D.N.NAGAR, BARFIWALA VIDYALAYA"
-                search_words = [w.strip() for w in search_term.replace(',', ' ').replace('.', ' ').split() if w.strip()]
-                station_words = [w.strip() for w in name.replace(',', ' ').replace('.', ' ').split() if w.strip()]
-                
-                # Count matching words
-                matching_words = 0
-                for search_word in search_words:
-                    for station_word in station_words:
-                        if search_word in station_word or station_word in search_word:
-                            matching_words += 1
-                            break
-                
-                if matching_words > 0:
-                    match_score = matching_words / len(search_words)
-                    word_matches.append((station, match_score, matching_words))
-        
-        # Use the best match found
-        found_station = None
-        match_type = ""
-        
-        if exact_match:
-            found_station = exact_match
-            match_type = "exact"
-        elif best_partial_match:
-            found_station = best_partial_match
-            match_type = "partial"
-        elif word_matches:
-            # Sort by match score, then by number of matching words
-            word_matches.sort(key=lambda x: (x[1], x[2]), reverse=True)
-            found_station = word_matches[0][0]
-            match_type = f"word ({word_matches[0][1]:.2f} score)"
+        # Any known spelling of a suburban rail station ("VT", "Dadar (W)")
+        if not found_station or match_type.startswith('word'):
+            rail_station = self.rail_network.graph.station_id(station_name)
+            if rail_station is not None:
+                lat, lng = self.rail_network.coordinates[rail_station]
+                found_station, match_type = {'name': self.rail_network.names[rail_station], 'lat': lat, 'lng': lng}, 'rail station'
+        
+        # A close misspelling ("Ghatkoper", "Borivli") beats a loose word overlap
+        if not found_station or match_type.startswith('word'):
+            fuzzy_station, fuzzy_type = self.catalog.fuzzy.find(search_term)
+            if fuzzy_station:
+                found_station, match_type = fuzzy_station, fuzzy_type
         
         if found_station:
             coords = {
@@ -321,116 +521,22 @@ class RouteOptimizer:
             print(f"✅ Found coordinates: {coords['lat']}, {coords['lng']} for '{found_station['name']}' (match: {match_type})")
             return coords
         
-        # Fallback: Try to use known Mumbai area coordinates
-        mumbai_areas = {
-            'andheri': {'lat': 19.1136, 'lng': 72.8697},
-            'bandra': {'lat': 19.0544, 'lng': 72.8406},
-            'churchgate': {'lat': 18.9322, 'lng': 72.8264},
-            'dadar': {'lat': 19.0178, 'lng': 72.8478},
-            'mumbai central': {'lat': 18.9686, 'lng': 72.8181},
-            'lower parel': {'lat': 18.9969, 'lng': 72.8331},
-            'kurla': {'lat': 19.0692, 'lng': 72.8789},
-            'ghatkopar': {'lat': 19.0864, 'lng': 72.9081},
-            'thane': {'lat': 19.1972, 'lng': 72.9636},
-            'navi mumbai': {'lat': 19.0330, 'lng': 73.0297}
-        }
-        
-        # Check if station name contains known area
-        search_lower = search_term.lower()
-        for area, coords in mumbai_areas.items():
-            if area in search_lower or any(word in area for word in search_lower.split()):
+        # Fallback: approximate coordinates of a known area the name mentions
+        for area, coords in MUMBAI_AREAS.items():
+            if area in search_term or any(word in area for word in search_term.split()):
                 print(f"✅ Using approximate coordinates for '{area}': {coords['lat']}, {coords['lng']}")
                 return coords
         
         print(f"❌ Could not find coordinates for station: '{station_name}'")
-        print(f"📝 Available stations sample: {[s.get('name', 'Unknown')[:40] for s in self.stations[:5] if isinstance(s, dict)]}")
+        print(f"📝 Available stations sample: {[name[:40] for name in self.stations.names[:5]]}")
         return None
     
-    def fetch_otp_routes(self, origin, destination):
+    def fetch_otp_routes(self, origin, destination, deadline=None, allowed_modes=None):
         """Fetch comprehensive routes mixing all transport modes for best optimization"""
         try:
-            # Current time
-            now = datetime.now()
-            
-            # Comprehensive mode combinations for different route types
-            mode_combinations = [
-                # Public transit combinations
-                ('WALK,TRANSIT', 'all_transit'),
-                ('WALK,BUS', 'bus_only'),
-                ('WALK,RAIL', 'rail_only'),  
-                ('WALK,SUBWAY', 'metro_only'),
-                ('WALK,BUS,RAIL', 'bus_rail_mix'),
-                ('WALK,BUS,SUBWAY', 'bus_metro_mix'),
-                ('WALK,RAIL,SUBWAY', 'rail_metro_mix'),
-                
-                # Auto-rickshaw options
-                ('CAR', 'auto_direct'),
-                ('WALK,CAR', 'walk_auto_mix'),
-                
-                # Mixed multimodal (auto + transit)
-                ('WALK,BUS,CAR', 'auto_bus_mix'),
-                ('WALK,RAIL,CAR', 'auto_rail_mix'),
-                
-                # Walking options
-                ('WALK', 'walk_only'),
-            ]
-            
             all_routes = []
-            
-            for modes, route_category in mode_combinations:
-                # Different optimization targets
-                optimization_variants = [
-                    {'optimize': 'QUICK', 'transferPenalty': 300},     # Fastest
-                    {'optimize': 'TRANSFERS', 'transferPenalty': 1800}, # Fewest transfers
-                    {'optimize': 'WALKING', 'transferPenalty': 600},   # Balanced
-                ]
-                
-                for variant in optimization_variants:
-                    params = {
-                        'fromPlace': f"{origin['lat']},{origin['lng']}",
-                        'toPlace': f"{destination['lat']},{destination['lng']}",
-                        'time': now.strftime('%H:%M'),
-                        'date': now.strftime('%m-%d-%Y'),
-                        'mode': modes,
-                        'optimize': variant['optimize'],
-                        'maxTransfers': 5,
-                        'numItineraries': 2,
-                        'arriveBy': 'false',
-                        'walkReluctance': 2,
-                        'transferPenalty': variant['transferPenalty'],
-                        'waitReluctance': 1.5,
-                        'walkSpeed': 1.3  # m/s - average walking speed
-                    }
-                    
-                    print(f"🌐 Calling OTP: {modes} (optimize: {variant['optimize']})")
-                    
-                    try:
-                        response = requests.get(self.otp_url, params=params, timeout=30)
-                        
-                        if response.status_code == 200:
-                            data = response.json()
-                            if 'plan' in data and 'itineraries' in data['plan']:
-                                routes = data['plan']['itineraries']
-                                print(f"✅ Got {len(routes)} routes for {modes} ({variant['optimize']})")
-                                
-                                # Tag routes with their category and optimization
-                                for route in routes:
-                                    route['_category'] = route_category
-                                    route['_optimization'] = variant['optimize']
-                                    route['_mode_combo'] = modes
-                                
-                                all_routes.extend(routes)
-                            else:
-                                print(f"⚠️  No routes for {modes} ({variant['optimize']})")
-                        else:
-                            print(f"❌ OTP error {response.status_code} for {modes}")
-                            
-                    except requests.exceptions.Timeout:
-                        print(f"⏰ Timeout for {modes} ({variant['optimize']})")
-                        continue
-                    except Exception as e:
-                        print(f"❌ Error for {modes}: {e}")
-                        continue
+            for batch in self.iter_otp_batches(origin, destination, deadline, allowed_modes):
+                all_routes.extend(batch)
             
             if all_routes:
                 # Advanced deduplication and categorization
@@ -445,8 +551,195 @@ class RouteOptimizer:
             print(f"❌ Error fetching comprehensive routes: {e}")
             return []
     
+    def iter_otp_batches(self, origin, destination, deadline=None, allowed_modes=None):
+        """Yield lists of tagged OTP itineraries as the planned variants complete"""
+        # Current time
+        now = datetime.now()
+        
+        # Only the mode combinations / optimize variants worth asking OTP for this trip
+        variant_requests = self.mode_planner.plan(origin, destination, self.spatial_index, allowed_modes, self.rail_network)
+        
+        if self.otp_breaker.is_open():
+            # Itineraries already stored for this trip still answer while OTP is down
+            stored = []
+            for modes, route_category, variant in variant_requests:
+                stored.extend(self.get_cached_variant(origin, destination, now, modes, variant) or [])
+            print(f"⚡ OTP circuit open, skipping OTP with {len(stored)} stored itineraries")
+            if stored:
+                yield stored
+            return
+        
+        if self.otp_transport == 'graphql':
+            routes = self.fetch_otp_routes_graphql(origin, destination, now, variant_requests, deadline)
+            if routes:
+                yield routes
+        else:
+            yield from self.iter_otp_routes_rest(origin, destination, now, variant_requests, deadline)
+    
+    def iter_otp_routes_rest(self, origin, destination, now, variant_requests, deadline=None):
+        """Fetch variants as separate REST plan calls fanned out over a bounded pool,
+        yielding each variant's itineraries as it completes"""
+        # Fan the variants out over a bounded pool so a plan waits for the
+        # slowest OTP call instead of the sum of all of them
+        max_workers = max(1, min(self.max_concurrent_otp_calls, len(variant_requests)))
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='otp-plan')
+        futures = [
+            executor.submit(self.fetch_otp_variant, origin, destination, now, modes, route_category, variant, deadline)
+            for modes, route_category, variant in variant_requests
+        ]
+        
+        try:
+            # Merge results as each variant completes, until the deadline
+            for future in as_completed(futures, timeout=deadline.remaining() if deadline else None):
+                routes = future.result()
+                if routes:
+                    yield routes
+        except FuturesTimeoutError:
+            deadline.mark_partial()
+            pending = sum(1 for future in futures if not future.done())
+            print(f"⏱️  Plan deadline reached, abandoning {pending} OTP variants")
+        finally:
+            # Drop queued variants; in-flight calls are bounded by their read timeout
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def fetch_otp_routes_graphql(self, origin, destination, now, variant_requests, deadline=None):
+        """Fetch all variants in one OTP GraphQL request using aliased plan queries"""
+        cached_routes = []
+        missing = []
+        for modes, route_category, variant in variant_requests:
+            routes = self.get_cached_variant(origin, destination, now, modes, variant)
+            if routes is None:
+                missing.append((modes, route_category, variant))
+            else:
+                cached_routes.extend(routes)
+        if not missing:
+            return cached_routes
+        
+        read_timeout = 30
+        if deadline is not None:
+            if deadline.expired():
+                deadline.mark_partial()
+                return cached_routes
+            read_timeout = min(read_timeout, max(deadline.remaining(), 0.1))
+        
+        query, aliases = build_plan_document(origin, destination, now, missing)
+        print(f"🌐 Calling OTP GraphQL: {len(aliases)} plan variants in one request")
+        
+        try:
+            response = self.otp_client.post('/index/graphql', json={'query': query}, read_timeout=read_timeout)
+            
+            if response.status_code != 200:
+                print(f"❌ OTP GraphQL error {response.status_code}")
+                return cached_routes
+            
+            payload = response.json()
+            routes, errors = split_plan_response(payload, aliases)
+            for error in errors[:3]:
+                print(f"⚠️  OTP GraphQL: {error.get('message', error) if isinstance(error, dict) else error}")
+            print(f"✅ Got {len(routes)} routes from {len(aliases)} batched variants")
+            
+            for modes, route_category, variant in answered_variants(payload, aliases):
+                self.mode_planner.record_fetch(origin, destination, route_category, variant['optimize'])
+            
+            by_variant = {}
+            for route in routes:
+                by_variant.setdefault((route['_mode_combo'], route['_optimization']), []).append(route)
+            for (modes, optimize), variant_routes in by_variant.items():
+                self.store_variant(origin, destination, now, modes, optimize, variant_routes)
+            return cached_routes + routes
+            
+        except CircuitOpenError:
+            print("⚡ OTP circuit open, skipped batched plan")
+        except requests.exceptions.Timeout:
+            if deadline is not None and deadline.expired():
+                deadline.mark_partial()
+            print("⏰ Timeout for batched OTP GraphQL plan")
+        except Exception as e:
+            print(f"❌ Error for batched OTP GraphQL plan: {e}")
+        
+        return cached_routes
+    
+    def get_cached_variant(self, origin, destination, now, modes, variant):
+        """Itineraries for a variant from memory, then disk, or None on a miss"""
+        key = self.otp_store.make_key(origin, destination, modes, variant['optimize'], now.timetuple())
+        routes = self.variant_cache.get(key)
+        if routes is None:
+            routes = self.otp_store.get(key)
+            if routes is not None:
+                self.variant_cache.put(key, routes)
+        return routes
+    
+    def store_variant(self, origin, destination, now, modes, optimize, routes):
+        key = self.otp_store.make_key(origin, destination, modes, optimize, now.timetuple())
+        self.variant_cache.put(key, routes)
+        self.otp_store.put(key, routes)
+    
+    def fetch_otp_variant(self, origin, destination, now, modes, route_category, variant, deadline=None):
+        """Fetch itineraries for a single mode combination / optimization variant"""
+        cached = self.get_cached_variant(origin, destination, now, modes, variant)
+        if cached is not None:
+            return cached
+        
+        read_timeout = 30
+        if deadline is not None:
+            if deadline.expired():
+                return []
+            # Never wait on OTP past the request's remaining budget
+            read_timeout = min(read_timeout, max(deadline.remaining(), 0.1))
+        
+        params = {
+            'fromPlace': f"{origin['lat']},{origin['lng']}",
+            'toPlace': f"{destination['lat']},{destination['lng']}",
+            'time': now.strftime('%H:%M'),
+            'date': now.strftime('%m-%d-%Y'),
+            'mode': modes,
+            'optimize': variant['optimize'],
+            'maxTransfers': 5,
+            'numItineraries': 2,
+            'arriveBy': 'false',
+            'walkReluctance': 2,
+            'transferPenalty': variant['transferPenalty'],
+            'waitReluctance': 1.5,
+            'walkSpeed': 1.3  # m/s - average walking speed
+        }
+        
+        print(f"🌐 Calling OTP: {modes} (optimize: {variant['optimize']})")
+        
+        try:
+            response = self.otp_client.get(self.otp_url, params=params, read_timeout=read_timeout)
+            
+            if response.status_code == 200:
+                data = response.json()
+                # OTP answered: an empty plan is an attempt that can never survive
+                self.mode_planner.record_fetch(origin, destination, route_category, variant['optimize'])
+                if 'plan' in data and 'itineraries' in data['plan']:
+                    routes = data['plan']['itineraries']
+                    print(f"✅ Got {len(routes)} routes for {modes} ({variant['optimize']})")
+                    
+                    # Tag routes with their category and optimization
+                    for route in routes:
+                        route['_category'] = route_category
+                        route['_optimization'] = variant['optimize']
+                        route['_mode_combo'] = modes
+                    
+                    self.store_variant(origin, destination, now, modes, variant['optimize'], routes)
+                    return routes
+                else:
+                    print(f"⚠️  No routes for {modes} ({variant['optimize']})")
+            else:
+                print(f"❌ OTP error {response.status_code} for {modes}")
+                
+        except CircuitOpenError:
+            print(f"⚡ OTP circuit open, skipped {modes} ({variant['optimize']})")
+        except requests.exceptions.Timeout:
+            print(f"⏰ Timeout for {modes} ({variant['optimize']})")
+        except Exception as e:
+            print(f"❌ Error for {modes}: {e}")
+        
+        return []
+    
     def categorize_and_deduplicate_routes(self, all_routes):
-        """Categorize routes by fastest, cheapest, fewest transfers and remove duplicates. Filter out direct auto routes."""
+        """Filter out direct auto/walk routes, then keep up to 10 distinct itineraries, Pareto-optimal ones first"""
         
         # First filter out direct auto-only and walk-only routes
         filtered_routes = []
@@ -458,78 +751,26 @@ class RouteOptimizer:
                 filtered_routes.append(route)
         
         print(f"✅ Route filtering: {len(all_routes)} → {len(filtered_routes)} routes")
+        if not filtered_routes:
+            return []
         
-        categorized = {
-            'fastest': [],
-            'cheapest': [],
-            'fewest_transfers': [],
-            'mixed': []
-        }
-        
-        # Calculate metrics for filtered routes
-        route_metrics = []
-        for route in filtered_routes:
-            duration = route.get('duration', 0) / 60  # minutes
-            transfers = self.count_transfers(route)
-            cost_info = self.estimate_cost(route)
-            cost = cost_info['total_cost'] if isinstance(cost_info, dict) else cost_info
-            
-            # Calculate composite scores
-            route_metrics.append({
-                'route': route,
-                'duration': duration,
-                'transfers': transfers,
-                'cost': cost,
-                'speed_score': 100 / max(duration, 1),  # Higher is faster
-                'transfer_score': 100 / max(transfers + 1, 1),  # Higher is fewer transfers
-                'cost_score': 100 / max(cost, 1)  # Higher is cheaper
-            })
-        
-        # Sort by different criteria
-        by_speed = sorted(route_metrics, key=lambda x: x['duration'])
-        by_cost = sorted(route_metrics, key=lambda x: x['cost'])
-        by_transfers = sorted(route_metrics, key=lambda x: x['transfers'])
-        
-        # Select best routes for each category
-        unique_signatures = set()
-        
-        def add_unique_route(route_data, category):
-            route = route_data['route']
-            # Create signature to avoid duplicates
-            signature = f"{int(route_data['duration']//5)}_{route_data['transfers']}_{int(route_data['cost']//10)}"
-            
-            if signature not in unique_signatures and len(categorized[category]) < 3:
-                unique_signatures.add(signature)
-                categorized[category].append(route)
-                return True
-            return False
-        
-        # Add fastest routes
-        for route_data in by_speed[:5]:
-            add_unique_route(route_data, 'fastest')
-        
-        # Add cheapest routes  
-        for route_data in by_cost[:5]:
-            add_unique_route(route_data, 'cheapest')
-        
-        # Add fewest transfer routes
-        for route_data in by_transfers[:5]:
-            add_unique_route(route_data, 'fewest_transfers')
+        # Rank every candidate by Pareto front over duration, cost, transfers and eco score
+        all_metrics = [self.get_route_metrics(route) for route in filtered_routes]
+        matrix = route_scoring.metric_matrix(all_metrics)
+        layers = route_scoring.pareto_layers(route_scoring.objectives(matrix))
         
-        # Add some mixed/balanced routes
-        balanced = sorted(route_metrics, key=lambda x: -(x['speed_score'] + x['transfer_score'] + x['cost_score']))
-        for route_data in balanced[:3]:
-            if len(categorized['mixed']) < 2:
-                add_unique_route(route_data, 'mixed')
+        # Keep one itinerary per leg structure (the same rides found by several
+        # OTP variants), the one on the best front and then the fastest
+        best_by_structure = {}
+        for i in np.lexsort((matrix[:, route_scoring.DURATION], layers)).tolist():
+            structure = all_metrics[i]['leg_structure']
+            best_by_structure.setdefault(structure, i)
         
-        # Flatten to single list with category tags
         final_routes = []
-        for category, routes in categorized.items():
-            for route in routes:
-                route['_route_category'] = category
-                final_routes.append(route)
+        for i in sorted(best_by_structure.values(), key=lambda i: (layers[i], matrix[i, route_scoring.DURATION]))[:10]:
+            final_routes.append(filtered_routes[i])
         
-        return final_routes[:10]  # Return top 10 diverse routes
+        return final_routes  # Top 10 distinct routes
     
     def is_direct_auto_route(self, route):
         """Check if this is a direct auto-only or walk-only route (not multimodal) - filter both"""
@@ -572,7 +813,7 @@ class RouteOptimizer:
                 
         return False
     
-    def optimize_routes(self, routes, user_profile):
+    def optimize_routes(self, routes, user_profile, deadline=None):
         """Optimize routes and categorize by Fastest, Cheapest, and Fewest Transfers"""
         if not routes:
             return []
@@ -580,122 +821,130 @@ class RouteOptimizer:
         print(f"🔍 Optimizing {len(routes)} routes with categorical approach")
         
         # Calculate comprehensive metrics for all routes
-        route_analysis = []
+        all_metrics = [self.get_route_metrics(route) for route in routes]
         
-        for route in routes:
-            duration_minutes = route['duration'] / 60
-            transfers = self.count_transfers(route)
-            cost_info = self.estimate_cost(route)
-            cost = cost_info['total_cost'] if isinstance(cost_info, dict) else cost_info
-            walk_time = route.get('walkTime', 0) / 60
-            
-            # Get route category if available
-            category = route.get('_route_category', 'mixed')
-            
+        # Score every candidate in one batch over a (routes x metrics) array
+        matrix = route_scoring.metric_matrix(all_metrics)
+        scores = route_scoring.score_matrix(matrix, user_profile)
+        # Fronts of this plan's own candidates; the itineraries are shared
+        # with other cached plans, so nothing plan-specific goes on them
+        layers = route_scoring.pareto_layers(route_scoring.objectives(matrix))
+        
+        route_analysis = []
+        for route, metrics, score, layer in zip(routes, all_metrics, scores.tolist(), layers.tolist()):
             route_data = {
                 'raw_route': route,
-                'duration': duration_minutes,
-                'transfers': transfers,
-                'cost': cost,
-                'walk_time': walk_time,
-                'category': category,
-                'score': self.calculate_score(route, user_profile),
-                'eco_score': self.calculate_eco_score(route)
+                'duration': metrics['duration'],
+                'transfers': metrics['transfers'],
+                'cost': metrics['cost'],
+                'walk_time': metrics['walk_time'],
+                'category': 'pareto' if layer == 0 else 'alternative',
+                'score': score,
+                'eco_score': metrics['eco_score']
             }
-            
             route_analysis.append(route_data)
-            print(f"📊 Route: {duration_minutes:.1f}min, {transfers} transfers, ₹{cost} ({category})")
-        
-        # Categorize routes by primary criteria
-        categorized_routes = {
-            'fastest': [],
-            'cheapest': [],
-            'fewest_transfers': []
-        }
+            print(f"📊 Route: {route_data['duration']:.1f}min, {route_data['transfers']} transfers, ₹{route_data['cost']} ({route_data['category']})")
+        
+        # Only Pareto-optimal routes can win a category: nothing else is at
+        # least as fast, cheap, direct and green at once
+        front = np.flatnonzero(layers == 0)
+        if not front.size:
+            front = np.arange(len(routes))
+        duration = matrix[:, route_scoring.DURATION]
+        cost = matrix[:, route_scoring.COST]
+        transfers = matrix[:, route_scoring.TRANSFERS]
+        print(f"🎯 Pareto front: {len(front)} of {len(routes)} routes")
         
-        # Sort by each criteria
-        by_speed = sorted(route_analysis, key=lambda x: x['duration'])
-        by_cost = sorted(route_analysis, key=lambda x: x['cost'])
-        by_transfers = sorted(route_analysis, key=lambda x: (x['transfers'], x['duration']))
-        
-        print("🚀 FASTEST ROUTES:")
-        for i, route_data in enumerate(by_speed[:2]):
-            if route_data not in categorized_routes['fastest']:
-                categorized_routes['fastest'].append(route_data)
-                print(f"  {i+1}. {route_data['duration']:.1f}min, {route_data['transfers']} transfers, ₹{route_data['cost']}")
-        
-        print("💰 CHEAPEST ROUTES:")
-        for i, route_data in enumerate(by_cost[:2]):
-            if route_data not in categorized_routes['cheapest']:
-                categorized_routes['cheapest'].append(route_data)
-                print(f"  {i+1}. ₹{route_data['cost']}, {route_data['duration']:.1f}min, {route_data['transfers']} transfers")
-        
-        print("🔄 FEWEST TRANSFERS:")
-        for i, route_data in enumerate(by_transfers[:2]):
-            if route_data not in categorized_routes['fewest_transfers']:
-                categorized_routes['fewest_transfers'].append(route_data)
-                print(f"  {i+1}. {route_data['transfers']} transfers, {route_data['duration']:.1f}min, ₹{route_data['cost']}")
-        
-        # Convert back to frontend format with proper categorization
         final_routes = []
-        route_id = 1
-        
-        # Add fastest routes
-        for route_data in categorized_routes['fastest']:
-            formatted_route = self.format_route_for_frontend(route_data, route_id, "Fastest")
-            final_routes.append(formatted_route)
-            route_id += 1
-        
-        # Add cheapest routes (if different from fastest)
-        for route_data in categorized_routes['cheapest']:
-            if not any(abs(r['duration'] - route_data['duration']) < 2 for r in final_routes):
-                formatted_route = self.format_route_for_frontend(route_data, route_id, "Cheapest")
-                final_routes.append(formatted_route)
-                route_id += 1
-        
-        # Add fewest transfer routes (if different from others)
-        for route_data in categorized_routes['fewest_transfers']:
-            if not any(abs(r['duration'] - route_data['duration']) < 2 for r in final_routes):
-                formatted_route = self.format_route_for_frontend(route_data, route_id, "Direct" if route_data['transfers'] == 0 else "Best")
-                final_routes.append(formatted_route)
-                route_id += 1
-        
-        # Ensure we have at least 3 routes by adding balanced options
-        if len(final_routes) < 3:
-            remaining_routes = [r for r in route_analysis if not any(abs(fr['duration'] - r['duration']) < 3 for fr in final_routes)]
-            balanced_routes = sorted(remaining_routes, key=lambda x: -(x['score']))
-            
-            for route_data in balanced_routes[:3-len(final_routes)]:
-                formatted_route = self.format_route_for_frontend(route_data, route_id, "Good")
-                final_routes.append(formatted_route)
-                route_id += 1
+        chosen = set()
+        chosen_structures = set()
+        
+        def add_route(i, route_type):
+            # Diversity by what the route rides, not by how long it takes
+            structure = all_metrics[i]['leg_structure']
+            if i in chosen or structure in chosen_structures:
+                return False
+            chosen.add(i)
+            chosen_structures.add(structure)
+            final_routes.append(self.format_route_for_frontend(route_analysis[i], len(final_routes) + 1, route_type, all_metrics[i]))
+            return True
+        
+        fastest = front[route_scoring.smallest(1, duration[front], cost[front], transfers[front])][0]
+        cheapest = front[route_scoring.smallest(1, cost[front], duration[front], transfers[front])][0]
+        fewest = front[route_scoring.smallest(1, transfers[front], duration[front], cost[front])][0]
+        
+        if add_route(fastest, "Fastest"):
+            print(f"🚀 FASTEST: {duration[fastest]:.1f}min, {int(transfers[fastest])} transfers, ₹{route_analysis[fastest]['cost']}")
+        if add_route(cheapest, "Cheapest"):
+            print(f"💰 CHEAPEST: ₹{route_analysis[cheapest]['cost']}, {duration[cheapest]:.1f}min, {int(transfers[cheapest])} transfers")
+        if add_route(fewest, "Direct" if transfers[fewest] == 0 else "Best"):
+            print(f"🔄 FEWEST TRANSFERS: {int(transfers[fewest])} transfers, {duration[fewest]:.1f}min, ₹{route_analysis[fewest]['cost']}")
+        
+        # Fill with the best-scored remaining trade-offs from the front, and
+        # from later fronts only while there are fewer than 3 routes, unless
+        # the request is already out of time
+        if len(final_routes) < 3 and deadline is not None and deadline.expired():
+            deadline.mark_partial()
+        else:
+            for i in route_scoring.smallest(len(routes), layers, -scores).tolist():
+                if len(final_routes) >= 5 or (layers[i] > 0 and len(final_routes) >= 3):
+                    break
+                add_route(i, "Good")
         
         print(f"✅ Returning {len(final_routes)} categorized routes")
-        return final_routes[:5]  # Maximum 5 routes
+        return final_routes  # Maximum 5 routes
     
-    def format_route_for_frontend(self, route_data, route_id, route_type):
+    def format_route_for_frontend(self, route_data, route_id, route_type, metrics=None):
         """Format route data for frontend consumption with detailed fare information"""
         raw_route = route_data['raw_route']
-        cost_info = self.estimate_cost(raw_route)
+        metrics = metrics or self.get_route_metrics(raw_route)
         
         return {
             'route_id': route_id,
             'duration': int(route_data['duration']),
             'transfers': route_data['transfers'],
             'score': round(route_data['score'], 2),
-            'cost': cost_info['total_cost'] if isinstance(cost_info, dict) else cost_info,
-            'fare_breakdown': cost_info.get('breakdown', []) if isinstance(cost_info, dict) else [],
+            'cost': metrics['cost'],
+            'fare_breakdown': metrics['fare_breakdown'],
             'eco_score': round(route_data['eco_score'], 1),
             'route_type': route_type,
             'legs': self.format_legs(raw_route.get('legs', [])),
             'start_time': raw_route.get('startTime', 0),
             'end_time': raw_route.get('endTime', 0),
             'walkTime': route_data['walk_time'],
-            'transitTime': raw_route.get('transitTime', 0) / 60,
-            'waitingTime': raw_route.get('waitingTime', 0) / 60,
+            'transitTime': metrics['transit_time'],
+            'waitingTime': metrics['waiting_time'],
             'raw_route': raw_route
         }
     
+    def get_route_metrics(self, route):
+        """Cost, fare breakdown, transfers, eco score and durations of an itinerary.
+
+        Callers working on a batch compute these once per itinerary and pass
+        them along; nothing is stored on the itinerary, which is shared
+        between threads and cached plans and sent to clients as raw_route.
+        """
+        cost_info = self.estimate_cost(route)
+        return {
+            'cost': cost_info['total_cost'],
+            'fare_breakdown': cost_info['breakdown'],
+            'transfers': self.count_transfers(route),
+            'eco_score': self.calculate_eco_score(route),
+            'duration': route.get('duration', 0) / 60,  # minutes
+            'walk_time': route.get('walkTime', 0) / 60,
+            'transit_time': route.get('transitTime', 0) / 60,
+            'waiting_time': route.get('waitingTime', 0) / 60,
+            'leg_structure': self.leg_structure(route)
+        }
+    
+    def leg_structure(self, route):
+        """The rides an itinerary takes as (mode, line) pairs; walking is ignored"""
+        return tuple(
+            (leg.get('mode'), leg.get('routeShortName') or leg.get('routeId') or leg.get('route') or '')
+            for leg in route.get('legs', [])
+            if leg.get('mode') != 'WALK'
+        )
+    
     def count_transfers(self, route):
         """Count number of transfers in a route including auto-rickshaw"""
         transit_legs = 0
@@ -707,61 +956,21 @@ class RouteOptimizer:
     
     def calculate_score(self, route, profile):
         """Calculate route score based on user profile"""
-        transfer_weight = profile.get('transfer_preference', 0.4)
-        time_weight = profile.get('time_preference', 0.3)
-        cost_weight = profile.get('cost_preference', 0.2)
-        eco_weight = profile.get('eco_preference', 0.1)
-        
-        # Normalize scores (0-10 scale)
-        transfers = self.count_transfers(route)
-        duration_minutes = route['duration'] / 60
-        
-        transfer_score = max(0, 10 - transfers * 3)  # Fewer transfers = higher score
-        time_score = max(0, 10 - duration_minutes / 10)  # Faster = higher score
-        cost_info = self.estimate_cost(route)
-        cost = cost_info['total_cost'] if isinstance(cost_info, dict) else cost_info
-        cost_score = max(0, 10 - cost / 10)  # Cheaper = higher score
-        eco_score = self.calculate_eco_score(route)
-        
-        total_score = (
-            transfer_score * transfer_weight +
-            time_score * time_weight +
-            cost_score * cost_weight +
-            eco_score * eco_weight
-        )
-        
-        return total_score
+        # Normalize scores (0-10 scale); the same formula optimize_routes
+        # applies to a whole candidate batch
+        matrix = route_scoring.metric_matrix([self.get_route_metrics(route)])
+        return float(route_scoring.score_matrix(matrix, profile)[0])
     
     def calculate_train_fare(self, from_station, to_station, distance_km=0):
         """Calculate accurate Mumbai train fare between stations with class options"""
         
-        # Clean and normalize station names
-        from_station = self.normalize_station_name(from_station)
-        to_station = self.normalize_station_name(to_station)
-        
-        print(f"🚂 Calculating train fare: {from_station} → {to_station} ({distance_km:.1f}km)")
+        # Exact fare from the station x station matrix; any known spelling
+        # resolves to the same station id
+        fares = self.rail_fares.lookup(from_station, to_station)
+        if fares:
+            return fares
         
-        # Try to find exact fare from our fare table
-        for line, line_data in self.train_fares.items():
-            if line == 'default_fares':
-                continue
-                
-            fare_zones = line_data.get('fare_zones', {})
-            
-            # Check direct route
-            direct_key = (from_station, to_station)
-            reverse_key = (to_station, from_station)
-            
-            if direct_key in fare_zones:
-                fares = fare_zones[direct_key]
-                print(f"✅ Found direct fare on {line}: 2nd=₹{fares['2nd']}, 1st=₹{fares['1st']}, AC=₹{fares['AC']}")
-                return fares
-            elif reverse_key in fare_zones:
-                fares = fare_zones[reverse_key] 
-                print(f"✅ Found reverse fare on {line}: 2nd=₹{fares['2nd']}, 1st=₹{fares['1st']}, AC=₹{fares['AC']}")
-                return fares
-        
-        # If no exact match, use distance-based calculation
+        # If either station is off the network, use distance-based calculation
         if distance_km > 0:
             if distance_km <= 5:
                 zone = 'short'
@@ -771,49 +980,10 @@ class RouteOptimizer:
                 zone = 'long'
             else:
                 zone = 'very_long'
-                
-            fares = self.train_fares['default_fares'][zone]
-            print(f"✅ Using distance-based fare ({zone}): 2nd=₹{fares['2nd']}, 1st=₹{fares['1st']}, AC=₹{fares['AC']}")
-            return fares
+            return self.train_fares['default_fares'][zone]
         
         # Ultimate fallback
-        default_fare = {'2nd': 10, '1st': 50, 'AC': 70}
-        print(f"⚠️  Using default train fare: 2nd=₹{default_fare['2nd']}, 1st=₹{default_fare['1st']}, AC=₹{default_fare['AC']}")
-        return default_fare
-    
-    def normalize_station_name(self, station_name):
-        """Normalize station names for fare lookup"""
-        if not station_name:
-            return ""
-            
-        # Convert to standard format
-        name = station_name.strip().upper()
-        
-        # Common name mappings
-        name_mappings = {
-            'CST': 'CSMT',
-            'CSMT': 'CSMT',  # Keep CSMT as-is
-            'CHHATRAPATI SHIVAJI TERMINUS': 'CSMT', 
-            'CHHATRAPATI SHIVAJI MAHARAJ TERMINUS': 'CSMT',
-            'VT': 'CSMT',
-            'VICTORIA TERMINUS': 'CSMT',
-            'MUMBAI CENTRAL': 'Mumbai Central',
-            'BCT': 'Mumbai Central',
-            'BOMBAY CENTRAL': 'Mumbai Central',
-            'CHURCHGATE': 'Churchgate',
-            'DADAR': 'Dadar',
-            'ANDHERI': 'Andheri',
-            'BORIVALI': 'Borivali',
-            'VIRAR': 'Virar',
-            'KURLA': 'Kurla',
-            'THANE': 'Thane',
-            'KALYAN': 'Kalyan',
-            'PANVEL': 'Panvel',
-            'VASHI': 'Vashi',
-            'NERUL': 'Nerul'
-        }
-        
-        return name_mappings.get(name, station_name.title())
+        return {'2nd': 10, '1st': 50, 'AC': 70}
     
     def estimate_cost(self, route):
         """Estimate route cost in INR with accurate Mumbai transport pricing and class options (2025)"""
@@ -849,6 +1019,12 @@ class RouteOptimizer:
                 }
                     
             elif mode == 'RAIL':
+                # Fares go by track distance between the stations when both
+                # are on the local network, not by OTP's leg geometry
+                rail_trip = self.rail_network.graph.lookup(from_name, to_name)
+                if rail_trip:
+                    distance = rail_trip['km']
+                
                 # Mumbai Local Train: Use accurate fare table
                 train_fares = self.calculate_train_fare(from_name, to_name, distance)
                 leg_cost = train_fares['2nd']  # Default to 2nd class for cost calculation
@@ -856,6 +1032,8 @@ class RouteOptimizer:
                 # Determine line based on route information
                 route_info = leg.get('routeLongName', '')
                 line = 'WR' if 'western' in route_info.lower() else 'CR' if 'central' in route_info.lower() else 'HR' if 'harbour' in route_info.lower() else 'LOCAL'
+                if line == 'LOCAL' and rail_trip and rail_trip['transfers'] == 0:
+                    line = self.rail_network.graph.line_between(from_name, to_name) or line
                 
                 fare_details = {
                     'mode': 'RAIL',
@@ -974,9 +1152,10 @@ class RouteOptimizer:
     
     def get_route_type(self, route, profile, route_index=0):
         """Determine route type label based on route characteristics"""
-        transfers = self.count_transfers(route)
-        duration = route['duration'] / 60  # minutes
-        walk_time = route.get('walkTime', 0) / 60  # minutes
+        metrics = self.get_route_metrics(route)
+        transfers = metrics['transfers']
+        duration = metrics['duration']  # minutes
+        walk_time = metrics['walk_time']  # minutes
         
         # Check if it's an auto-rickshaw route (CAR mode converted to AUTO)
         legs = route.get('legs', [])
@@ -1221,33 +1400,9 @@ class RouteOptimizer:
                 place.get('stationName') or 
                 place.get('vertexType', ''))
         
-        # Clean up the name for better readability
+        # Cleaned once per distinct OTP name and memoized
         if name:
-            # Remove coordinate suffixes like "::1234,5678"
-            if '::' in name:
-                name = name.split('::')[0]
-            
-            # Remove parenthetical coordinates
-            if name.endswith(')') and '(' in name:
-                paren_pos = name.rfind('(')
-                potential_coords = name[paren_pos+1:-1]
-                # Check if it looks like coordinates (numbers, commas, dots)
-                if all(c.isdigit() or c in '.,- ' for c in potential_coords):
-                    name = name[:paren_pos].strip()
-            
-            # Clean up common OTP artifacts
-            name = name.replace('_', ' ')
-            name = ' '.join(word.capitalize() for word in name.split())
-            
-            # Handle common Mumbai station name patterns
-            if 'STATION' in name.upper():
-                name = name.replace('STATION', 'Station')
-            if 'ROAD' in name.upper():
-                name = name.replace('ROAD', 'Road')
-            if 'DEPOT' in name.upper():
-                name = name.replace('DEPOT', 'Depot')
-                
-            return name
+            return clean_place_name(name)
         
         # Fallback to coordinates if no name available
         lat = place.get('lat', 0)
@@ -0,0 +1,101 @@
+import numpy as np
+
+# Column order of the candidate metric matrix
+TRANSFERS, DURATION, COST, ECO, WALK = range(5)
+METRIC_KEYS = ('transfers', 'duration', 'cost', 'eco_score', 'walk_time')
+
+# Profile weight per normalized column (transfer, time, cost, eco) and the
+# default calculate_score uses when a profile leaves it out
+PROFILE_WEIGHTS = (
+    ('transfer_preference', 0.4),
+    ('time_preference', 0.3),
+    ('cost_preference', 0.2),
+    ('eco_preference', 0.1)
+)
+
+
+def metric_matrix(metrics):
+    """(n, 5) float array of transfers, duration, cost, eco score and walk time (minutes)"""
+    return np.array([[m[key] for key in METRIC_KEYS] for m in metrics], dtype=np.float64).reshape(-1, len(METRIC_KEYS))
+
+
+def profile_weights(profile):
+    return np.array([profile.get(key, default) for key, default in PROFILE_WEIGHTS], dtype=np.float64)
+
+
+def score_matrix(matrix, profile):
+    """Profile scores for every candidate in one matrix-vector product (same scale as calculate_score)"""
+    normalized = np.column_stack((
+        np.maximum(0, 10 - matrix[:, TRANSFERS] * 3),  # Fewer transfers = higher score
+        np.maximum(0, 10 - matrix[:, DURATION] / 10),  # Faster = higher score
+        np.maximum(0, 10 - matrix[:, COST] / 10),      # Cheaper = higher score
+        matrix[:, ECO]
+    ))
+    return normalized @ profile_weights(profile)
+
+
+def smallest(k, *keys):
+    """Indices of the k smallest rows ordered by keys (primary first), ties by position.
+
+    Same order as a stable sorted(...)[:k], but only rows tied with or below
+    the primary key's k-th value are fully sorted.
+    """
+    primary = keys[0]
+    n = len(primary)
+    if n == 0 or k <= 0:
+        return np.array([], dtype=int)
+    if k < n:
+        threshold = np.partition(primary, k - 1)[k - 1]
+        candidates = np.flatnonzero(primary <= threshold)
+    else:
+        candidates = np.arange(n)
+    # np.lexsort sorts by its last key first
+    order = np.lexsort((candidates,) + tuple(key[candidates] for key in reversed(keys)))
+    return candidates[order][:k]
+
+
+def objectives(matrix):
+    """Columns to minimise for Pareto selection: duration, cost, transfers and (negated) eco score"""
+    return np.column_stack((
+        matrix[:, DURATION],
+        matrix[:, COST],
+        matrix[:, TRANSFERS],
+        -matrix[:, ECO]
+    ))
+
+
+def non_dominated(values):
+    """Indices of rows no other row is at least as good as in every column.
+    Identical rows keep only the first."""
+    return np.flatnonzero(pareto_layers(values) == 0)
+
+
+def pareto_layers(values):
+    """Front number per row: 0 for the Pareto front, 1 for the front of what remains, and so on.
+
+    Rows are sorted lexicographically (duration first), where a row can only
+    be dominated by rows sorted before it; identical rows count the earlier
+    one as dominating. A row's front is then one past the deepest front of
+    any row dominating it, so a single scan in sorted order settles every
+    row instead of peeling the fronts off one by one.
+
+    The dominance test is one vectorized (n, n) comparison, so this is
+    O(n^2) element work rather than O(n log n): exact sort-only sweeps exist
+    for two objectives, not the four compared here, and a plan ranks at
+    most 72 raw itineraries (36 OTP variants, 2 each).
+    """
+    n = len(values)
+    if n == 0:
+        return np.array([], dtype=int)
+    order = np.lexsort(tuple(values[:, column] for column in reversed(range(values.shape[1]))))
+    ranked = values[order]
+    # dominated[j, i]: row i, sorted before row j, is at least as good everywhere
+    dominated = np.tril((ranked[None, :, :] <= ranked[:, None, :]).all(axis=2), -1)
+
+    sorted_layers = np.zeros(n, dtype=int)
+    for j in np.flatnonzero(dominated.any(axis=1)).tolist():
+        sorted_layers[j] = sorted_layers[:j][dominated[j, :j]].max() + 1
+
+    layers = np.empty(n, dtype=int)
+    layers[order] = sorted_layers
+    return layers
@@ -0,0 +1,77 @@
+import threading
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into one in-flight computation"""
+
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            'executions': 0,
+            'coalesced': 0,
+            'in_flight': 0
+        }
+
+    def do(self, key, fn, timeout=None):
+        """Run fn() for key, or wait for and share the result of a run already in progress.
+
+        Waiters give up with TimeoutError after timeout seconds; the run itself
+        is left to finish for the caller that started it.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self._stats['executions'] += 1
+            else:
+                self._stats['coalesced'] += 1
+
+        if not leader:
+            if not flight.done.wait(timeout):
+                raise TimeoutError(f"Timed out waiting on in-flight call for {key}")
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            result = fn()
+        except BaseException as e:
+            self.settle(key, flight, error=e)
+            raise
+        self.settle(key, flight, result)
+        return result
+
+    def claim(self, key):
+        """Start a run for key that the caller completes with settle(), or
+        None (counted as coalesced) when one is already in progress"""
+        with self._lock:
+            if key in self._flights:
+                self._stats['coalesced'] += 1
+                return None
+            flight = self._flights[key] = _Flight()
+            self._stats['executions'] += 1
+        return flight
+
+    def settle(self, key, flight, result=None, error=None):
+        """Finish a claimed run and hand result (or error) to its waiters"""
+        flight.result = result
+        flight.error = error
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        flight.done.set()
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['in_flight'] = len(self._flights)
+        return stats
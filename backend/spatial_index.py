@@ -0,0 +1,159 @@
+import math
+import numpy as np
+
+EARTH_RADIUS_KM = 6371
+CELL_SIZE_KM = 0.5
+
+
+class SpatialIndex:
+    """Uniform grid over a StationStore's projected coordinates for nearest-stop queries"""
+
+    def __init__(self, stations, cell_size_km=CELL_SIZE_KM):
+        self.stations = stations
+        self.cell_size = cell_size_km
+
+        located = stations.located()
+        self.positions = np.flatnonzero(located)
+
+        # Equirectangular projection around the mean latitude is accurate to
+        # well under 1% across a metro area and makes distances plain Euclidean
+        mean_lat = float(stations.lat[located].mean()) if self.positions.size else 19.0
+        self.cos_lat = math.cos(math.radians(mean_lat))
+        self.xs = np.radians(stations.lng[located]) * EARTH_RADIUS_KM * self.cos_lat
+        self.ys = np.radians(stations.lat[located]) * EARTH_RADIUS_KM
+
+        # Cells hold rows of xs/ys (and of positions); coordinates are only
+        # ever read from the arrays
+        cell_xs = np.floor(self.xs / self.cell_size).astype(np.int64)
+        cell_ys = np.floor(self.ys / self.cell_size).astype(np.int64)
+        order = np.lexsort((cell_ys, cell_xs))
+        self.cells = {}
+        if order.size:
+            keys = np.column_stack((cell_xs[order], cell_ys[order]))
+            starts = np.flatnonzero(np.r_[True, (keys[1:] != keys[:-1]).any(axis=1)])
+            for rows, (cell_x, cell_y) in zip(np.split(order.astype(np.int32), starts[1:]), keys[starts].tolist()):
+                self.cells[(cell_x, cell_y)] = rows
+
+        if self.cells:
+            xs = [cx for cx, _ in self.cells]
+            ys = [cy for _, cy in self.cells]
+            self.bounds = (min(xs), max(xs), min(ys), max(ys))
+        else:
+            self.bounds = (0, 0, 0, 0)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def project(self, lat, lng):
+        """Project lat/lng to kilometres on a local plane"""
+        return (
+            math.radians(lng) * EARTH_RADIUS_KM * self.cos_lat,
+            math.radians(lat) * EARTH_RADIUS_KM
+        )
+
+    def cell_of(self, x, y):
+        return (int(math.floor(x / self.cell_size)), int(math.floor(y / self.cell_size)))
+
+    def _ring(self, cx, cy, radius):
+        """Grid cells exactly `radius` steps away from (cx, cy)"""
+        if radius == 0:
+            yield (cx, cy)
+            return
+        for dx in range(-radius, radius + 1):
+            yield (cx + dx, cy - radius)
+            yield (cx + dx, cy + radius)
+        for dy in range(-radius + 1, radius):
+            yield (cx - radius, cy + dy)
+            yield (cx + radius, cy + dy)
+
+    def _max_ring(self, cx, cy):
+        min_x, max_x, min_y, max_y = self.bounds
+        return max(abs(cx - min_x), abs(cx - max_x), abs(cy - min_y), abs(cy - max_y))
+
+    def nearest(self, lat, lng, k=1, max_distance_km=None):
+        """k nearest stations as a list of (station, distance_km), closest first"""
+        if not len(self.positions) or k <= 0:
+            return []
+
+        x, y = self.project(lat, lng)
+        cx, cy = self.cell_of(x, y)
+
+        # Far outside the covered area ring expansion would walk mostly empty
+        # cells, a straight scan of the points is cheaper there
+        min_x, max_x, min_y, max_y = self.bounds
+        margin = 20
+        if not (min_x - margin <= cx <= max_x + margin and min_y - margin <= cy <= max_y + margin):
+            distances = np.hypot(self.xs - x, self.ys - y)
+            order = np.argsort(distances, kind='stable')[:k]
+            if max_distance_km is not None:
+                order = order[distances[order] <= max_distance_km]
+            return [(self.stations[int(self.positions[i])], float(distances[i])) for i in order]
+
+        # Best k rows seen so far, closest first
+        best_rows = np.empty(0, dtype=np.int32)
+        best_distances = np.empty(0)
+
+        for radius in range(self._max_ring(cx, cy) + 1):
+            # Nothing in this ring or beyond can be closer than this
+            ring_floor = (radius - 1) * self.cell_size if radius > 0 else 0
+            if len(best_rows) == k and best_distances[-1] <= ring_floor:
+                break
+            if max_distance_km is not None and ring_floor > max_distance_km:
+                break
+
+            ring = [self.cells[cell] for cell in self._ring(cx, cy, radius) if cell in self.cells]
+            if not ring:
+                continue
+            rows = np.concatenate(ring)
+            distances = np.hypot(self.xs[rows] - x, self.ys[rows] - y)
+            if max_distance_km is not None:
+                inside = distances <= max_distance_km
+                rows, distances = rows[inside], distances[inside]
+            best_rows = np.concatenate((best_rows, rows))
+            best_distances = np.concatenate((best_distances, distances))
+            keep = np.lexsort((best_rows, best_distances))[:k]
+            best_rows, best_distances = best_rows[keep], best_distances[keep]
+
+        return [
+            (self.stations[int(self.positions[row])], distance)
+            for row, distance in zip(best_rows.tolist(), best_distances.tolist())
+        ]
+
+    def within(self, lat, lng, radius_km, limit=None):
+        """Stations within radius_km as a list of (station, distance_km), closest first"""
+        if not len(self.positions) or radius_km < 0:
+            return []
+
+        x, y = self.project(lat, lng)
+        min_cx, min_cy = self.cell_of(x - radius_km, y - radius_km)
+        max_cx, max_cy = self.cell_of(x + radius_km, y + radius_km)
+
+        # A radius covering more cells than there are stations is cheaper to
+        # answer with one vectorized pass over every point
+        if (max_cx - min_cx + 1) * (max_cy - min_cy + 1) > len(self.positions):
+            distances = np.hypot(self.xs - x, self.ys - y)
+            inside = np.flatnonzero(distances <= radius_km)
+            order = inside[np.lexsort((self.positions[inside], distances[inside]))]
+            if limit:
+                order = order[:limit]
+            return [(self.stations[int(self.positions[i])], float(distances[i])) for i in order]
+
+        cells = [
+            self.cells[(cell_x, cell_y)]
+            for cell_x in range(min_cx, max_cx + 1)
+            for cell_y in range(min_cy, max_cy + 1)
+            if (cell_x, cell_y) in self.cells
+        ]
+        if not cells:
+            return []
+        rows = np.concatenate(cells)
+        distances = np.hypot(self.xs[rows] - x, self.ys[rows] - y)
+        inside = distances <= radius_km
+        rows, distances = rows[inside], distances[inside]
+        order = np.lexsort((rows, distances))
+        if limit:
+            order = order[:limit]
+        return [
+            (self.stations[int(self.positions[row])], distance)
+            for row, distance in zip(rows[order].tolist(), distances[order].tolist())
+        ]
@@ -0,0 +1,112 @@
+import heapq
+from bisect import bisect_left
+from mode_planner import stop_kind
+from station_index import STATION_ALIASES, normalize, split_words
+from station_fuzzy import StationFuzzyMatcher
+
+# Match quality, best first; lower ranks win before importance is considered
+MATCH_RANKS = {
+    'exact': 0,
+    'prefix': 1,
+    'alias': 2,
+    'word': 3,
+    'fuzzy': 4
+}
+
+# Stop importance by kind: rail stations, then metro, then everything else
+KIND_IMPORTANCE = {
+    'rail': 3.0,
+    'metro': 2.0,
+    None: 1.0
+}
+
+DEFAULT_LIMIT = 8
+MAX_LIMIT = 50
+
+
+class StationAutocomplete:
+    """Sorted-array prefix index over normalized station names, name words and aliases"""
+
+    def __init__(self, stations):
+        self.stations = stations
+
+        # One entry per distinct normalized name; platforms and stops sharing
+        # a name collapse into the first one, and their count adds importance
+        first_position = {}
+        stop_counts = {}
+        for position, name in enumerate(stations.names):
+            name = normalize(name)
+            if not name:
+                continue
+            first_position.setdefault(name, position)
+            stop_counts[name] = stop_counts.get(name, 0) + 1
+
+        self.importance = {}
+        for name, position in first_position.items():
+            kind = stop_kind({'name': name, 'type': stations.type_of(position)})
+            self.importance[position] = KIND_IMPORTANCE[kind] + min(stop_counts[name] - 1, 5) * 0.1
+
+        # (key, kind, position): whole names, later words of names, aliases
+        entries = []
+        for name, position in first_position.items():
+            entries.append((name, 'prefix', position))
+            words = split_words(name)
+            for start in range(1, len(words)):
+                entries.append((' '.join(words[start:]), 'word', position))
+        for group in STATION_ALIASES:
+            target = next((first_position[name] for name in group if name in first_position), None)
+            if target is None:
+                continue
+            for alias in group:
+                if first_position.get(alias) != target:
+                    entries.append((alias, 'alias', target))
+
+        entries.sort()
+        self.keys = [key for key, _, _ in entries]
+        self.kinds = [kind for _, kind, _ in entries]
+        self.positions = [position for _, _, position in entries]
+
+        # Typo-tolerant fallback, shared with coordinate resolution
+        self.fuzzy = StationFuzzyMatcher(stations, self.importance)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        """Top stations for a typed prefix as a list of (station, match_type), best first"""
+        prefix = ' '.join(split_words(normalize(query)))
+        if not prefix or limit <= 0:
+            return []
+
+        # Best (rank, -importance, length, position) seen per station
+        best = {}
+        start = bisect_left(self.keys, prefix)
+        for i in range(start, len(self.keys)):
+            key = self.keys[i]
+            if not key.startswith(prefix):
+                break
+            kind = self.kinds[i]
+            rank = MATCH_RANKS[kind]
+            if len(key) == len(prefix) and kind != 'word':
+                # The whole name or alias was typed
+                rank = MATCH_RANKS['exact']
+                if kind == 'prefix':
+                    kind = 'exact'
+            position = self.positions[i]
+            score = (rank, -self.importance[position], len(key), position)
+            if position not in best or score < best[position][0]:
+                best[position] = (score, kind)
+
+        # Bounded heap: only the top `limit` of possibly thousands of matches are ordered
+        top = heapq.nsmallest(limit, best.values())
+        results = [(self.stations[score[3]], kind) for score, kind in top]
+
+        # Too few matches for what was typed: fill up with close misspellings
+        if len(results) < limit:
+            seen = {score[3] for score, _ in top}
+            for position, distance in self.fuzzy.search(prefix, limit):
+                if len(results) >= limit:
+                    break
+                if position not in seen:
+                    results.append((self.stations[position], 'fuzzy'))
+        return results
@@ -0,0 +1,98 @@
+import json
+import os
+import threading
+import time
+from station_store import StationStore
+from station_index import StationIndex
+from spatial_index import SpatialIndex
+from station_autocomplete import StationAutocomplete
+import station_payload
+
+DEFAULT_SNAPSHOT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'stations.json')
+
+# Station fields kept in the snapshot, in row order
+SNAPSHOT_FIELDS = ('name', 'lat', 'lng', 'type', 'id')
+
+
+class StationCatalog:
+    """A StationStore together with the indexes built over it.
+
+    Catalogs are never modified after construction; a refresh builds a new
+    one and swaps the reference, so readers always see a matching set of
+    stations and indexes.
+    """
+
+    def __init__(self, stations, source):
+        self.stations = StationStore(stations)
+        self.source = source
+        self.loaded_at = time.time()
+        self.station_index = StationIndex(self.stations)
+        self.spatial_index = SpatialIndex(self.stations)
+        self.autocomplete = StationAutocomplete(self.stations)
+        self.fuzzy = self.autocomplete.fuzzy
+        # /api/stations bodies, serialized and compressed once per catalog
+        self._payloads = {}
+        self._payload_lock = threading.Lock()
+
+    def payload(self, layout='full'):
+        """PreparedPayload of this station set in the given layout, built on first use"""
+        prepared = self._payloads.get(layout)
+        if prepared is None:
+            with self._payload_lock:
+                prepared = self._payloads.get(layout)
+                if prepared is None:
+                    prepared = station_payload.prepare(self.stations, layout)
+                    self._payloads[layout] = prepared
+        return prepared
+
+    def get_stats(self):
+        return {
+            'count': len(self.stations),
+            'source': self.source,
+            'loaded_at': self.loaded_at,
+            'payload_bytes': {layout: prepared.get_stats() for layout, prepared in self._payloads.items()}
+        }
+
+
+def snapshot_path():
+    return os.environ.get('STATION_SNAPSHOT_PATH', DEFAULT_SNAPSHOT_PATH)
+
+
+def load_snapshot(path):
+    """Stations from a snapshot written by save_snapshot, or None"""
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        fields = data.get('fields') or SNAPSHOT_FIELDS
+        stations = [
+            {field: value for field, value in zip(fields, row) if value is not None}
+            for row in data.get('stations', [])
+        ]
+        return stations or None
+    except Exception as e:
+        print(f"⚠️  Could not read station snapshot {path}: {e}")
+        return None
+
+
+def save_snapshot(path, stations):
+    """Write stations as compact rows, replacing any previous snapshot atomically"""
+    if not path:
+        return False
+    try:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        rows = [
+            [station.get(field) for field in SNAPSHOT_FIELDS]
+            for station in stations if isinstance(station, dict)
+        ]
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump({'fields': SNAPSHOT_FIELDS, 'saved_at': time.time(), 'stations': rows}, f, separators=(',', ':'))
+        os.replace(temporary, path)
+        return True
+    except Exception as e:
+        print(f"⚠️  Could not write station snapshot {path}: {e}")
+        return False
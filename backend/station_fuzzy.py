@@ -0,0 +1,156 @@
+import heapq
+from collections import Counter
+from itertools import chain
+from station_index import normalize, split_words
+
+GRAM_SIZE = 3
+# Edit distance only ever runs on this many candidates, whatever the query,
+# which bounds a lookup to a few milliseconds over the full stop set
+MAX_CANDIDATES = 64
+# Words shorter than this are too ambiguous to match on their own
+MIN_WORD_LENGTH = 4
+
+
+def allowed_distance(length):
+    """Edits tolerated for a query of this length"""
+    if length < 4:
+        return 0
+    if length < 6:
+        return 1
+    if length < 10:
+        return 2
+    return 3
+
+
+def grams(text):
+    return {text[i:i + GRAM_SIZE] for i in range(len(text) - GRAM_SIZE + 1)}
+
+
+def edit_distance(query, key, max_distance, prefix=False):
+    """Levenshtein distance, or the distance to the closest prefix of key when
+    prefix is set; None as soon as it must exceed max_distance.
+
+    Only the diagonal band of width 2 * max_distance + 1 is computed, cells
+    outside it can never be within max_distance.
+    """
+    limit = max_distance + 1
+    length = len(key)
+    previous = [min(j, limit) for j in range(length + 1)]
+    for i, query_char in enumerate(query, 1):
+        low = max(1, i - max_distance)
+        high = min(length, i + max_distance)
+        current = [limit] * (length + 1)
+        current[0] = min(i, limit)
+        for j in range(low, high + 1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (query_char != key[j - 1]),
+                limit
+            )
+        if min(current[low - 1:high + 1]) > max_distance:
+            return None
+        previous = current
+    distance = min(previous) if prefix else previous[-1]
+    return distance if distance <= max_distance else None
+
+
+class StationFuzzyMatcher:
+    """Trigram candidate index with bounded edit-distance verification over station names and name words"""
+
+    def __init__(self, stations, importance):
+        self.stations = stations
+        self.importance = importance
+
+        # Keys are whole names (mapping to the name's first stop) and the
+        # longer words of names (mapping to every name using the word)
+        self.keys = []
+        self.key_positions = []
+        self.key_is_word = []
+        key_ids = {}
+        for position in importance:
+            name = normalize(stations.names[position])
+            self._add_key(key_ids, name, position, False)
+            for word in split_words(name):
+                if len(word) >= MIN_WORD_LENGTH and word != name:
+                    self._add_key(key_ids, word, position, True)
+
+        # Keys are padded with '$' so the start and end of a name carry weight
+        self.postings = {}
+        for key_id, key in enumerate(self.keys):
+            for gram in grams(f"${key}$"):
+                self.postings.setdefault(gram, []).append(key_id)
+
+    def _add_key(self, key_ids, key, position, is_word):
+        key_id = key_ids.get(key)
+        if key_id is None:
+            key_id = key_ids[key] = len(self.keys)
+            self.keys.append(key)
+            self.key_positions.append([])
+            self.key_is_word.append(is_word)
+        elif not is_word:
+            self.key_is_word[key_id] = False
+        self.key_positions[key_id].append(position)
+
+    def _candidates(self, padded_query, max_distance):
+        """Keys sharing the most trigrams with the query, best MAX_CANDIDATES only"""
+        query_grams = grams(padded_query)
+        counts = Counter(chain.from_iterable(self.postings.get(gram, ()) for gram in query_grams))
+        # Each edit destroys at most GRAM_SIZE of the query's trigrams
+        required = max(1, len(query_grams) - GRAM_SIZE * max_distance)
+        return [
+            key_id for key_id, count in counts.most_common(MAX_CANDIDATES)
+            if count >= required
+        ]
+
+    def _matches(self, query, prefix):
+        max_distance = allowed_distance(len(query))
+        if max_distance == 0:
+            return []
+        padded = f"${query}" if prefix else f"${query}$"
+        matches = []
+        for key_id in self._candidates(padded, max_distance):
+            key = self.keys[key_id]
+            if prefix:
+                # No prefix longer than this can be within max_distance
+                key = key[:len(query) + max_distance]
+            elif abs(len(key) - len(query)) > max_distance:
+                continue
+            distance = edit_distance(query, key, max_distance, prefix)
+            if distance is not None:
+                matches.append((distance, key_id))
+        return matches
+
+    def _rank(self, distance, key_id, position):
+        return (
+            distance,
+            self.key_is_word[key_id],
+            -self.importance[position],
+            len(self.stations.names[position]),
+            position
+        )
+
+    def find(self, term):
+        """Closest station to a possibly misspelt name as (station, match_type), or (None, None)"""
+        query = ' '.join(split_words(normalize(term)))
+        best = None
+        for distance, key_id in self._matches(query, prefix=False):
+            for position in self.key_positions[key_id]:
+                rank = self._rank(distance, key_id, position)
+                if best is None or rank < best:
+                    best = rank
+        if best is None:
+            return None, None
+        return self.stations[best[-1]], f"fuzzy (distance {best[0]})"
+
+    def search(self, query, limit):
+        """Up to limit (position, distance) whose name or a name word starts like the
+        query, allowing for typos, best first"""
+        query = ' '.join(split_words(normalize(query)))
+        best = {}
+        for distance, key_id in self._matches(query, prefix=True):
+            for position in self.key_positions[key_id]:
+                rank = self._rank(distance, key_id, position)
+                if position not in best or rank < best[position]:
+                    best[position] = rank
+        return [(rank[-1], rank[0]) for rank in heapq.nsmallest(limit, best.values())]
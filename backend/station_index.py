@@ -0,0 +1,146 @@
+import re
+
+# Groups of names that refer to the same station; the first name in a group
+# that exists in the loaded station set is used for every member
+STATION_ALIASES = [
+    ['csmt', 'cst', 'vt', 'chhatrapati shivaji terminus', 'chhatrapati shivaji maharaj terminus', 'victoria terminus'],
+    ['mumbai central', 'bct', 'bombay central'],
+    ['prabhadevi', 'elphinstone road', 'elphinstone'],
+    ['ram mandir', 'ram mandir road'],
+    ['king circle', "king's circle", 'kings circle'],
+]
+
+WORD_SPLIT = re.compile(r'[,.\s]+')
+NGRAM_SIZE = 3
+
+
+def normalize(name):
+    """Lower-case and trim a station name the same way for indexing and lookup"""
+    return name.lower().strip() if name else ''
+
+
+def split_words(name):
+    """Split a normalized name into words on commas, dots and whitespace"""
+    return [w for w in WORD_SPLIT.split(name) if w]
+
+
+def ngrams(text, size):
+    """All distinct character n-grams of the given size"""
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+class StationIndex:
+    """Lookup structures over a StationStore's names, built once per station set"""
+
+    def __init__(self, stations):
+        self.stations = stations
+
+        # Normalized name -> every station position with that name, in
+        # station order; unnamed stops would "contain" every search term
+        self.name_positions = {}
+        for position, name in enumerate(self.stations.names):
+            name = normalize(name)
+            if name:
+                self.name_positions.setdefault(name, []).append(position)
+
+        # Exact-name hash map: normalized name -> first station position
+        self.exact = {name: positions[0] for name, positions in self.name_positions.items()}
+
+        # Alias table: alternate spelling -> station position
+        self.aliases = {}
+        for group in STATION_ALIASES:
+            target = next((self.exact[name] for name in group if name in self.exact), None)
+            if target is not None:
+                for name in group:
+                    self.aliases.setdefault(name, target)
+
+        # Substring index: n-gram -> distinct names containing it
+        self.name_lengths = {len(name) for name in self.exact}
+        self.name_grams = self._build_gram_index(self.exact)
+
+        # Inverted word index: word -> station positions, in station order
+        self.word_postings = {}
+        for name, positions in self.name_positions.items():
+            for word in dict.fromkeys(split_words(name)):
+                self.word_postings.setdefault(word, []).extend(positions)
+        for postings in self.word_postings.values():
+            postings.sort()
+        self.word_lengths = {len(word) for word in self.word_postings}
+        self.word_grams = self._build_gram_index(self.word_postings)
+
+    def _build_gram_index(self, keys):
+        grams = {}
+        for key in keys:
+            for size in range(1, NGRAM_SIZE + 1):
+                for gram in ngrams(key, size):
+                    grams.setdefault(gram, []).append(key)
+        return grams
+
+    def _keys_containing(self, text, gram_index):
+        """Keys that contain text, using the rarest n-gram as the candidate set"""
+        size = min(len(text), NGRAM_SIZE)
+        postings = [gram_index.get(gram, ()) for gram in ngrams(text, size)]
+        if not postings:
+            return []
+        candidates = min(postings, key=len)
+        return [key for key in candidates if text in key]
+
+    def _keys_contained_in(self, text, keys, lengths):
+        """Keys that are substrings of text"""
+        found = set()
+        for length in lengths:
+            for start in range(len(text) - length + 1):
+                piece = text[start:start + length]
+                if piece in keys:
+                    found.add(piece)
+        return found
+
+    def search(self, search_term):
+        """Positions of stations whose name contains, or is contained in, the term, in station order"""
+        term = normalize(search_term)
+        if not term:
+            return []
+        names = set(self._keys_containing(term, self.name_grams))
+        names.update(self._keys_contained_in(term, self.exact, self.name_lengths))
+        return sorted(position for name in names for position in self.name_positions[name])
+
+    def find(self, search_term):
+        """Best station for a search term as (station, match_type), or (None, None).
+
+        Ranking matches the original linear scan: exact name, then alias, then
+        the shortest name that contains or is contained in the term, then the
+        highest share of search words that overlap a station word.
+        """
+        term = normalize(search_term)
+        if not term:
+            return None, None
+
+        if term in self.exact:
+            return self.stations[self.exact[term]], 'exact'
+
+        if term in self.aliases:
+            return self.stations[self.aliases[term]], 'alias'
+
+        partial = set(self._keys_containing(term, self.name_grams))
+        partial.update(self._keys_contained_in(term, self.exact, self.name_lengths))
+        if partial:
+            best = min(partial, key=lambda name: (len(name), self.exact[name]))
+            return self.stations[self.exact[best]], 'partial'
+
+        search_words = split_words(term)
+        counts = {}
+        for search_word in search_words:
+            words = set(self._keys_containing(search_word, self.word_grams))
+            words.update(self._keys_contained_in(search_word, self.word_postings, self.word_lengths))
+            positions = set()
+            for word in words:
+                positions.update(self.word_postings[word])
+            for position in positions:
+                counts[position] = counts.get(position, 0) + 1
+
+        if counts:
+            position, matching_words = min(counts.items(), key=lambda item: (-item[1], item[0]))
+            score = matching_words / len(search_words)
+            return self.stations[position], f"word ({score:.2f} score)"
+
+        return None, None
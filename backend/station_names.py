@@ -0,0 +1,111 @@
+import re
+import sys
+from functools import lru_cache
+from station_index import STATION_ALIASES, normalize
+
+# Spellings OTP and users give for stations, by upper-cased name
+STATION_NAME_MAPPINGS = {
+    'CST': 'CSMT',
+    'CSMT': 'CSMT',
+    'CHHATRAPATI SHIVAJI TERMINUS': 'CSMT',
+    'CHHATRAPATI SHIVAJI MAHARAJ TERMINUS': 'CSMT',
+    'VT': 'CSMT',
+    'VICTORIA TERMINUS': 'CSMT',
+    'MUMBAI CENTRAL': 'Mumbai Central',
+    'BCT': 'Mumbai Central',
+    'BOMBAY CENTRAL': 'Mumbai Central',
+    'CHURCHGATE': 'Churchgate',
+    'DADAR': 'Dadar',
+    'ANDHERI': 'Andheri',
+    'BORIVALI': 'Borivali',
+    'VIRAR': 'Virar',
+    'KURLA': 'Kurla',
+    'THANE': 'Thane',
+    'KALYAN': 'Kalyan',
+    'PANVEL': 'Panvel',
+    'VASHI': 'Vashi',
+    'NERUL': 'Nerul'
+}
+
+# Approximate centres of well-known areas, used when no station matches
+MUMBAI_AREAS = {
+    'andheri': {'lat': 19.1136, 'lng': 72.8697},
+    'bandra': {'lat': 19.0544, 'lng': 72.8406},
+    'churchgate': {'lat': 18.9322, 'lng': 72.8264},
+    'dadar': {'lat': 19.0178, 'lng': 72.8478},
+    'mumbai central': {'lat': 18.9686, 'lng': 72.8181},
+    'lower parel': {'lat': 18.9969, 'lng': 72.8331},
+    'kurla': {'lat': 19.0692, 'lng': 72.8789},
+    'ghatkopar': {'lat': 19.0864, 'lng': 72.9081},
+    'thane': {'lat': 19.1972, 'lng': 72.9636},
+    'navi mumbai': {'lat': 19.0330, 'lng': 73.0297}
+}
+
+# OTP place names carry "::id" suffixes and "(lat, lon)" coordinates
+OTP_ID_SUFFIX = re.compile(r'::.*$', re.S)
+COORDINATE_SUFFIX = re.compile(r'\s*\([\d.,\-\s]*\)$')
+# Trailing words that do not change which station is meant
+STATION_SUFFIX = re.compile(r'(?:\s*(?:\((?:w|e|west|east)\)|railway station|rly\.?|station|stn\.?))+$')
+
+NAME_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=NAME_CACHE_SIZE)
+def clean_place_name(name):
+    """Readable name for a raw OTP place name: ids, coordinates and underscores removed, words capitalized"""
+    name = OTP_ID_SUFFIX.sub('', name)
+    name = COORDINATE_SUFFIX.sub('', name)
+    name = name.replace('_', ' ')
+    return ' '.join(word.capitalize() for word in name.split())
+
+
+def name_key(name):
+    """Lookup key for a station name: cleaned, lower-cased, station suffixes removed"""
+    return STATION_SUFFIX.sub('', normalize(clean_place_name(name))).strip()
+
+
+class StationNames:
+    """Interned canonical station names with every known spelling resolved to
+    one id, and a bounded memo of raw names already seen"""
+
+    def __init__(self, names, cache_size=NAME_CACHE_SIZE):
+        self.names = [sys.intern(name) for name in names]
+        self.ids = {}
+        for station, name in enumerate(self.names):
+            self.ids.setdefault(normalize(name), station)
+
+        for group in STATION_ALIASES:
+            target = next((self.ids[name] for name in group if name in self.ids), None)
+            if target is not None:
+                for name in group:
+                    self.ids.setdefault(name, target)
+        for spelling, canonical in STATION_NAME_MAPPINGS.items():
+            target = self.ids.get(normalize(canonical))
+            if target is not None:
+                self.ids.setdefault(normalize(spelling), target)
+
+        self.resolve = lru_cache(maxsize=cache_size)(self._resolve)
+
+    def __len__(self):
+        return len(self.names)
+
+    def _resolve(self, name):
+        if not name:
+            return None
+        station = self.ids.get(normalize(name))
+        if station is None:
+            station = self.ids.get(name_key(name))
+        return station
+
+    def get_stats(self):
+        info = self.resolve.cache_info()
+        place_info = clean_place_name.cache_info()
+        return {
+            'stations': len(self.names),
+            'spellings': len(self.ids),
+            'memo_size': info.currsize,
+            'memo_hits': info.hits,
+            'memo_misses': info.misses,
+            'place_name_memo_hits': place_info.hits,
+            'place_name_memo_misses': place_info.misses
+        }
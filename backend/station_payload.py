@@ -0,0 +1,67 @@
+import gzip
+import hashlib
+import json
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is always available
+    brotli = None
+
+# /api/stations?format=... layouts
+STATION_LAYOUTS = ('full', 'columnar')
+
+
+def full_document(store):
+    """The classic /api/stations body: one object per station"""
+    return {'success': True, 'stations': store.to_dicts()}
+
+
+def columnar_document(store):
+    """Parallel arrays per field; types are codes into type_names"""
+    return {
+        'success': True,
+        'count': len(store),
+        'names': store.names,
+        'lat': [None if lat != lat else lat for lat in store.lat.tolist()],
+        'lng': [None if lng != lng else lng for lng in store.lng.tolist()],
+        'types': store.type_codes.tolist(),
+        'type_names': store.type_names,
+        'ids': store.ids
+    }
+
+
+class PreparedPayload:
+    """A JSON body serialized and compressed once, with a strong ETag per encoding"""
+
+    def __init__(self, document):
+        self.body = json.dumps(document, separators=(',', ':')).encode('utf-8')
+        self.etag = hashlib.sha256(self.body).hexdigest()[:32]
+        self.encoded = {
+            'identity': self.body,
+            'gzip': gzip.compress(self.body, compresslevel=9)
+        }
+        if brotli is not None:
+            self.encoded['br'] = brotli.compress(self.body, quality=11)
+
+    def etag_for(self, encoding):
+        # Byte-different representations need different strong validators
+        return self.etag if encoding == 'identity' else f"{self.etag}-{encoding}"
+
+    def all_etags(self):
+        return [self.etag_for(encoding) for encoding in self.encoded]
+
+    def choose_encoding(self, accept_encodings):
+        """Smallest encoding the client accepts, from a werkzeug Accept-Encoding header"""
+        for encoding in ('br', 'gzip'):
+            if encoding in self.encoded and accept_encodings[encoding] > 0:
+                return encoding
+        return 'identity'
+
+    def get_stats(self):
+        return {encoding: len(body) for encoding, body in self.encoded.items()}
+
+
+def prepare(store, layout):
+    if layout == 'columnar':
+        return PreparedPayload(columnar_document(store))
+    return PreparedPayload(full_document(store))
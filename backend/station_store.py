@@ -0,0 +1,85 @@
+import math
+import sys
+import numpy as np
+
+
+class StationStore:
+    """Columnar station set: coordinate arrays, interned names and small type codes.
+
+    Stations are stored once as parallel columns instead of one dict per
+    stop. Indexing with a position (or slice) builds the familiar
+    {'name', 'lat', 'lng', 'type', 'id'} dict on demand for callers that
+    hand stations on to JSON or the frontend.
+    """
+
+    def __init__(self, stations):
+        names = []
+        lats = []
+        lngs = []
+        types = []
+        ids = []
+        self.type_names = []
+        type_codes = {}
+
+        for station in stations:
+            if not isinstance(station, dict):
+                continue
+            lat = station.get('lat')
+            lng = station.get('lng')
+            if lng is None:
+                lng = station.get('lon')
+            station_type = station.get('type')
+            if station_type not in type_codes:
+                type_codes[station_type] = len(self.type_names)
+                self.type_names.append(station_type)
+
+            names.append(sys.intern(station.get('name') or ''))
+            lats.append(float(lat) if isinstance(lat, (int, float)) else math.nan)
+            lngs.append(float(lng) if isinstance(lng, (int, float)) else math.nan)
+            types.append(type_codes[station_type])
+            station_id = station.get('id')
+            ids.append(sys.intern(station_id) if isinstance(station_id, str) else station_id)
+
+        self.names = names
+        self.ids = ids
+        self.lat = np.array(lats, dtype=np.float64)
+        self.lng = np.array(lngs, dtype=np.float64)
+        self.type_codes = np.array(types, dtype=np.uint8 if len(self.type_names) <= 256 else np.uint16)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __iter__(self):
+        for position in range(len(self.names)):
+            yield self.record(position)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [self.record(position) for position in range(*key.indices(len(self.names)))]
+        return self.record(key)
+
+    def record(self, position):
+        """Station dict for one position, in the shape the loaders produced"""
+        station = {'name': self.names[position]}
+        lat = self.lat[position]
+        lng = self.lng[position]
+        if not math.isnan(lat):
+            station['lat'] = float(lat)
+        if not math.isnan(lng):
+            station['lng'] = float(lng)
+        station_type = self.type_names[self.type_codes[position]]
+        if station_type is not None:
+            station['type'] = station_type
+        if self.ids[position] is not None:
+            station['id'] = self.ids[position]
+        return station
+
+    def to_dicts(self):
+        return [self.record(position) for position in range(len(self.names))]
+
+    def type_of(self, position):
+        return self.type_names[self.type_codes[position]]
+
+    def located(self):
+        """Boolean mask of stations with usable coordinates"""
+        return np.isfinite(self.lat) & np.isfinite(self.lng) & ((self.lat != 0) | (self.lng != 0))
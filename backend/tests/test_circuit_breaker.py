@@ -0,0 +1,113 @@
+import pytest
+import circuit_breaker
+from circuit_breaker import CircuitBreaker
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(circuit_breaker.time, 'time', clock.time)
+    return clock
+
+
+def make_breaker(**overrides):
+    settings = dict(window_seconds=30, min_calls=4, error_rate=0.5,
+                    slow_call_seconds=10, slow_call_rate=0.8, open_seconds=30)
+    settings.update(overrides)
+    return CircuitBreaker('test', **settings)
+
+
+def trip(breaker):
+    for _ in range(breaker.min_calls):
+        breaker.record(breaker.allow_request(), 0.1, True)
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_stays_closed_below_min_calls(clock):
+    breaker = make_breaker()
+    for _ in range(3):
+        breaker.record(breaker.allow_request(), 0.1, True)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert not breaker.is_open()
+
+
+def test_trips_on_error_rate_and_rejects(clock):
+    breaker = make_breaker()
+    trip(breaker)
+    assert breaker.is_open()
+    assert breaker.allow_request() is None
+    assert breaker.get_stats()['rejected'] == 1
+
+
+def test_trips_on_slow_calls(clock):
+    breaker = make_breaker()
+    for _ in range(4):
+        breaker.record(breaker.allow_request(), 12, False)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.last_trip_reason.startswith('slow calls')
+
+
+def test_old_outcomes_leave_the_window(clock):
+    breaker = make_breaker()
+    for _ in range(3):
+        breaker.record(breaker.allow_request(), 0.1, True)
+    clock.now += 31
+    breaker.record(breaker.allow_request(), 0.1, True)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_single_probe_after_open_period(clock):
+    breaker = make_breaker()
+    trip(breaker)
+    clock.now += 30
+    probe = breaker.allow_request()
+    assert probe is not None
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # Only one call is let through while the probe is out
+    assert breaker.allow_request() is None
+    assert breaker.is_open()
+
+    breaker.record(probe, 0.1, False)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow_request() is not None
+
+
+def test_failed_probe_reopens(clock):
+    breaker = make_breaker()
+    trip(breaker)
+    clock.now += 30
+    breaker.record(breaker.allow_request(), 0.1, True)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.last_trip_reason == 'probe failed'
+
+
+def test_calls_from_before_the_trip_do_not_decide_the_probe(clock):
+    breaker = make_breaker()
+    straggler = breaker.allow_request()
+    trip(breaker)
+    clock.now += 30
+    probe = breaker.allow_request()
+
+    # A slow call let through while closed finishes during the probe
+    breaker.record(straggler, 0.1, False)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request() is None
+
+    breaker.record(probe, 0.1, True)
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_zero_settings_are_kept(monkeypatch):
+    monkeypatch.setenv('OTP_BREAKER_OPEN_SECONDS', '99')
+    breaker = CircuitBreaker('test', min_calls=0, open_seconds=0)
+    assert breaker.min_calls == 0
+    assert breaker.open_seconds == 0
+    assert CircuitBreaker('test').open_seconds == 99
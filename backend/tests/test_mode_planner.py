@@ -0,0 +1,82 @@
+from mode_planner import ModePlanner, MODE_COMBINATIONS, OPTIMIZATION_VARIANTS
+
+# Churchgate to Andheri: too far to walk or take an auto end to end
+ORIGIN = {'lat': 18.9322, 'lng': 72.8264}
+DESTINATION = {'lat': 19.1197, 'lng': 72.8464}
+
+
+def planned_keys(planner, **kwargs):
+    return {(category, variant['optimize']) for _, category, variant in planner.plan(ORIGIN, DESTINATION, **kwargs)}
+
+
+def final_route(category, optimize):
+    return {'raw_route': {'_category': category, '_optimization': optimize}}
+
+
+def test_distance_and_allowed_modes_pruning():
+    planner = ModePlanner(exploration_rate=0)
+    keys = planned_keys(planner)
+    assert ('walk_only', 'QUICK') not in keys
+    assert ('auto_direct', 'QUICK') not in keys
+    assert ('bus_only', 'QUICK') in keys
+
+    keys = planned_keys(planner, allowed_modes=['walk', 'train'])
+    assert {category for category, _ in keys} == {'all_transit', 'rail_only'}
+
+
+def test_variant_that_never_survives_is_skipped():
+    planner = ModePlanner(min_observations=3, exploration_rate=0)
+    for _ in range(3):
+        planner.record_fetch(ORIGIN, DESTINATION, 'bus_only', 'QUICK')
+        planner.record_outcome(ORIGIN, DESTINATION, [final_route('rail_only', 'QUICK')])
+    assert ('bus_only', 'QUICK') not in planned_keys(planner)
+    assert ('bus_only', 'TRANSFERS') in planned_keys(planner)
+    assert planner.get_stats()['pruned_learned'] > 0
+
+
+def test_planning_alone_counts_no_attempts():
+    planner = ModePlanner(min_observations=1, exploration_rate=0)
+    # Variants that time out, error or are skipped never report a fetch
+    for _ in range(5):
+        planned_keys(planner)
+    assert ('bus_only', 'QUICK') in planned_keys(planner)
+
+
+def test_survival_keeps_variant_planned():
+    planner = ModePlanner(min_observations=2, exploration_rate=0)
+    planner.record_fetch(ORIGIN, DESTINATION, 'bus_only', 'QUICK')
+    planner.record_outcome(ORIGIN, DESTINATION, [final_route('bus_only', 'QUICK')])
+    for _ in range(3):
+        planner.record_fetch(ORIGIN, DESTINATION, 'bus_only', 'QUICK')
+        planner.record_outcome(ORIGIN, DESTINATION, [])
+    assert ('bus_only', 'QUICK') in planned_keys(planner)
+
+
+def test_cache_hits_credit_nothing():
+    planner = ModePlanner(min_observations=2, exploration_rate=0)
+    planner.record_fetch(ORIGIN, DESTINATION, 'bus_only', 'QUICK')
+    planner.record_outcome(ORIGIN, DESTINATION, [])
+    # The same cached itineraries ranked again for later requests
+    for _ in range(5):
+        planner.record_outcome(ORIGIN, DESTINATION, [final_route('bus_only', 'QUICK')])
+    planner.record_fetch(ORIGIN, DESTINATION, 'bus_only', 'QUICK')
+    planner.record_outcome(ORIGIN, DESTINATION, [])
+    assert ('bus_only', 'QUICK') not in planned_keys(planner)
+
+
+def test_all_transit_always_runs():
+    planner = ModePlanner(min_observations=1, exploration_rate=0)
+    planner.record_fetch(ORIGIN, DESTINATION, 'all_transit', 'QUICK')
+    planner.record_outcome(ORIGIN, DESTINATION, [])
+    assert ('all_transit', 'QUICK') in planned_keys(planner)
+    stats = planner.get_stats()
+    assert stats['variants_considered'] == len(MODE_COMBINATIONS) * len(OPTIMIZATION_VARIANTS)
+
+
+def test_variant_answering_empty_is_pruned():
+    planner = ModePlanner(min_observations=2, exploration_rate=0)
+    for _ in range(2):
+        # OTP answered with no itineraries, so the ranking saw nothing from it
+        planner.record_fetch(ORIGIN, DESTINATION, 'metro_only', 'WALKING')
+        planner.record_outcome(ORIGIN, DESTINATION, [])
+    assert ('metro_only', 'WALKING') not in planned_keys(planner)
@@ -0,0 +1,27 @@
+from otp_graphql import answered_variants, split_plan_response
+
+QUICK = {'optimize': 'QUICK', 'transferPenalty': 300}
+ALIASES = {
+    'p0': ('WALK,RAIL', 'rail_only', QUICK),
+    'p1': ('WALK,BUS', 'bus_only', QUICK),
+    'p2': ('WALK,SUBWAY', 'metro_only', QUICK),
+}
+
+
+def test_empty_plans_are_answered_and_failed_aliases_are_not():
+    payload = {
+        'data': {
+            'p0': {'itineraries': [{'duration': 1200, 'legs': []}]},
+            'p1': {'itineraries': []},
+            'p2': None
+        },
+        'errors': [{'message': 'p2 failed'}]
+    }
+    routes, errors = split_plan_response(payload, ALIASES)
+    assert [route['_category'] for route in routes] == ['rail_only']
+    assert len(errors) == 1
+    assert [category for _, category, _ in answered_variants(payload, ALIASES)] == ['rail_only', 'bus_only']
+
+
+def test_no_data_answers_nothing():
+    assert answered_variants({'errors': [{'message': 'down'}]}, ALIASES) == []
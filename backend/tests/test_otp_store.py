@@ -0,0 +1,68 @@
+import time
+import pytest
+import otp_store
+from otp_store import OTPResponseStore
+
+ORIGIN = {'lat': 18.9322, 'lng': 72.8264}
+DESTINATION = {'lat': 19.1197, 'lng': 72.8464}
+ITINERARIES = [{'duration': 1800, 'startTime': 1792130400000, '_category': 'rail_only'}]
+
+
+@pytest.fixture
+def store(tmp_path):
+    return OTPResponseStore(path=str(tmp_path / 'plans.sqlite3'), ttl_seconds=3600)
+
+
+def departure(text):
+    return time.strptime(text, '%Y-%m-%d %H:%M')
+
+
+def test_round_trip(store):
+    key = store.make_key(ORIGIN, DESTINATION, 'WALK,RAIL', 'QUICK', departure('2026-10-14 08:05'))
+    assert store.get(key) is None
+    store.put(key, ITINERARIES)
+    assert store.get(key) == ITINERARIES
+    stats = store.get_stats()
+    assert (stats['hits'], stats['misses'], stats['writes'], stats['size']) == (1, 1, 1, 1)
+
+
+def test_key_separates_service_dates(store):
+    weekday = store.make_key(ORIGIN, DESTINATION, 'WALK,RAIL', 'QUICK', departure('2026-10-14 08:05'))
+    weekend = store.make_key(ORIGIN, DESTINATION, 'WALK,RAIL', 'QUICK', departure('2026-10-17 08:05'))
+    same_bucket = store.make_key(ORIGIN, DESTINATION, 'WALK,RAIL', 'QUICK', departure('2026-10-14 08:14'))
+    assert weekday != weekend
+    assert weekday == same_bucket
+
+
+def test_entries_expire_after_ttl(store, monkeypatch):
+    key = store.make_key(ORIGIN, DESTINATION, 'WALK,RAIL', 'QUICK', departure('2026-10-14 08:05'))
+    store.put(key, ITINERARIES)
+    stored_at = time.time()
+    monkeypatch.setattr(otp_store.time, 'time', lambda: stored_at + 3601)
+    assert store.get(key) is None
+    assert store.recent(10) == []
+
+
+def test_empty_results_are_not_stored(store):
+    key = store.make_key(ORIGIN, DESTINATION, 'WALK', 'QUICK', departure('2026-10-14 08:05'))
+    store.put(key, [])
+    assert store.get(key) is None
+    assert store.get_stats()['writes'] == 0
+
+
+def test_recent_is_newest_first_and_survives_reopen(tmp_path):
+    path = str(tmp_path / 'plans.sqlite3')
+    store = OTPResponseStore(path=path, ttl_seconds=3600)
+    store.put('a', [{'n': 1}])
+    time.sleep(0.01)
+    store.put('b', [{'n': 2}])
+    reopened = OTPResponseStore(path=path, ttl_seconds=3600)
+    assert [key for key, _, _ in reopened.recent(10)] == ['b', 'a']
+    assert reopened.get('a') == [{'n': 1}]
+
+
+def test_empty_path_disables_store():
+    store = OTPResponseStore(path='')
+    assert not store.enabled
+    store.put('a', ITINERARIES)
+    assert store.get('a') is None
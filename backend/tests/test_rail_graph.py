@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+from rail_network import RailNetwork
+
+# Two lines meeting at Yard: A runs 2 min per km every 10 min, B every 6 min
+LINES = {
+    'A': {
+        'long_name': 'Line A', 'headway': 10, 'minutes_per_km': 2,
+        'stations': [('Xing', 0.0, 19.00, 72.80), ('Yard', 1.0, 19.01, 72.80), ('Zenith', 2.0, 19.02, 72.80)]
+    },
+    'B': {
+        'long_name': 'Line B', 'headway': 6, 'minutes_per_km': 2,
+        'stations': [('Yard', 0.0, 19.01, 72.80), ('Wharf', 3.0, 19.01, 72.83)]
+    }
+}
+
+
+@pytest.fixture(scope='module')
+def graph():
+    return RailNetwork(LINES).graph
+
+
+def test_same_line_journey(graph):
+    # Half a headway's wait, then 2 minutes per km
+    assert graph.lookup('Xing', 'Zenith') == {'minutes': 9.0, 'transfers': 0, 'km': 2.0}
+    assert graph.lookup('Zenith', 'Xing') == graph.lookup('Xing', 'Zenith')
+
+
+def test_change_of_line(graph):
+    # 5 wait + 2 ride, change at Yard (3 walk + 3 wait), 6 ride
+    assert graph.lookup('Xing', 'Wharf') == {'minutes': 19.0, 'transfers': 1, 'km': 4.0}
+    assert graph.line_between('Xing', 'Wharf') is None
+    assert graph.line_between('Yard', 'Wharf') == 'B'
+    assert graph.line_between('Xing', 'Zenith') == 'A'
+
+
+def test_matrix_diagonal_and_unknown_names(graph):
+    n = len(graph)
+    assert np.all(np.diag(graph.minutes) == 0)
+    assert np.all(np.diag(graph.transfers) == 0)
+    assert np.isfinite(graph.minutes).all()
+    assert graph.lookup('Xing', 'Nowhere') is None
+    assert graph.line_between(None, 'Xing') is None
+    assert graph.get_stats()['stations'] == n == 4
+
+
+def test_station_id_accepts_other_spellings(graph):
+    assert graph.station_id('xing station') == graph.station_id('Xing') == 0
+    assert graph.station_id('  YARD ') == graph.station_id('Yard')
+
+
+def test_best_pair_adds_access_and_egress(graph):
+    xing, yard, zenith, wharf = (graph.station_id(name) for name in ('Xing', 'Yard', 'Zenith', 'Wharf'))
+    # Walking to Yard costs more than the ride from Xing saves
+    minutes, origin, destination = graph.best_pair({yard: 14, xing: 2}, {zenith: 30, wharf: 1})
+    assert (minutes, origin, destination) == (22.0, xing, wharf)
+    assert graph.best_pair({}, {wharf: 1}) is None
+
+
+def test_fares_distance_is_the_shortest_track_not_the_quickest_ride():
+    lines = {
+        'S': {
+            'long_name': 'Slow', 'headway': 4, 'minutes_per_km': 6,
+            'stations': [('Pier', 0.0, 19.00, 72.80), ('Quay', 1.0, 19.01, 72.80), ('Reef', 2.0, 19.02, 72.80)]
+        },
+        'F': {
+            'long_name': 'Fast', 'headway': 4, 'minutes_per_km': 1,
+            'stations': [('Pier', 0.0, 19.00, 72.80), ('Spit', 2.0, 19.01, 72.81), ('Reef', 4.0, 19.02, 72.80)]
+        }
+    }
+    graph = RailNetwork(lines).graph
+    pier, reef = graph.station_id('Pier'), graph.station_id('Reef')
+    # The fast line wins on time over 4 km of track; fares go by the 2 km one
+    assert graph.lookup('Pier', 'Reef') == {'minutes': 6.0, 'transfers': 0, 'km': 4.0}
+    assert graph.shortest_km[pier, reef] == 2.0
+    assert graph.shortest_km[graph.station_id('Quay'), graph.station_id('Spit')] == 3.0
@@ -0,0 +1,89 @@
+from datetime import datetime
+import pytest
+from rail_network import RailNetwork, FIRST_DEPARTURE, LAST_DEPARTURE
+
+# Two lines meeting at Yard: A runs 2 min per km every 10 min, B every 6 min
+LINES = {
+    'A': {
+        'long_name': 'Line A', 'headway': 10, 'minutes_per_km': 2,
+        'stations': [('Xing', 0.0, 19.00, 72.80), ('Yard', 1.0, 19.01, 72.80), ('Zenith', 2.0, 19.02, 72.80)]
+    },
+    'B': {
+        'long_name': 'Line B', 'headway': 6, 'minutes_per_km': 2,
+        'stations': [('Yard', 0.0, 19.01, 72.80), ('Wharf', 3.0, 19.01, 72.83)]
+    }
+}
+
+
+@pytest.fixture(scope='module')
+def network():
+    return RailNetwork(LINES)
+
+
+def pattern(network, line, first):
+    return next(p for p in network.patterns if p.line == line and network.names[p.stops[0]] == first)
+
+
+def test_next_trip_rounds_up_to_the_headway(network):
+    line_a = pattern(network, 'A', 'Xing')
+    assert line_a.next_trip(0, 300) == 300
+    assert line_a.next_trip(0, 301) == 310
+    # Yard is 2 minutes down the line
+    assert line_a.next_trip(1, 303) == 310
+
+
+def test_next_trip_service_day_boundaries(network):
+    line_a = pattern(network, 'A', 'Xing')
+    # Between the last train and the first one
+    assert line_a.next_trip(0, 2 * 60) == FIRST_DEPARTURE
+    assert line_a.next_trip(0, FIRST_DEPARTURE) == FIRST_DEPARTURE
+    assert line_a.next_trip(0, LAST_DEPARTURE) == LAST_DEPARTURE
+    assert line_a.next_trip(0, LAST_DEPARTURE + 1) is None
+
+
+def test_next_trip_after_midnight_takes_previous_days_late_trains(network):
+    line_a = pattern(network, 'A', 'Xing')
+    # 00:30 is 24:30 of the previous service day, which still has trains
+    assert line_a.next_trip(0, 30) == 30
+    assert line_a.next_trip(0, 31) == 40
+    assert line_a.next_trip(1, 32) == 30
+    # 00:55: the 01:00 train is the previous day's last
+    assert line_a.next_trip(0, 55) == 60
+    # 01:05: nothing until the morning
+    assert line_a.next_trip(0, 65) == FIRST_DEPARTURE
+
+
+def test_raptor_rounds_and_transfers(network):
+    xing, yard, zenith, wharf = (network.station_ids[name] for name in ('Xing', 'Yard', 'Zenith', 'Wharf'))
+    arrivals, parents = network.raptor({xing: 300})
+
+    assert arrivals[1][zenith] == 304
+    assert arrivals[1][yard] == 302
+    assert wharf not in arrivals[1]
+    # Change at Yard: 302 + 3 min transfer, next B train at 306, 6 min ride
+    assert arrivals[2][wharf] == 312
+    line_b, board, alight, trip = parents[2][wharf]
+    assert (line_b.line, network.names[line_b.stops[board]], trip) == ('B', 'Yard', 306)
+
+
+def test_raptor_just_after_midnight(network):
+    xing, zenith = network.station_ids['Xing'], network.station_ids['Zenith']
+    arrivals, _ = network.raptor({xing: 30})
+    assert arrivals[1][zenith] == 34
+
+
+def test_plan_after_midnight_rides_the_late_train():
+    network = RailNetwork()
+    origin = {'lat': 18.9322, 'lng': 72.8264}       # Churchgate
+    destination = {'lat': 19.0178, 'lng': 72.8478}  # Dadar
+    departure = datetime(2026, 10, 14, 0, 20)
+
+    itineraries = network.plan(origin, destination, departure)
+    assert itineraries
+    rail = next(leg for leg in itineraries[0]['legs'] if leg['mode'] == 'RAIL')
+    boards_at = datetime.fromtimestamp(rail['startTime'] / 1000)
+    assert departure <= boards_at < datetime(2026, 10, 14, 1, 30)
+
+    itineraries = network.plan(origin, destination, datetime(2026, 10, 14, 2, 0))
+    rail = next(leg for leg in itineraries[0]['legs'] if leg['mode'] == 'RAIL')
+    assert datetime.fromtimestamp(rail['startTime'] / 1000) >= datetime(2026, 10, 14, 4, 0)
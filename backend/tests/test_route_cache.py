@@ -0,0 +1,123 @@
+import time as real_time
+import pytest
+import route_cache
+from route_cache import RouteCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(route_cache.time, 'time', clock.time)
+    return clock
+
+
+def make_cache(**overrides):
+    settings = dict(max_entries=4, ttl_seconds=300, stale_seconds=600, bucket_minutes=15)
+    settings.update(overrides)
+    return RouteCache(**settings)
+
+
+def wait_for_refresh(cache, key):
+    for _ in range(200):
+        with cache._lock:
+            if key not in cache._refreshing:
+                return
+        real_time.sleep(0.005)
+    raise AssertionError("refresh did not finish")
+
+
+def test_fresh_hit_skips_loader(clock):
+    cache = make_cache()
+    calls = []
+    assert cache.get_or_load('k', lambda: calls.append(1) or ['a']) == ['a']
+    clock.now += 299
+    assert cache.get_or_load('k', lambda: calls.append(1) or ['b']) == ['a']
+    assert len(calls) == 1
+    assert cache.get_stats()['hits'] == 1
+
+
+def test_stale_entry_is_served_and_refreshed(clock):
+    cache = make_cache()
+    cache.put('k', ['old'])
+    clock.now += 301
+    assert cache.get_or_load('k', lambda: ['new']) == ['old']
+    wait_for_refresh(cache, 'k')
+    assert cache.get('k') == ['new']
+    assert cache.get_stats()['refreshes'] == 1
+
+
+def test_refresher_result_replaces_stale_entry(clock):
+    cache = make_cache()
+    cache.put('k', ['old'])
+    clock.now += 301
+    cache.get_or_load('k', lambda: ['foreground'], refresher=lambda: ['background'])
+    wait_for_refresh(cache, 'k')
+    assert cache.get('k') == ['background']
+
+
+def test_empty_refresh_keeps_stale_entry(clock):
+    cache = make_cache()
+    cache.put('k', ['old'])
+    clock.now += 301
+    cache.get_or_load('k', lambda: ['new'], should_store=lambda value: False)
+    wait_for_refresh(cache, 'k')
+    assert cache.get('k') == ['old']
+
+
+def test_expired_entry_is_reloaded(clock):
+    cache = make_cache()
+    cache.put('k', ['old'])
+    clock.now += 901
+    assert cache.get('k') is None
+    assert cache.get_or_load('k', lambda: ['new']) == ['new']
+
+
+def test_should_store_vetoes_caching(clock):
+    cache = make_cache()
+    cache.get_or_load('k', lambda: ['partial'], should_store=lambda value: False)
+    assert cache.get('k') is None
+
+
+def test_previous_bucket_is_a_stale_hit(clock):
+    cache = make_cache()
+    origin = {'lat': 19.0, 'lng': 72.8}
+    destination = {'lat': 19.1, 'lng': 72.9}
+    key = cache.make_key(origin, destination, departure=clock.now)
+    cache.put(key, ['earlier'])
+    next_key = cache.make_key(origin, destination, departure=clock.now + 15 * 60)
+    assert next_key[0] == key[0] + 1
+    assert cache.get_or_load(next_key, lambda: ['later']) == ['earlier']
+    wait_for_refresh(cache, next_key)
+    assert cache.get(next_key) == ['later']
+
+
+def test_lru_eviction_and_empty_values(clock):
+    cache = make_cache(max_entries=2)
+    cache.put('a', [1])
+    cache.put('b', [2])
+    cache.get('a')
+    cache.put('c', [3])
+    cache.put('d', [])
+    assert cache.get('b') is None
+    assert cache.get('a') == [1]
+    assert cache.get('d') is None
+    assert cache.get_stats()['evictions'] == 1
+
+
+def test_get_refreshes_stale_entry_only_with_a_refresher(clock):
+    cache = make_cache()
+    cache.put('k', ['old'])
+    clock.now += 301
+    assert cache.get('k') == ['old']
+    assert cache.get_stats()['refreshes'] == 0
+    assert cache.get('k', refresher=lambda: ['new']) == ['old']
+    wait_for_refresh(cache, 'k')
+    assert cache.get('k') == ['new']
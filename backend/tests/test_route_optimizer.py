@@ -0,0 +1,49 @@
+import copy
+import pytest
+
+
+@pytest.fixture(scope='module')
+def optimizer(tmp_path_factory):
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setenv('OTP_STORE_PATH', '')
+        patch.setenv('STATION_SNAPSHOT_PATH', str(tmp_path_factory.mktemp('stations') / 'stations.json'))
+        patch.setenv('STATION_REFRESH_SECONDS', '0')
+        from route_optimizer import RouteOptimizer
+        yield RouteOptimizer()
+
+
+def leg(mode, line, minutes, km):
+    return {
+        'mode': mode, 'routeShortName': line, 'duration': minutes * 60, 'distance': km * 1000,
+        'from': {'name': 'Churchgate'}, 'to': {'name': 'Andheri'}
+    }
+
+
+def itinerary(minutes, *legs):
+    return {'duration': minutes * 60, 'walkTime': 0, 'transitTime': minutes * 60, 'waitingTime': 0, 'legs': list(legs)}
+
+
+ITINERARIES = {
+    'rail': itinerary(35, leg('RAIL', 'WR', 35, 22)),
+    'bus': itinerary(80, leg('BUS', '84', 80, 20)),
+    'bus_express': itinerary(70, leg('BUS', 'A-84', 70, 20)),
+}
+
+
+def test_plans_sharing_itineraries_rank_independently(optimizer):
+    shared = copy.deepcopy(ITINERARIES)
+    untouched = copy.deepcopy(shared)
+    profile = {'allowed_modes': ['bus', 'walk']}
+
+    bus_plan = optimizer.categorize_and_deduplicate_routes([shared['bus'], shared['bus_express']])
+    # A plan with every mode ranks the same itinerary dicts, where rail dominates the buses
+    every_mode_plan = optimizer.categorize_and_deduplicate_routes(list(shared.values()))
+    assert optimizer.optimize_routes(every_mode_plan, {})
+
+    churchgate = {'lat': 18.9322, 'lng': 72.8264}
+    andheri = {'lat': 19.1197, 'lng': 72.8464}
+    ranked = optimizer.rank_routes(bus_plan, 'Churchgate', 'Andheri', churchgate, andheri, profile)
+    assert ranked[0]['route_type'] == 'Fastest'
+    assert {leg['mode'] for route in ranked for leg in route['raw_route']['legs']} == {'BUS'}
+    # Ranking leaves nothing plan-specific on the itineraries
+    assert shared == untouched
@@ -0,0 +1,49 @@
+import numpy as np
+import route_scoring
+from route_scoring import metric_matrix, non_dominated, objectives, pareto_layers, score_matrix, smallest
+
+
+def metrics(duration, cost, transfers, eco_score=5.0, walk_time=0):
+    return {'duration': duration, 'cost': cost, 'transfers': transfers, 'eco_score': eco_score, 'walk_time': walk_time}
+
+
+def test_pareto_layers_peel_successive_fronts():
+    values = np.array([
+        [30, 20, 1],   # front: fastest
+        [50, 10, 1],   # front: cheapest
+        [40, 15, 0],   # front: no transfers
+        [45, 25, 1],   # dominated by the first only
+        [60, 30, 2],   # dominated by everything above
+    ])
+    assert pareto_layers(values).tolist() == [0, 0, 0, 1, 2]
+
+
+def test_identical_rows_keep_only_the_first_on_a_front():
+    values = np.array([[30, 20], [30, 20], [20, 40]])
+    assert non_dominated(values).tolist() == [0, 2]
+    assert pareto_layers(values).tolist() == [0, 1, 0]
+
+
+def test_empty_input():
+    assert pareto_layers(np.empty((0, 4))).tolist() == []
+    assert non_dominated(np.empty((0, 4))).tolist() == []
+
+
+def test_objectives_prefer_higher_eco_score():
+    matrix = metric_matrix([metrics(30, 20, 1, eco_score=8), metrics(30, 20, 1, eco_score=4)])
+    assert pareto_layers(objectives(matrix)).tolist() == [0, 1]
+
+
+def test_score_matrix_matches_profile_weights():
+    matrix = metric_matrix([metrics(30, 20, 1, eco_score=6)])
+    profile = {'transfer_preference': 1, 'time_preference': 0, 'cost_preference': 0, 'eco_preference': 0}
+    assert score_matrix(matrix, profile).tolist() == [7.0]
+    assert matrix.shape == (1, len(route_scoring.METRIC_KEYS))
+
+
+def test_smallest_orders_by_keys_then_position():
+    primary = np.array([3, 1, 2, 1])
+    secondary = np.array([0, 5, 0, 4])
+    assert smallest(2, primary, secondary).tolist() == [3, 1]
+    assert smallest(10, primary).tolist() == [1, 3, 2, 0]
+    assert smallest(0, primary).tolist() == []
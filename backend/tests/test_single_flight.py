@@ -0,0 +1,82 @@
+import threading
+import pytest
+from single_flight import SingleFlight
+
+
+def test_concurrent_calls_share_one_run():
+    flights = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return ['routes'], True
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flights.do('k', fetch)))
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=lambda: results.append(flights.do('k', fetch, timeout=5)))
+    follower.start()
+    while flights.get_stats()['coalesced'] == 0:
+        pass
+    release.set()
+    leader.join()
+    follower.join()
+
+    assert len(calls) == 1
+    # Followers see the whole flight result, including the leader's partial flag
+    assert results == [(['routes'], True), (['routes'], True)]
+    assert flights.get_stats()['in_flight'] == 0
+
+
+def test_follower_times_out_without_cancelling_leader():
+    flights = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+
+    def fetch():
+        started.set()
+        release.wait(5)
+        return 'done'
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flights.do('k', fetch)))
+    leader.start()
+    started.wait(5)
+    with pytest.raises(TimeoutError):
+        flights.do('k', fetch, timeout=0.01)
+    release.set()
+    leader.join()
+    assert results == ['done']
+
+
+def test_error_clears_the_flight():
+    flights = SingleFlight()
+
+    def fail():
+        raise ValueError('otp down')
+
+    with pytest.raises(ValueError):
+        flights.do('k', fail)
+    assert flights.do('k', lambda: 'ok') == 'ok'
+
+
+def test_claimed_run_is_shared_with_callers_that_join_it():
+    flights = SingleFlight()
+    flight = flights.claim('k')
+    assert flight is not None
+    assert flights.claim('k') is None
+
+    results = []
+    follower = threading.Thread(target=lambda: results.append(flights.do('k', lambda: 'own run', timeout=5)))
+    follower.start()
+    while flights.get_stats()['coalesced'] < 2:
+        pass
+    flights.settle('k', flight, (['streamed'], False))
+    follower.join()
+    assert results == [(['streamed'], False)]
+    assert flights.get_stats()['executions'] == 1
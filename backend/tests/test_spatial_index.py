@@ -0,0 +1,55 @@
+import math
+import random
+import pytest
+from station_store import StationStore
+from spatial_index import SpatialIndex
+
+
+@pytest.fixture(scope='module')
+def index():
+    rng = random.Random(7)
+    stations = [
+        {'name': f'Stop {i}', 'lat': 18.9 + rng.random() * 0.3, 'lng': 72.8 + rng.random() * 0.2}
+        for i in range(800)
+    ]
+    # Unlocated stops are left out of the grid
+    stations.append({'name': 'Nowhere'})
+    return SpatialIndex(StationStore(stations))
+
+
+def brute_force(index, lat, lng):
+    x, y = index.project(lat, lng)
+    return sorted(
+        (math.hypot(px - x, py - y), int(position))
+        for position, px, py in zip(index.positions, index.xs, index.ys)
+    )
+
+
+def test_nearest_matches_a_full_scan(index):
+    rng = random.Random(11)
+    for _ in range(50):
+        lat, lng = 18.9 + rng.random() * 0.3, 72.8 + rng.random() * 0.2
+        expected = brute_force(index, lat, lng)[:5]
+        found = index.nearest(lat, lng, k=5)
+        assert [station['name'] for station, _ in found] == [f'Stop {position}' for _, position in expected]
+        assert [distance for _, distance in found] == pytest.approx([distance for distance, _ in expected])
+
+
+def test_nearest_respects_max_distance(index):
+    found = index.nearest(19.0, 72.9, k=50, max_distance_km=0.5)
+    assert found and all(distance <= 0.5 for _, distance in found)
+    assert len(found) == sum(1 for distance, _ in brute_force(index, 19.0, 72.9) if distance <= 0.5)
+
+
+def test_within_is_closest_first_and_limited(index):
+    found = index.within(19.0, 72.9, 3.0)
+    expected = [position for distance, position in brute_force(index, 19.0, 72.9) if distance <= 3.0]
+    assert len(expected) > 3
+    assert [station['name'] for station, _ in found] == [f'Stop {position}' for position in expected]
+    assert index.within(19.0, 72.9, 3.0, limit=3) == found[:3]
+
+
+def test_far_away_queries_and_empty_index(index):
+    assert len(index) == 800
+    assert len(index.nearest(28.6, 77.2, k=3)) == 3
+    assert SpatialIndex(StationStore([])).nearest(19.0, 72.9) == []
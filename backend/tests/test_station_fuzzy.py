@@ -0,0 +1,62 @@
+import pytest
+from station_store import StationStore
+from station_fuzzy import StationFuzzyMatcher, allowed_distance, edit_distance
+
+STATIONS = [
+    {'name': 'Churchgate', 'lat': 18.9322, 'lng': 72.8264, 'type': 'RAIL'},
+    {'name': 'Mumbai Central', 'lat': 18.9686, 'lng': 72.8181, 'type': 'RAIL'},
+    {'name': 'Andheri', 'lat': 19.1197, 'lng': 72.8464, 'type': 'RAIL'},
+    {'name': 'Andheri Bus Depot', 'lat': 19.1190, 'lng': 72.8470, 'type': 'BUS'},
+    {'name': 'Ghatkopar', 'lat': 19.0864, 'lng': 72.9081, 'type': 'RAIL'},
+    {'name': 'Kurla', 'lat': 19.0692, 'lng': 72.8789, 'type': 'RAIL'},
+]
+
+
+@pytest.fixture
+def matcher():
+    stations = StationStore(STATIONS)
+    # Rail stops ahead of the bus depot, as StationAutocomplete ranks them
+    importance = {position: (2.0 if stations.type_of(position) == 'RAIL' else 0.0) for position in range(len(stations))}
+    return StationFuzzyMatcher(stations, importance)
+
+
+def test_edit_distance_is_bounded():
+    assert edit_distance('andheri', 'andheri', 2) == 0
+    assert edit_distance('andhery', 'andheri', 2) == 1
+    assert edit_distance('ghatkoper', 'ghatkopar', 2) == 1
+    assert edit_distance('kurla', 'churchgate', 2) is None
+
+
+def test_prefix_distance():
+    assert edit_distance('churc', 'churchgate', 1, prefix=True) == 0
+    assert edit_distance('chruc', 'churchgate'[:6], 1, prefix=True) is None
+    assert edit_distance('chuch', 'churchgate'[:6], 1, prefix=True) == 1
+
+
+def test_allowed_distance_grows_with_length():
+    assert [allowed_distance(n) for n in (3, 4, 6, 10)] == [0, 1, 2, 3]
+
+
+def test_find_corrects_typos(matcher):
+    station, match_type = matcher.find('Gatkopar')
+    assert station['name'] == 'Ghatkopar'
+    assert match_type == 'fuzzy (distance 1)'
+    assert matcher.find('Mumbai Centrl')[0]['name'] == 'Mumbai Central'
+
+
+def test_find_prefers_whole_names_and_important_stops(matcher):
+    # 'andheri' is a whole name and a word of the bus depot's name
+    assert matcher.find('Andhery')[0]['name'] == 'Andheri'
+
+
+def test_find_rejects_short_and_distant_queries(matcher):
+    assert matcher.find('Kul') == (None, None)
+    assert matcher.find('Borivali') == (None, None)
+
+
+def test_search_matches_name_word_prefixes(matcher):
+    names = [matcher.stations.names[position] for position, _ in matcher.search('centarl', 5)]
+    assert names == ['Mumbai Central']
+    results = matcher.search('andhe', 5)
+    assert [matcher.stations.names[position] for position, _ in results] == ['Andheri', 'Andheri Bus Depot']
+    assert all(distance == 0 for _, distance in results)
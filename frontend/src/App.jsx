@@ -81,7 +81,8 @@ function App() {
         origin: origin,
         destination: destination,
         preferences: userProfile,
-        filters: filters // Include the new filters
+        filters: filters, // Include the new filters
+        schema: 2 // Compact response: last-mile options once, no raw itineraries
       };
 
       const response = await fetch('http://localhost:5000/api/plan', {
@@ -96,9 +97,14 @@ function App() {
       console.log('Route planning response:', data);
 
       if (data.success && Array.isArray(data.routes)) {
-        setRoutes(data.routes);
-        if (data.routes.length > 0) {
-          setSelectedRoute(data.routes[0]); // Auto-select first route
+        // Schema 2 sends last-mile options once for the whole trip
+        const routes = data.routes.map(route => ({
+          ...route,
+          last_mile: route.last_mile || data.last_mile || []
+        }));
+        setRoutes(routes);
+        if (routes.length > 0) {
+          setSelectedRoute(routes[0]); // Auto-select first route
         }
       } else {
         setError(data.error || 'No routes found');
@@ -153,6 +153,11 @@ const MapModal = ({ route, isOpen, onClose, origin, destination }) => {
   };
 
   const extractRealRouteCoordinates = (route) => {
+    // Compact responses carry the leg end points directly
+    if (route.waypoints && route.waypoints.length > 0) {
+      return route.waypoints;
+    }
+
     // Try to extract coordinates from the raw route data if available
     if (route.raw_route && route.raw_route.legs) {
       const coords = [];
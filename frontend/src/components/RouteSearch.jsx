@@ -1,4 +1,4 @@
-﻿import React, { useState, useEffect } from 'react';
+﻿import React, { useState, useEffect, useRef } from 'react';
 
 const RouteSearch = ({ onRouteSearch, stations, loading }) => {
   const [origin, setOrigin] = useState('');
@@ -9,6 +9,8 @@ const RouteSearch = ({ onRouteSearch, stations, loading }) => {
   const [destinationSuggestions, setDestinationSuggestions] = useState([]);
   const [showOriginSuggestions, setShowOriginSuggestions] = useState(false);
   const [showDestinationSuggestions, setShowDestinationSuggestions] = useState(false);
+  // Latest query per field, so slower autocomplete responses don't overwrite newer ones
+  const latestQuery = useRef({ origin: '', destination: '' });
   
   const vehicleTypes = [
     { id: 'walk', label: 'Walk', icon: '🚶', color: 'green', eco: true },
@@ -40,37 +42,52 @@ const RouteSearch = ({ onRouteSearch, stations, loading }) => {
     }
   };
 
-  const searchStations = (query) => {
-    if (!query || query.length < 2) return [];
-    
+  const filterStations = (query) => {
     const lowercaseQuery = query.toLowerCase();
     return stations
       .filter(station => station.name.toLowerCase().includes(lowercaseQuery))
       .slice(0, 8);
   };
 
+  const searchStations = async (query) => {
+    if (!query || query.length < 2) return [];
+    
+    try {
+      const response = await fetch(`http://localhost:5000/api/stations/autocomplete?q=${encodeURIComponent(query)}&k=8`);
+      const data = await response.json();
+      if (data.success && Array.isArray(data.stations)) {
+        return data.stations;
+      }
+    } catch (error) {
+      console.error('Autocomplete failed, filtering locally:', error);
+    }
+    return filterStations(query);
+  };
+
+  const updateSuggestions = async (field, value, setSuggestions, setShow) => {
+    latestQuery.current[field] = value;
+    if (value.length < 2) {
+      setShow(false);
+      return;
+    }
+    
+    const suggestions = await searchStations(value);
+    if (latestQuery.current[field] === value) {
+      setSuggestions(suggestions);
+      setShow(true);
+    }
+  };
+
   const handleOriginChange = (e) => {
     const value = e.target.value;
     setOrigin(value);
-    
-    if (value.length >= 2) {
-      setOriginSuggestions(searchStations(value));
-      setShowOriginSuggestions(true);
-    } else {
-      setShowOriginSuggestions(false);
-    }
+    updateSuggestions('origin', value, setOriginSuggestions, setShowOriginSuggestions);
   };
 
   const handleDestinationChange = (e) => {
     const value = e.target.value;
     setDestination(value);
-    
-    if (value.length >= 2) {
-      setDestinationSuggestions(searchStations(value));
-      setShowDestinationSuggestions(true);
-    } else {
-      setShowDestinationSuggestions(false);
-    }
+    updateSuggestions('destination', value, setDestinationSuggestions, setShowDestinationSuggestions);
   };
 
   const selectOriginSuggestion = (station) => {